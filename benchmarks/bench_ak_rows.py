@@ -0,0 +1,94 @@
+"""
+akshare 回退路径基准
+使用录制格式的 DataFrame（与 qdii_*_jsl 返回的列一致）对比旧实现（串行获取 + iterrows 逐格取值）
+与新实现（线程池并行获取 + 按列转换）的耗时。
+
+运行方式（项目根目录）:
+    python benchmarks/bench_ak_rows.py [每个数据集行数] [模拟网络延迟秒数]
+"""
+import os
+import sys
+import time
+import types
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from server.modules import jisilu_mcp_server as j
+
+
+def _recorded_frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    statuses = np.array(["限额申购", "暂停申购", "开放申购", "限大额", "限100"], dtype=object)
+    return pd.DataFrame({
+        "代码": [f"{513000 + seed * 1000 + i:06d}" for i in range(n)],
+        "名称": [f"QDII基金{seed}-{i}" for i in range(n)],
+        "现价": rng.uniform(0.5, 3.0, n).round(3),
+        "涨幅": rng.normal(0, 1.5, n).round(2),
+        "成交": rng.uniform(1e4, 1e8, n).round(2),
+        "场内份额": rng.integers(1e5, 1e9, n),
+        "T-1估值": rng.uniform(0.5, 3.0, n).round(4),
+        "T-1溢价率": rng.normal(1.0, 3.0, n).round(2),
+        "申购状态": statuses[rng.integers(0, len(statuses), n)],
+        "赎回状态": "开放赎回",
+        "管托费": "1.00%",
+    })
+
+
+def _legacy_rows(datasets: List[Any]) -> List[Dict[str, Any]]:
+    # 旧实现的行转换：iterrows + 嵌套 r.get 回退
+    out: List[Dict[str, Any]] = []
+    for df in datasets:
+        for _, r in df.iterrows():
+            out.append({
+                "代码": str(r.get("代码", r.get("fund_id", ""))),
+                "名称": str(r.get("名称", r.get("fund_nm", ""))),
+                "T-1溢价率": str(r.get("T-1溢价率", r.get("T-1 溢价率", r.get("discount_rt", "")))),
+                "申购状态": str(r.get("申购状态", r.get("apply_status", ""))),
+            })
+    return out
+
+
+def main(rows: int = 200, latency: float = 0.3) -> None:
+    frames = {name: _recorded_frame(rows, i) for i, name in enumerate(j.AK_QDII_FUNCS)}
+
+    def make_fn(name):
+        def fn():
+            time.sleep(latency)
+            return frames[name].copy()
+        return fn
+
+    fake_ak = types.SimpleNamespace(**{name: make_fn(name) for name in frames})
+    sys.modules["akshare"] = fake_ak  # type: ignore
+
+    print(f"{len(frames)} 个数据集 × {rows} 行，模拟网络延迟 {latency}s\n")
+
+    # 纯转换开销
+    datasets = list(frames.values())
+    start = time.perf_counter()
+    old = _legacy_rows(datasets)
+    t_old = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [r for df in datasets for r in j._ak_df_to_rows(df)]
+    t_new = time.perf_counter() - start
+    assert old == new, "新旧实现输出不一致"
+    print(f"行转换    旧: {t_old * 1000:8.2f} ms   新: {t_new * 1000:8.2f} ms   加速 {t_old / t_new:5.1f}x")
+
+    # 端到端：串行获取 + iterrows vs 并行获取 + 按列转换
+    start = time.perf_counter()
+    _legacy_rows([getattr(fake_ak, n)() for n in j.AK_QDII_FUNCS])
+    t_old = time.perf_counter() - start
+    start = time.perf_counter()
+    j._fetch_ak_rows()
+    t_new = time.perf_counter() - start
+    print(f"端到端    旧: {t_old * 1000:8.2f} ms   新: {t_new * 1000:8.2f} ms   加速 {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.3,
+    )
@@ -0,0 +1,84 @@
+"""
+服务器入口导入耗时基准
+在独立子进程中以 `python -X importtime` 导入 server/mcp_server.py（不启动服务），解析导入耗时报告：
+- 入口模块总导入耗时（多次运行取中位数）
+- 按顶层包汇总的耗时排行
+- 启动时是否导入了应延迟加载的重型库（numpy / pandas / akshare）
+
+运行方式（项目根目录）:
+    python benchmarks/bench_import_time.py [运行次数] [--budget 毫秒]
+给出 --budget 时，入口导入耗时中位数超过预算则以非零状态退出，可用于 CI 跟踪启动开销。
+"""
+import os
+import re
+import sys
+import statistics
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+
+LAZY_MODULES = ("numpy", "pandas", "akshare")
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def _run_once() -> List[Tuple[int, int, int, str]]:
+    # 返回 [(自身耗时 us, 累计耗时 us, 缩进层级, 模块名)]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mcp_server"],
+        capture_output=True, text=True, cwd=SERVER_DIR, env=env, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)))
+    return rows
+
+
+def _by_package(rows: List[Tuple[int, int, int, str]]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def main(runs: int = 5, budget_ms: float = 0.0) -> int:
+    totals: List[float] = []
+    last: List[Tuple[int, int, int, str]] = []
+    for _ in range(runs):
+        last = _run_once()
+        total = next((cum for _, cum, _, name in last if name == "mcp_server"), 0)
+        totals.append(total / 1000)
+    median = statistics.median(totals)
+    print(f"mcp_server 导入耗时（{runs} 次）: 中位数 {median:.1f} ms，最小 {min(totals):.1f} ms，最大 {max(totals):.1f} ms\n")
+
+    print("按顶层包汇总（最后一次运行，自身耗时之和）:")
+    for pkg, us in sorted(_by_package(last).items(), key=lambda kv: -kv[1])[:12]:
+        print(f"  {pkg:<24} {us / 1000:8.1f} ms")
+
+    print("\n项目模块:")
+    for self_us, cum_us, _, name in last:
+        if name == "mcp_server" or name.startswith("modules.") or name.startswith("config."):
+            print(f"  {name:<32} 自身 {self_us / 1000:7.1f} ms   累计 {cum_us / 1000:7.1f} ms")
+
+    loaded = sorted({name for _, _, _, name in last if name in LAZY_MODULES})
+    print(f"\n启动时导入的重型库: {', '.join(loaded) if loaded else '无'}")
+
+    if budget_ms and median > budget_ms:
+        print(f"\n超出预算: {median:.1f} ms > {budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = 0.0
+    if "--budget" in args:
+        i = args.index("--budget")
+        budget = float(args[i + 1])
+        del args[i:i + 2]
+    sys.exit(main(int(args[0]) if args else 5, budget))
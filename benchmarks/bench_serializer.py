@@ -0,0 +1,96 @@
+"""
+工具返回结果序列化基准
+使用与 stock_zh_a_spot_em 列结构一致的全市场行情表（含停牌股的缺失值），对比旧实现
+（to_dict('records') + 逐格 hasattr 判断 + json.dumps(ensure_ascii=False)）与
+server/modules/serializer.py（按 dtype 整列转换 + 紧凑编码）的耗时和输出字节数。
+
+运行方式（项目根目录）:
+    python benchmarks/bench_serializer.py [行数] [重复次数]
+"""
+import os
+import sys
+import json
+import math
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from server.modules import serializer
+
+SPOT_FLOAT_COLUMNS = [
+    "最新价", "涨跌幅", "涨跌额", "成交量", "成交额", "振幅", "最高", "最低", "今开", "昨收", "量比",
+    "换手率", "市盈率-动态", "市净率", "总市值", "流通市值", "涨速", "5分钟涨跌", "60日涨跌幅", "年初至今涨跌幅",
+]
+
+
+def _spot_frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "序号": np.arange(1, n + 1),
+        "代码": [f"{i:06d}" for i in range(n)],
+        "名称": [f"股票{i}" for i in range(n)],
+    })
+    for col in SPOT_FLOAT_COLUMNS:
+        df[col] = rng.uniform(-10, 1000, n).round(2)
+    # 约 2% 停牌，行情字段为 NaN
+    suspended = rng.random(n) < 0.02
+    df.loc[suspended, SPOT_FLOAT_COLUMNS[:12]] = np.nan
+    return df
+
+
+def _legacy(df: pd.DataFrame) -> str:
+    records = []
+    for record in df.to_dict('records'):
+        processed = {}
+        for key, value in record.items():
+            if hasattr(value, 'item'):
+                processed[key] = value.item()
+            elif hasattr(value, 'isoformat'):
+                processed[key] = value.isoformat()
+            else:
+                processed[key] = value
+        records.append(processed)
+    return json.dumps({"success": True, "count": len(records), "data": records}, ensure_ascii=False)
+
+
+def _new(df: pd.DataFrame) -> str:
+    records = serializer.records(df)
+    return serializer.dumps({"success": True, "count": len(records), "data": records})
+
+
+def _normalize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 旧实现把 NaN 输出为非标准 JSON 的 NaN，比较前统一为 None
+    return [{k: None if isinstance(v, float) and math.isnan(v) else v for k, v in r.items()} for r in rows]
+
+
+def _timeit(fn, df: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows: int = 5600, repeat: int = 5) -> None:
+    df = _spot_frame(rows)
+    old, new = _legacy(df), _new(df)
+    assert _normalize(json.loads(old)["data"]) == json.loads(new)["data"], "新旧实现输出不一致"
+
+    t_old, t_new = _timeit(_legacy, df, repeat), _timeit(_new, df, repeat)
+    b_old, b_new = len(old.encode("utf-8")), len(new.encode("utf-8"))
+    encoder = "orjson" if serializer.orjson is not None else "json"
+    print(f"全市场行情表 {rows} 行 × {df.shape[1]} 列，编码器: {encoder}，取 {repeat} 次最好成绩\n")
+    print(f"耗时    旧: {t_old * 1000:8.2f} ms   新: {t_new * 1000:8.2f} ms   加速 {t_old / t_new:5.1f}x")
+    print(f"字节    旧: {b_old:10d}   新: {b_new:10d}   减少 {(1 - b_new / b_old) * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5600,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
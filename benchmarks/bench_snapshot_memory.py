@@ -0,0 +1,150 @@
+"""
+常驻快照内存基准
+分别在独立子进程中构建并持有快照，报告 RSS 增量（旧表示 vs 紧凑表示）：
+- A股全市场行情：DataFrame + {代码: 行号} 字典  vs  CompactFrame
+- 期货主力合约列表：to_dict 字典列表  vs  CompactFrame
+- 集思录版本历史：每个版本各自持有解析出的字符串  vs  驻留字符串后各版本共享
+
+运行方式（项目根目录）:
+    python benchmarks/bench_snapshot_memory.py [A股行数] [持有份数]
+"""
+import os
+import sys
+import gc
+import json
+import subprocess
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SPOT_FLOAT_COLUMNS = [
+    "最新价", "涨跌幅", "涨跌额", "成交量", "成交额", "振幅", "最高", "最低", "今开", "昨收", "量比",
+    "换手率", "市盈率-动态", "市净率", "总市值", "流通市值", "涨速", "5分钟涨跌", "60日涨跌幅", "年初至今涨跌幅",
+]
+FUTURES_COLUMNS = [
+    "open", "high", "low", "current_price", "bid_price", "ask_price", "buy_vol", "sell_vol",
+    "hold", "volume", "avg_price", "last_close", "last_settle_price",
+]
+JISILU_VERSIONS = 120
+
+
+def _rss() -> int:
+    # 当前进程常驻内存（字节）
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _spot_frame(n: int, seed: int) -> Any:
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    codes = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(n)]
+    df = pd.DataFrame({
+        "序号": np.arange(1, n + 1),
+        "代码": pd.Series(codes, dtype=object),
+        "名称": pd.Series([f"股票{i}" for i in range(n)], dtype=object),
+    })
+    for col in SPOT_FLOAT_COLUMNS:
+        df[col] = rng.uniform(1, 500, n).round(2)
+    df["总市值"] = rng.uniform(1e9, 2e12, n).round(0)
+    df["流通市值"] = rng.uniform(1e9, 2e12, n).round(0)
+    df["成交额"] = rng.uniform(1e6, 1e10, n).round(0)
+    df.loc[rng.random(n) < 0.02, SPOT_FLOAT_COLUMNS[:12]] = np.nan
+    return df
+
+
+def _futures_frame(seed: int) -> Any:
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n = 80
+    df = pd.DataFrame({
+        "symbol": pd.Series([f"品种{i}2605" for i in range(n)], dtype=object),
+        "time": pd.Series(["145959"] * n, dtype=object),
+    })
+    for col in FUTURES_COLUMNS:
+        df[col] = rng.uniform(100, 90000, n).round(1)
+    return df
+
+
+def _jisilu_rows(seed: int) -> List[Dict[str, Any]]:
+    # 与解析 JSON 响应一样，每个快照都生成新的字符串对象（encode/decode 得到新对象）
+    statuses = ["限额申购", "暂停申购", "开放申购", "限大额"]
+    return [
+        {
+            "代码": f"{513000 + i:06d}",
+            "名称": f"QDII基金{i}",
+            "T-1溢价率": f"{(seed + i) % 7 - 1.5:.2f}%",
+            "申购状态": statuses[(seed + i) % 4].encode().decode(),
+        }
+        for i in range(400)
+    ]
+
+
+def _child(scenario: str, variant: str, rows: int, copies: int) -> int:
+    import numpy as np  # noqa: F401
+    import pandas as pd  # noqa: F401
+    from server.modules.compact_frame import CompactFrame
+    from server.modules import jisilu_mcp_server as j
+
+    gc.collect()
+    before = _rss()
+    held: List[Any] = []
+    if scenario == "spot":
+        for i in range(copies):
+            df = _spot_frame(rows, i)
+            if variant == "old":
+                held.append((df, dict(zip(df["代码"].astype(str), range(len(df))))))
+            else:
+                held.append(CompactFrame(df, key="代码"))
+            del df
+    elif scenario == "futures":
+        for i in range(copies):
+            df = _futures_frame(i)
+            held.append(df.to_dict(orient="records") if variant == "old" else CompactFrame(df, key="symbol"))
+            del df
+    else:
+        for i in range(JISILU_VERSIONS):
+            rows_i = _jisilu_rows(i)
+            held.append(j.QdiiColumns(rows_i if variant == "old" else j._intern_rows(rows_i)))
+            del rows_i
+    gc.collect()
+    return (_rss() - before) // max(1, copies if scenario != "jisilu" else 1)
+
+
+def _run(scenario: str, variant: str, rows: int, copies: int) -> int:
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", scenario, variant, str(rows), str(copies)],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return int(json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+def main(rows: int = 5600, copies: int = 20) -> None:
+    labels = {
+        "spot": f"A股全市场行情（{rows} 行，每份）",
+        "futures": "期货主力合约列表（80 行，每份）",
+        "jisilu": f"集思录版本历史（{JISILU_VERSIONS} 个版本合计）",
+    }
+    print(f"各场景在独立子进程中持有 {copies} 份快照后测量 RSS 增量\n")
+    for scenario, label in labels.items():
+        old, new = _run(scenario, "old", rows, copies), _run(scenario, "new", rows, copies)
+        saved = (1 - new / old) * 100 if old > 0 else 0.0
+        print(f"{label:<28} 旧: {old / 1024:9.1f} KiB   新: {new / 1024:9.1f} KiB   减少 {saved:5.1f}%")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(_child(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))))
+    else:
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 5600,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+        )
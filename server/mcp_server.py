@@ -6,10 +6,16 @@ LastEditTime: 2025-12-05 16:52:41
 '''
 import os
 import sys
+import asyncio
 import logging
-from typing import Any, Dict, List
-from fastmcp import FastMCP
+import concurrent.futures
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from fastmcp import Context, FastMCP
 import httpx
+from pydantic import AnyUrl
+from starlette.requests import Request
+from starlette.responses import Response
 
 # 添加父目录到系统路径，以便导入 config 模块
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -18,27 +24,173 @@ from modules import jisilu_mcp_server as j
 from modules import wechat_server as w
 from modules import stock_server as s
 from modules import futures_server as f
+from modules import http_client as http
+from modules import premium_store as ps
+from modules import scheduler as sched
+from modules import serializer as serialize
+from modules import singleflight
+from modules import executor as ex
+from modules import warmup
+from modules import futures_subscription as fsub
+from modules import spread_engine as spreads
 
 # 配置日志
 from config.logging_config import setup_logging
 logger = setup_logging()
 
+# 溢价率历史存储：每个新的集思录快照都由后台线程写入
+premium_store = ps.PremiumStore()
+j.add_snapshot_listener(premium_store.record_snapshot)
+
+# 交易时段内的后台预取任务，间隔可通过环境变量配置
+scheduler = sched.Scheduler()
+# 阻塞的同步工具与预取任务按上游放到各自的有界线程池中执行，互不占用对方的并发额度
+scheduler.add_job("qdii_snapshot", j.refresh_snapshot, sched.env_interval("PREFETCH_QDII_INTERVAL", 45), session="stock", lane="jisilu")
+scheduler.add_job("stock_spot", s.refresh_spot_table, sched.env_interval("PREFETCH_STOCK_INTERVAL", 10), session="stock", lane="eastmoney")
+scheduler.add_job("futures_main", f.refresh_futures_main_list, sched.env_interval("PREFETCH_FUTURES_INTERVAL", 8), session="futures", lane="sina")
+# 按 config.json 中配置的价差定期采样，使 z-score 的滚动窗口在无人调用时也持续积累
+scheduler.add_job("futures_spreads", spreads.refresh_configured_spreads, sched.env_interval("PREFETCH_SPREAD_INTERVAL", 30), session="futures", lane="sina")
+
+# 期货行情订阅：所有订阅者共用一个轮询任务，每轮每个市场只请求一次上游
+futures_hub = fsub.SubscriptionHub()
+scheduler.add_job("futures_subscriptions", futures_hub.poll_once, sched.env_interval("FUTURES_SUB_INTERVAL", 3), session="futures", lane="sina")
+SUBSCRIPTION_URI = "futures://subscriptions/{subscriber_id}"
+# 订阅者所在的 MCP 会话与事件循环，轮询到变化时发送 resources/updated 通知
+_subscriber_sessions: Dict[str, Tuple[Any, asyncio.AbstractEventLoop]] = {}
+
+def _notify_subscribers(subscriber_ids: List[str]) -> None:
+    """在轮询线程中调用：向有新变化的订阅者会话发送资源更新通知"""
+    active = set(futures_hub.subscriber_ids())
+    for sid in [sid for sid in _subscriber_sessions if sid not in active]:
+        _subscriber_sessions.pop(sid, None)
+    for sid in subscriber_ids:
+        entry = _subscriber_sessions.get(sid)
+        if entry is None:
+            continue
+        session, loop = entry
+        uri = AnyUrl(SUBSCRIPTION_URI.format(subscriber_id=sid))
+        try:
+            fut = asyncio.run_coroutine_threadsafe(session.send_resource_updated(uri), loop)
+        except RuntimeError:
+            # 事件循环已关闭
+            _subscriber_sessions.pop(sid, None)
+            continue
+        fut.add_done_callback(lambda fut, sid=sid: _drop_failed_session(sid, fut))
+
+def _drop_failed_session(sid: str, fut: "concurrent.futures.Future[Any]") -> None:
+    # 通知发送失败（会话已断开）时移除该订阅者会话；被取消的 future 调用 exception() 会抛出 CancelledError
+    if fut.cancelled():
+        return
+    if fut.exception() is not None:
+        _subscriber_sessions.pop(sid, None)
+
+futures_hub.add_listener(_notify_subscribers)
+
+async def _warm_up() -> None:
+    """后台预热：先导入重型库，再启动预取调度器（交易日历与预取都依赖 akshare）"""
+    await asyncio.to_thread(warmup.import_heavy_modules)
+    if sched.enabled():
+        await scheduler.start()
+
+def _readiness() -> Dict[str, Any]:
+    return warmup.status({
+        "qdii_snapshot": (j.cached_snapshot_age, scheduler.prefetching("qdii_snapshot")),
+        "stock_spot": (s.spot_cache_age, scheduler.prefetching("stock_spot")),
+        "futures_main": (f.main_list_cache_age, scheduler.prefetching("futures_main")),
+    })
+
+@asynccontextmanager
+async def lifespan(app: FastMCP) -> AsyncIterator[None]:
+    """服务器生命周期：后台预热并启动预取，不阻塞端口打开；退出时停止预取、关闭共享 HTTP 连接池与执行线程池并写完历史数据"""
+    startup = asyncio.create_task(_warm_up(), name="warm-up")
+    try:
+        yield
+    finally:
+        startup.cancel()
+        await asyncio.gather(startup, return_exceptions=True)
+        await scheduler.stop()
+        logger.info("关闭共享 HTTP 客户端")
+        await http.aclose()
+        ex.shutdown()
+        premium_store.close()
+
 # 初始化 MCP 服务器
-mcp = FastMCP("arbitrage-suite")
+mcp = FastMCP("arbitrage-suite", lifespan=lifespan)
 
 @mcp.tool(description="获取QDII溢价套利候选列表")
-def fetch_qdii_candidates(threshold: float = 2.0) -> str:
+async def fetch_qdii_candidates(threshold: float = 2.0, force_refresh: bool = False) -> str:
     """
     获取QDII溢价套利候选列表
 
     Args:
         threshold: 溢价率阈值，默认为2.0%
+        force_refresh: 是否忽略快照缓存强制重新抓取，默认为 False
+    """
+    logger.info(f"调用 fetch_qdii_candidates, threshold={threshold}, force_refresh={force_refresh}")
+    result = await ex.run("jisilu", j.qdii_candidates_with_meta, threshold, force_refresh)
+    logger.info(f"获取到 {result['count']} 只候选基金，快照年龄 {result['snapshot_age']}s")
+    return serialize.dumps(result)
+
+@mcp.tool(description="基于同一快照批量查询多个溢价率阈值或按基金分别设定阈值的QDII套利候选")
+async def fetch_qdii_candidates_multi(
+    thresholds: List[float] | None = None,
+    fund_thresholds: Dict[str, float] | None = None,
+    default_threshold: float | None = None,
+    force_refresh: bool = False,
+) -> str:
+    """
+    批量获取QDII溢价套利候选，一次遍历回答全部阈值
+
+    Args:
+        thresholds: 溢价率阈值列表，如 [1.0, 2.0, 5.0]，每个阈值返回一组候选
+        fund_thresholds: 按基金代码单独设定的阈值，如 {"513100": 3.0}
+        default_threshold: 未在 fund_thresholds 中列出的基金所用阈值，默认只查询列出的基金
+        force_refresh: 是否忽略快照缓存强制重新抓取，默认为 False
+    """
+    logger.info(f"调用 fetch_qdii_candidates_multi, thresholds={thresholds}, funds={len(fund_thresholds or {})}")
+    result = await ex.run("jisilu", j.qdii_candidates_multi, thresholds, fund_thresholds, default_threshold, force_refresh)
+    return serialize.dumps(result)
+
+@mcp.tool(description="获取相对上一版本新进入、退出或明显变化的QDII套利候选（增量）")
+async def fetch_qdii_candidate_changes(
+    threshold: float = 2.0,
+    since_version: int | None = None,
+    premium_delta: float = 0.5,
+    force_refresh: bool = False,
+) -> str:
+    """
+    增量获取QDII溢价套利候选变化
+
+    Args:
+        threshold: 溢价率阈值，默认为2.0%
+        since_version: 上次响应中的 snapshot_version，不传或已过期时返回全部候选
+        premium_delta: 溢价率变动达到该百分点数视为变化，默认 0.5
+        force_refresh: 是否忽略快照缓存强制重新抓取，默认为 False
+    """
+    logger.info(f"调用 fetch_qdii_candidate_changes, threshold={threshold}, since_version={since_version}")
+    result = await ex.run("jisilu", j.qdii_candidate_changes, threshold, since_version, premium_delta, force_refresh)
+    logger.info(f"候选变化: {result['count']}，版本 {since_version} -> {result['snapshot_version']}")
+    return serialize.dumps(result)
+
+@mcp.tool(description="查询单只QDII/LOF基金的溢价率历史，可按周期重采样")
+async def get_premium_history(code: str, start: str = "", end: str = "", resample: str = "") -> str:
+    """
+    查询单只QDII/LOF基金的溢价率历史（来自本地存储的集思录快照）
+
+    Args:
+        code: 基金代码，如 "513100"
+        start: 开始时间（北京时间），格式 "YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM"，默认当天 00:00
+        end: 结束时间（北京时间），默认当前时间
+        resample: 重采样周期，如 "5min"、"1h"、"1D"，默认返回原始采样点
     """
-    import json
-    logger.info(f"调用 fetch_qdii_candidates, threshold={threshold}")
-    result = j.qdii_candidates(threshold)
-    logger.info(f"获取到 {len(result)} 只候选基金")
-    return json.dumps(result, ensure_ascii=False)
+    logger.info(f"调用 get_premium_history, code={code}, start={start}, end={end}, resample={resample}")
+    try:
+        result = await ex.run("local", premium_store.query, code, start, end, resample)
+        result["success"] = True
+    except Exception as e:
+        logger.warning(f"查询基金 {code} 溢价率历史失败: {e}")
+        result = {"success": False, "code": code, "error": str(e)}
+    return serialize.dumps(result)
 
 @mcp.tool(description="发送微信通知")
 async def send_wechat(title: str, desp: str) -> str:
@@ -49,74 +201,276 @@ async def send_wechat(title: str, desp: str) -> str:
         title: 通知的标题
         desp: 通知的详细内容
     """
-    import json
     logger.info(f"调用 send_wechat, title={title}")
     result = await w.send_wechat(title, desp)
     logger.info(f"微信通知发送完成: {result.get('status_code', 'unknown')}")
-    return json.dumps(result, ensure_ascii=False)
+    return serialize.dumps(result)
 
 @mcp.tool(description="获取A股单只股票的实时行情数据")
-def get_stock_realtime(symbol: str) -> str:
+async def get_stock_realtime(symbol: str) -> str:
     """
     获取A股单只股票的实时行情数据
 
     Args:
         symbol: 股票代码，6位数字，如 "000001" 或 "600000"
     """
-    import json
     logger.info(f"调用 get_stock_realtime, symbol={symbol}")
-    result = s.get_stock_realtime(symbol)
+    result = await ex.run("eastmoney", s.get_stock_realtime, symbol)
     if result.get("success"):
         logger.info(f"成功获取股票 {symbol} 的实时行情数据")
     else:
         logger.warning(f"获取股票 {symbol} 实时行情失败: {result.get('error', 'unknown')}")
-    return json.dumps(result, ensure_ascii=False)
+    return serialize.dumps(result)
+
+@mcp.tool(description="批量获取多只A股的实时行情数据，可只返回指定字段")
+async def get_stock_realtime_batch(symbols: List[str], fields: List[str] | None = None) -> str:
+    """
+    批量获取多只A股的实时行情数据（共用同一份全市场行情快照）
+
+    Args:
+        symbols: 股票代码列表，如 ["000001", "600519"]
+        fields: 需要返回的字段，如 ["名称", "最新价", "涨跌幅"]，默认返回全部字段
+    """
+    logger.info(f"调用 get_stock_realtime_batch, symbols={len(symbols)}, fields={fields}")
+    result = await ex.run("eastmoney", s.get_stock_realtime_batch, symbols, fields)
+    if not result.get("success"):
+        logger.warning(f"批量获取实时行情失败: {result.get('error', 'unknown')}")
+    return serialize.dumps(result)
 
 @mcp.tool(description="获取A股单只股票的历史行情数据")
-def get_stock_hist(symbol: str, period: str = "daily", adjust: str = "") -> str:
+async def get_stock_hist(
+    symbol: str,
+    period: str = "daily",
+    adjust: str = "",
+    start_date: str = "",
+    end_date: str = "",
+    limit: int = 10,
+) -> str:
     """
-    获取A股单只股票的历史行情数据（最近10条记录）
+    获取A股单只股票的历史行情数据（默认最近10条记录）
 
     Args:
         symbol: 股票代码，6位数字，如 "000001" 或 "600000"
-        period: 周期，可选 "daily"(日K), "weekly"(周K), "monthly"(月K)，默认为 "daily"
+        period: 周期，可选 "daily"(日K), "weekly"(周K), "monthly"(月K), "quarterly"(季K)，
+            或自定义 "<N>D/W/M/Q"（如 "5D"、"2W"），默认为 "daily"
         adjust: 复权类型，可选 ""(不复权), "qfq"(前复权), "hfq"(后复权)，默认为 ""
+        start_date: 开始日期，格式 "YYYYMMDD" 或 "YYYY-MM-DD"，默认不限
+        end_date: 结束日期（含），格式同上，默认不限
+        limit: 返回范围内最近的K线根数，默认为 10，小于等于 0 时返回范围内全部
     """
-    import json
-    logger.info(f"调用 get_stock_hist, symbol={symbol}, period={period}, adjust={adjust}")
-    result = s.get_stock_hist(symbol, period, adjust)
+    logger.info(f"调用 get_stock_hist, symbol={symbol}, period={period}, adjust={adjust}, start_date={start_date}, end_date={end_date}, limit={limit}")
+    result = await ex.run("eastmoney", s.get_stock_hist, symbol, period, adjust, start_date, end_date, limit)
     if result.get("success"):
         logger.info(f"成功获取股票 {symbol} 的历史行情数据，返回 {result.get('count', 0)} 条记录")
     else:
         logger.warning(f"获取股票 {symbol} 历史行情失败: {result.get('error', 'unknown')}")
-    return json.dumps(result, ensure_ascii=False)
+    return serialize.dumps(result)
 
 @mcp.tool(description="获取国内期货单只合约的实时行情数据")
-def get_futures_realtime(symbol: str) -> str:
+async def get_futures_realtime(symbol: str, market: str = "") -> str:
     """
     获取国内期货单只合约的实时行情数据
 
     Args:
-        symbol: 期货代码，如 "RB2505" 或 "AG2604"
+        symbol: 期货代码，如 "RB2505"、"AG2604" 或 "IF2512"
+        market: 市场类型，"CF" 表示商品期货，"FF" 表示金融期货，默认按品种所属交易所自动选择
     """
-    import json
-    logger.info(f"调用 get_futures_realtime, symbol={symbol}")
-    result = f.get_futures_realtime(symbol)
+    logger.info(f"调用 get_futures_realtime, symbol={symbol}, market={market}")
+    result = await ex.run("sina", f.get_futures_realtime, symbol, market or None)
     if result.get("success"):
         logger.info(f"成功获取期货 {symbol} 的实时行情数据")
     else:
         logger.warning(f"获取期货 {symbol} 实时行情失败: {result.get('error', 'unknown')}")
-    return json.dumps(result, ensure_ascii=False)
+    return serialize.dumps(result)
+
+@mcp.tool(description="批量获取多个期货合约的实时行情（商品与金融期货可混合，自动按交易所选择市场）")
+async def get_futures_realtime_batch(symbols: List[str]) -> str:
+    """
+    批量获取期货合约实时行情。每个合约按品种所属交易所路由到商品期货（CF）或金融期货（FF）市场，
+    每个市场最多请求一次上游，结果按合约代码返回
+
+    Args:
+        symbols: 期货代码列表，如 ["RB2605", "M2609", "IF2512", "T2603"]
+    """
+    logger.info(f"调用 get_futures_realtime_batch, symbols={symbols}")
+    result = await ex.run("sina", f.get_futures_realtime_batch, symbols)
+    if result.get("success"):
+        logger.info(f"成功获取 {result['count']} 个期货合约的实时行情")
+    else:
+        logger.warning(f"批量获取期货实时行情失败: {result.get('error', 'unknown')}")
+    return serialize.dumps(result)
 
 @mcp.tool(description="获取国内期货主力合约行情列表（全部数据）")
-def get_futures_main_list() -> str:
+async def get_futures_main_list() -> str:
     """
     获取国内期货主力合约行情列表（全部数据）
     """
-    import json
     logger.info("调用 get_futures_main_list")
-    result = f.get_futures_main_list()
-    return json.dumps(result, ensure_ascii=False)
+    result = await ex.run("sina", f.get_futures_main_list)
+    return serialize.dumps(result)
+
+def _subscriber_id(subscriber_id: str, ctx: Context | None) -> str:
+    # 未指定订阅者标识时使用当前 MCP 会话标识
+    if subscriber_id:
+        return subscriber_id
+    session_id = ctx.session_id if ctx is not None else None
+    return session_id or "default"
+
+@mcp.tool(description="订阅期货合约实时行情，之后通过通知或 poll_futures_updates 只取回变化的字段")
+async def subscribe_futures(symbols: List[str], market: str = "", subscriber_id: str = "", ctx: Context | None = None) -> str:
+    """
+    订阅期货合约实时行情。服务器由一个共享轮询任务按交易时段批量获取所有订阅合约的行情（每个市场一次请求），
+    每次有变化时向订阅者会话发送资源 futures://subscriptions/{subscriber_id} 的更新通知
+
+    Args:
+        symbols: 合约代码列表，如 ["RB2605", "M2605"]
+        market: 市场类型，"CF" 表示商品期货，"FF" 表示金融期货，默认按品种所属交易所自动选择
+        subscriber_id: 订阅者标识，默认使用当前会话标识
+    """
+    sid = _subscriber_id(subscriber_id, ctx)
+    logger.info(f"调用 subscribe_futures, subscriber={sid}, symbols={symbols}, market={market}")
+    try:
+        result = futures_hub.subscribe(sid, symbols, market)
+    except ValueError as e:
+        return serialize.dumps({"success": False, "error": str(e)})
+    if ctx is not None:
+        _subscriber_sessions[sid] = (ctx.session, asyncio.get_running_loop())
+    if futures_hub.has_pending_initial():
+        # 新合约立即取一次行情，作为首次更新返回
+        try:
+            await ex.run("sina", futures_hub.poll_once)
+        except Exception as e:
+            logger.warning(f"订阅后首次获取行情失败: {e}")
+    result.update(futures_hub.updates(sid))
+    result["success"] = True
+    result["resource"] = SUBSCRIPTION_URI.format(subscriber_id=sid)
+    return serialize.dumps(result)
+
+@mcp.tool(description="取消期货合约行情订阅")
+def unsubscribe_futures(symbols: List[str] | None = None, subscriber_id: str = "", ctx: Context | None = None) -> str:
+    """
+    取消期货合约行情订阅
+
+    Args:
+        symbols: 要取消的合约代码列表，默认取消全部
+        subscriber_id: 订阅者标识，默认使用当前会话标识
+    """
+    sid = _subscriber_id(subscriber_id, ctx)
+    result = futures_hub.unsubscribe(sid, symbols)
+    if not result["symbols"]:
+        _subscriber_sessions.pop(sid, None)
+    result["success"] = True
+    return serialize.dumps(result)
+
+def _subscription_updates(sid: str) -> str:
+    try:
+        result = futures_hub.updates(sid)
+        result["success"] = True
+    except KeyError as e:
+        result = {"success": False, "subscriber_id": sid, "error": e.args[0]}
+    return serialize.dumps(result)
+
+@mcp.tool(description="取回已订阅期货合约自上次以来变化的行情字段")
+def poll_futures_updates(subscriber_id: str = "", ctx: Context | None = None) -> str:
+    """
+    取回已订阅合约自上次取回以来变化的字段（{合约代码: {字段: 新值}}），首次取回为完整行情
+
+    Args:
+        subscriber_id: 订阅者标识，默认使用当前会话标识
+    """
+    return _subscription_updates(_subscriber_id(subscriber_id, ctx))
+
+@mcp.resource(SUBSCRIPTION_URI, mime_type="application/json", description="期货行情订阅的增量更新（读取后游标前移）")
+def futures_subscription_updates(subscriber_id: str) -> str:
+    """订阅者自上次读取以来变化的行情字段"""
+    return _subscription_updates(subscriber_id)
+
+@mcp.tool(description="重新解析各交易所期货主力合约代码（换月后立即生效），返回解析结果与主力切换")
+async def refresh_futures_main_contracts() -> str:
+    """
+    手动重新解析期货主力合约代码。主力合约按交易日缓存，并在检测到持仓量明显回落（疑似移仓）时自动重新解析；
+    该工具用于在换月当天立即切换到新的主力合约
+    """
+    logger.info("调用 refresh_futures_main_contracts")
+    try:
+        result = await ex.run("sina", f.refresh_main_contracts)
+        result["success"] = True
+    except Exception as e:
+        logger.warning(f"重新解析期货主力合约失败: {e}")
+        result = {"success": False, "error": str(e)}
+    return serialize.dumps(result)
+
+@mcp.tool(description="计算期货跨期价差、压榨/裂解等组合价差与比价，返回滚动 z-score 与跨期年化 carry")
+async def get_futures_spreads(
+    products: Dict[str, List[str]] | None = None,
+    pairs: List[Dict[str, Any]] | None = None,
+    window: int | None = None,
+) -> str:
+    """
+    计算期货价差。行情取自价差引擎的合约行情缓存（过期合约每个市场合并为一次请求刷新），全部价差以矩阵运算一次算出；
+    z-score 基于每次新行情追加的滚动样本，跨期价差另给出年化 carry（%）。products 与 pairs 都不传时使用 config.json 中 futures_spreads 的配置
+
+    Args:
+        products: {品种: [月份]}，为相邻月份生成跨期价差，如 {"RB": ["2605", "2610", "2701"]}
+        pairs: 自定义价差，如 [{"type": "calendar", "near": "M2605", "far": "M2609"},
+            {"name": "大豆压榨", "type": "spread", "legs": {"M2605": 0.785, "Y2605": 0.185, "A2605": -1}},
+            {"type": "ratio", "numerator": "Y2605", "denominator": "P2605"}]
+        window: z-score 滚动窗口样本数，默认 240
+    """
+    logger.info(f"调用 get_futures_spreads, products={products}, pairs={pairs}, window={window}")
+    try:
+        result = await ex.run("sina", spreads.compute_spreads, products, pairs, window)
+        result["success"] = True
+    except Exception as e:
+        logger.warning(f"计算期货价差失败: {e}")
+        result = {"success": False, "error": str(e)}
+    return serialize.dumps(result)
+
+@mcp.tool(description="查看数据缓存统计（命中率、刷新次数与刷新耗时）")
+def get_cache_stats() -> str:
+    """
+    查看数据缓存统计
+    """
+    result = {
+        "stock_spot": s.spot_cache_stats(),
+        # 主力合约代码按期货交易日缓存，移仓或手动刷新时重新解析
+        "futures_main_contracts": f.main_contracts_status(),
+        # 订阅轮询：上游调用数只随不同合约与市场数增长
+        "futures_subscriptions": futures_hub.stats(),
+        "futures_spreads": spreads.stats(),
+        # 并发相同请求的合并情况：calls 为调用数，executions 为实际上游下载数，coalesced 为搭便车的调用数
+        "coalescing": singleflight.stats(),
+    }
+    return serialize.dumps(result)
+
+@mcp.tool(description="查看后台预取调度器状态（各任务最近运行时间、耗时与失败信息）")
+def get_scheduler_status() -> str:
+    """
+    查看后台预取调度器状态
+    """
+    return serialize.dumps(scheduler.status())
+
+@mcp.tool(description="查看执行层各上游线程池的并发、排队深度与等待耗时")
+def get_executor_stats() -> str:
+    """
+    查看执行层统计：每个上游（eastmoney / sina / jisilu / local）的并发上限、运行中与排队任务数、
+    历史最大排队深度、平均/最大排队等待与平均执行耗时
+    """
+    return serialize.dumps(ex.stats())
+
+@mcp.tool(description="查看服务就绪状态（重型库预热与各数据缓存是否已加载）")
+def get_readiness() -> str:
+    """
+    查看服务就绪状态：重型库（numpy / pandas / akshare）预热耗时，以及集思录快照、A股全市场行情、
+    期货主力合约缓存是否已加载；处于交易时段且启用预取的缓存全部加载后 ready 为 true
+    """
+    return serialize.dumps(_readiness())
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> Response:
+    """就绪探针：就绪返回 200，否则返回 503，响应体与 get_readiness 相同"""
+    result = _readiness()
+    return Response(serialize.dumps(result), status_code=200 if result["ready"] else 503, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,290 @@
+"""
+A股历史K线本地缓存
+按 (代码, 周期, 复权类型) 把 akshare 历史行情保存在本地 SQLite 中，
+之后每次只从当日之前最后一根已收盘的K线起增量下载并合并（当日/当周K线可能仍在形成）；
+检测到复权价格变化（除权除息等公司行为）时才整段重新下载。
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .trading_calendar import CN_TZ
+except ImportError:
+    from trading_calendar import CN_TZ  # type: ignore
+
+logger = logging.getLogger('bar_store')
+
+# akshare stock_zh_a_hist 列名 -> 存储列名
+BAR_COLUMNS: List[Tuple[str, str]] = [
+    ("日期", "date"),
+    ("开盘", "open"),
+    ("收盘", "close"),
+    ("最高", "high"),
+    ("最低", "low"),
+    ("成交量", "volume"),
+    ("成交额", "amount"),
+    ("振幅", "amplitude"),
+    ("涨跌幅", "pct_change"),
+    ("涨跌额", "change"),
+    ("换手率", "turnover"),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    period TEXT NOT NULL,
+    adjust TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, close REAL, high REAL, low REAL,
+    volume REAL, amount REAL, amplitude REAL, pct_change REAL, change REAL, turnover REAL,
+    PRIMARY KEY (symbol, period, adjust, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bar_sync (
+    symbol TEXT NOT NULL,
+    period TEXT NOT NULL,
+    adjust TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    full_refreshes INTEGER NOT NULL DEFAULT 0,
+    covered_from TEXT,
+    PRIMARY KEY (symbol, period, adjust)
+);
+"""
+
+# 整段下载的起点（早于任何A股上市日期）
+LISTING_START = "1970-01-01"
+
+# 比较重叠K线时允许的相对误差
+_PRICE_TOLERANCE = 1e-6
+
+
+def default_db_path() -> str:
+    # 默认位于项目根目录 data/ 下（modules -> server -> root），可通过 BAR_DB_PATH 覆盖
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.getenv("BAR_DB_PATH", os.path.join(root, "data", "stock_bars.db"))
+
+
+def _sync_ttl() -> float:
+    # 两次增量同步之间的最小间隔（秒），可通过 HIST_SYNC_TTL 配置
+    try:
+        return float(os.getenv("HIST_SYNC_TTL", "60"))
+    except ValueError:
+        return 60.0
+
+
+def _today() -> str:
+    # 北京时间的当日日期 "YYYY-MM-DD"，当日K线在收盘前仍会变化
+    return datetime.now(CN_TZ).date().isoformat()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _download(symbol: str, period: str, adjust: str, start_date: str) -> Any:
+    import akshare as ak
+
+    return ak.stock_zh_a_hist(
+        symbol=symbol, period=period, start_date=start_date, end_date="20500101", adjust=adjust
+    )
+
+
+class BarStore:
+    """
+    历史K线缓存
+
+    Args:
+        path: SQLite 文件路径
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or default_db_path()
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with _connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+            # 旧版本缓存没有 covered_from 列，补上后按整段下载处理
+            if "covered_from" not in {r[1] for r in conn.execute("PRAGMA table_info(bar_sync)")}:
+                conn.execute("ALTER TABLE bar_sync ADD COLUMN covered_from TEXT")
+                conn.execute("UPDATE bar_sync SET covered_from = ?", (LISTING_START,))
+
+    def _key_lock(self, key: Tuple[str, str, str]) -> threading.Lock:
+        # 同一 (代码, 周期, 复权) 的同步串行执行，避免并发重复下载
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    # ---------------- 读写 ----------------
+
+    def _tail_dates(self, conn: sqlite3.Connection, key: Tuple[str, str, str], n: int) -> List[str]:
+        cur = conn.execute(
+            "SELECT date FROM bars WHERE symbol = ? AND period = ? AND adjust = ? ORDER BY date DESC LIMIT ?",
+            (*key, n),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+    def _close_on(self, conn: sqlite3.Connection, key: Tuple[str, str, str], date: str) -> Optional[float]:
+        row = conn.execute(
+            "SELECT close FROM bars WHERE symbol = ? AND period = ? AND adjust = ? AND date = ?", (*key, date)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _rows(df: Any) -> List[Tuple[Any, ...]]:
+        import pandas as pd
+
+        if df is None or df.empty:
+            return []
+        out = pd.DataFrame({
+            dst: (df[src] if src in df.columns else None) for src, dst in BAR_COLUMNS
+        })
+        out["date"] = pd.to_datetime(out["date"]).dt.strftime("%Y-%m-%d")
+        return list(out.itertuples(index=False, name=None))
+
+    def _write(
+        self,
+        conn: sqlite3.Connection,
+        key: Tuple[str, str, str],
+        rows: List[Tuple[Any, ...]],
+        covered_from: Optional[str] = None,
+    ) -> int:
+        """写入K线；给出 covered_from 时表示这是一次整段下载，先清空旧数据并记录覆盖起点"""
+        cols = ", ".join(dst for _, dst in BAR_COLUMNS)
+        marks = ", ".join("?" for _ in BAR_COLUMNS)
+        with conn:
+            if covered_from is not None:
+                conn.execute("DELETE FROM bars WHERE symbol = ? AND period = ? AND adjust = ?", key)
+            conn.executemany(
+                f"INSERT OR REPLACE INTO bars (symbol, period, adjust, {cols}) VALUES (?, ?, ?, {marks})",
+                [(*key, *r) for r in rows],
+            )
+            conn.execute(
+                """
+                INSERT INTO bar_sync (symbol, period, adjust, synced_at, full_refreshes, covered_from) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (symbol, period, adjust) DO UPDATE SET
+                    synced_at = excluded.synced_at,
+                    full_refreshes = bar_sync.full_refreshes + excluded.full_refreshes,
+                    covered_from = COALESCE(excluded.covered_from, bar_sync.covered_from)
+                """,
+                (*key, time.time(), 0 if covered_from is None else 1, covered_from),
+            )
+        return len(rows)
+
+    def _sync_state(self, conn: sqlite3.Connection, key: Tuple[str, str, str]) -> Tuple[Optional[float], Optional[str]]:
+        row = conn.execute(
+            "SELECT synced_at, covered_from FROM bar_sync WHERE symbol = ? AND period = ? AND adjust = ?", key
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    # ---------------- 同步 ----------------
+
+    def sync(
+        self, symbol: str, period: str = "daily", adjust: str = "", start: str = "", force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        同步本地K线，保证 start（"YYYY-MM-DD"，空表示上市首日）之后的K线完整。
+        本地覆盖范围不足时只从 start 开始下载；已覆盖时只下载锚点K线之后的数据。
+        锚点为当日之前最后一根已收盘的K线（日线以外的周期不取最后一根，它可能是仍在形成的当周/当月K线），
+        其收盘价若与新下载的不一致，说明复权价格被公司行为改写，按原覆盖范围重新下载；没有已收盘的K线时只做增量合并。
+
+        Returns:
+            {"mode": "cached" | "full" | "incremental" | "rebuild", "downloaded": 下载行数, "covered_from": 覆盖起点}
+        """
+        key = (symbol, period, adjust)
+        need_from = start or LISTING_START
+        with self._key_lock(key):
+            conn = _connect(self.path)
+            try:
+                synced_at, covered_from = self._sync_state(conn, key)
+                tail = self._tail_dates(conn, key, 2)
+                covered = covered_from is not None and need_from >= covered_from
+                # 有效期内不再下载；上游没有K线（停牌、代码无数据）时同步时间同样生效，不会每次整段重新下载
+                if not force and covered and synced_at is not None and time.time() - synced_at < _sync_ttl():
+                    return {"mode": "cached", "downloaded": 0, "covered_from": covered_from}
+                if force or not tail or not covered:
+                    if covered_from is not None and not force:
+                        need_from = min(need_from, covered_from)
+                    rows = self._rows(_download(symbol, period, adjust, need_from.replace("-", "")))
+                    n = self._write(conn, key, rows, covered_from=need_from)
+                    logger.info(f"{symbol} {period} {adjust or 'none'} 自 {need_from} 起整段下载 {n} 根K线")
+                    return {"mode": "full", "downloaded": n, "covered_from": need_from}
+
+                today = _today()
+                closed = [d for d in tail if d < today and (period == "daily" or d != tail[0])]
+                anchor = closed[0] if closed else None
+                rows = self._rows(_download(symbol, period, adjust, (anchor or tail[-1]).replace("-", "")))
+                fresh_close = next((r[2] for r in rows if r[0] == anchor), None)
+                stored_close = self._close_on(conn, key, anchor) if anchor is not None else None
+                if (
+                    stored_close is not None
+                    and fresh_close is not None
+                    and abs(fresh_close - stored_close) > _PRICE_TOLERANCE * max(1.0, abs(stored_close))
+                ):
+                    logger.info(f"{symbol} {period} {adjust} 在 {anchor} 的收盘价由 {stored_close} 变为 {fresh_close}，复权价格已变化，整段重新下载")
+                    rows = self._rows(_download(symbol, period, adjust, covered_from.replace("-", "")))
+                    n = self._write(conn, key, rows, covered_from=covered_from)
+                    return {"mode": "rebuild", "downloaded": n, "covered_from": covered_from}
+                # 没有新K线时也刷新同步时间，避免有效期内重复下载
+                n = self._write(conn, key, rows)
+                return {"mode": "incremental", "downloaded": n, "covered_from": covered_from}
+            finally:
+                conn.close()
+
+    def load(self, symbol: str, period: str = "daily", adjust: str = "", force: bool = False) -> Any:
+        """同步后返回该股票全部已存K线（DataFrame，列名与 akshare 一致，按日期升序）"""
+        self.sync(symbol, period, adjust, force=force)
+        return self.read(symbol, period, adjust)
+
+    def read(
+        self,
+        symbol: str,
+        period: str = "daily",
+        adjust: str = "",
+        start: str = "",
+        end: str = "",
+        limit: Optional[int] = None,
+    ) -> Any:
+        """
+        读取已存K线（不触发同步）
+
+        Args:
+            start / end: 日期范围 "YYYY-MM-DD"（闭区间），空表示不限
+            limit: 只返回范围内最近的 limit 根
+        """
+        import pandas as pd
+
+        cols = ", ".join(dst for _, dst in BAR_COLUMNS)
+        # 主键 (symbol, period, adjust, date) 的 B 树上按日期二分定位范围，不扫描整段历史
+        sql = f"SELECT {cols} FROM bars WHERE symbol = ? AND period = ? AND adjust = ?"
+        params: Tuple[Any, ...] = (symbol, period, adjust)
+        if start:
+            sql += " AND date >= ?"
+            params += (start,)
+        if end:
+            sql += " AND date <= ?"
+            params += (end,)
+        if limit is not None:
+            # 倒序取最近 limit 根后再翻转为升序
+            sql = f"SELECT * FROM ({sql} ORDER BY date DESC LIMIT ?) ORDER BY date"
+            params += (int(limit),)
+        else:
+            sql += " ORDER BY date"
+        conn = _connect(self.path)
+        try:
+            df = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+        df.columns = [src for src, _ in BAR_COLUMNS]
+        df.insert(1, "股票代码", symbol)
+        df["日期"] = pd.to_datetime(df["日期"]).dt.date
+        return df
@@ -0,0 +1,51 @@
+"""
+缓存命中率与刷新耗时统计
+"""
+import threading
+from typing import Any, Dict, Optional
+
+
+class CacheStats:
+    """线程安全的缓存统计：命中/未命中次数、刷新次数与刷新耗时"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.refresh_total = 0.0
+        self.refresh_last: Optional[float] = None
+        self.refresh_max = 0.0
+
+    def hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def refreshed(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            if not ok:
+                self.refresh_failures += 1
+                return
+            self.refreshes += 1
+            self.refresh_total += seconds
+            self.refresh_last = seconds
+            self.refresh_max = max(self.refresh_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "refresh_last": round(self.refresh_last, 3) if self.refresh_last is not None else None,
+                "refresh_avg": round(self.refresh_total / self.refreshes, 3) if self.refreshes else None,
+                "refresh_max": round(self.refresh_max, 3),
+            }
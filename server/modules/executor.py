@@ -0,0 +1,189 @@
+"""
+按上游划分的阻塞任务执行层
+同步工具（akshare 下载、pandas 处理）放到各上游独立的有界线程池中执行，不阻塞 SSE 事件循环；
+东方财富、新浪、集思录各有自己的并发上限，一个上游变慢只会让它自己的队列变长，不会占满其它上游的线程。
+CPU 密集的 DataFrame 计算可选放到进程池（EXECUTOR_PROCESS_WORKERS > 0 时启用）。
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('executor')
+
+# 各上游默认并发上限，可通过 EXECUTOR_<NAME>_WORKERS 覆盖
+DEFAULT_WORKERS = {
+    "eastmoney": 4,   # A股实时与历史行情
+    "sina": 4,        # 期货行情与主力合约
+    "jisilu": 2,      # 集思录 QDII/LOF
+    "local": 4,       # 本地存储查询
+}
+
+
+def _env_workers(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+class Lane:
+    """
+    单个上游的有界线程池，记录排队深度、等待与执行耗时
+
+    Args:
+        name: 上游名称
+        workers: 最大并发线程数
+    """
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"lane-{name}")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    @property
+    def queued(self) -> int:
+        # 已提交但尚未开始执行的任务数
+        return self.submitted - self.running - self.completed - self.failed
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+        enqueued = time.perf_counter()
+
+        def task() -> Any:
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                waited = started - enqueued
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_total += time.perf_counter() - started
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        with self._lock:
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        return self._pool.submit(task)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.failed + self.running
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_avg": round(self.wait_total / started, 4) if started else None,
+                "wait_max": round(self.wait_max, 4),
+                "run_avg": round(self.run_total / finished, 4) if finished else None,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_lanes: Dict[str, Lane] = {}
+_lanes_lock = threading.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_lock = threading.Lock()
+
+
+def lane(name: str) -> Lane:
+    """获取（必要时创建）指定上游的线程池"""
+    with _lanes_lock:
+        found = _lanes.get(name)
+        if found is None:
+            workers = _env_workers(f"EXECUTOR_{name.upper()}_WORKERS", DEFAULT_WORKERS.get(name, 2))
+            found = _lanes[name] = Lane(name, workers)
+            logger.info(f"创建执行通道 {name}，并发上限 {found.workers}")
+        return found
+
+
+async def run(name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    在指定上游的线程池中执行同步函数并等待结果
+
+    Args:
+        name: 上游名称，如 "eastmoney"、"sina"、"jisilu"
+        fn: 同步函数
+    """
+    return await lane(name).run(fn, *args, **kwargs)
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    workers = _env_workers("EXECUTOR_PROCESS_WORKERS", 0)
+    if workers <= 0:
+        return None
+    with _process_lock:
+        if _process_pool is None:
+            # spawn：子进程不继承父进程中持锁的线程
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"创建计算进程池，进程数 {workers}")
+        return _process_pool
+
+
+def cpu(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    执行 CPU 密集的计算：启用进程池时在子进程中执行（fn 与参数需可 pickle），否则在当前线程执行。
+    在通道线程中调用，阻塞的是该通道的线程而不是事件循环。
+    """
+    pool = _get_process_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
+
+
+def stats() -> Dict[str, Any]:
+    """各执行通道与进程池的统计"""
+    with _lanes_lock:
+        lanes = list(_lanes.values())
+    return {
+        "lanes": {l.name: l.stats() for l in lanes},
+        "process_workers": _env_workers("EXECUTOR_PROCESS_WORKERS", 0),
+        "process_pool_started": _process_pool is not None,
+    }
+
+
+def shutdown() -> None:
+    """关闭全部线程池与进程池"""
+    global _process_pool
+    with _lanes_lock:
+        lanes = list(_lanes.values())
+        _lanes.clear()
+    for l in lanes:
+        l.shutdown()
+    with _process_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
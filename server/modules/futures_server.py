@@ -1,30 +1,351 @@
-import akshare as ak
-import pandas as pd
+import os
+import time
 import logging
-from typing import Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# akshare / pandas / numpy 导入耗时较长，在首次请求或启动预热时才导入，服务器端口先打开
+try:
+    from . import serializer, singleflight
+    from . import trading_calendar as cal
+    from .cache_stats import CacheStats
+except ImportError:
+    import serializer  # type: ignore
+    import singleflight  # type: ignore
+    import trading_calendar as cal  # type: ignore
+    from cache_stats import CacheStats  # type: ignore
 
 logger = logging.getLogger('arbitrage-suite')
 
-def get_futures_realtime(symbol: str, market: str = "CF") -> Dict[str, Any]:
+# 主力合约行情列表缓存：{"frame": CompactFrame, "monotonic": 单调时钟, "errors": {交易所: 错误}, "latency": {上游调用: 秒}}
+_main_list_cache: Optional[Dict[str, Any]] = None
+main_list_flight = singleflight.Group("futures_main_list")
+
+# 主力合约代码解析结果，按期货交易日缓存：
+# {"trading_day": date, "symbols": {交易所: [合约代码]}, "resolved_at": 时间戳, "monotonic": 单调时钟, "stale": 原因或 None}
+MAIN_EXCHANGES = ("dce", "czce", "shfe", "gfex", "cffex")
+# 商品期货交易所走 CF 行情，中金所走 FF 行情
+COMMODITY_EXCHANGES = ("dce", "czce", "shfe", "gfex")
+# 品种 -> 交易所索引，用于把任意合约路由到 CF / FF 行情；解析主力合约时补充新上市的品种
+PRODUCT_EXCHANGES: Dict[str, str] = {
+    product: exchange
+    for exchange, products in {
+        "shfe": ("CU", "AL", "ZN", "PB", "NI", "SN", "AU", "AG", "RB", "WR", "HC", "SS", "FU", "BU", "RU", "SP", "AO", "BR", "AD"),
+        "ine": ("SC", "LU", "NR", "BC", "EC"),
+        "dce": ("A", "B", "M", "Y", "P", "C", "CS", "JD", "RR", "L", "V", "PP", "EG", "EB", "PG", "J", "JM", "I", "FB", "BB", "LH", "LG"),
+        "czce": ("CF", "CY", "SR", "TA", "OI", "RM", "MA", "FG", "ZC", "SF", "SM", "AP", "CJ", "UR", "SA", "PF", "PK", "PX",
+                 "SH", "PR", "WH", "PM", "RI", "LR", "JR", "RS"),
+        "gfex": ("SI", "LC", "PS"),
+        "cffex": ("IF", "IH", "IC", "IM", "TS", "TF", "T", "TL"),
+    }.items()
+    for product in products
+}
+# 新浪行情名称（去掉合约月份）-> 品种，用于把 futures_zh_spot 返回的行对应回合约代码；
+# 以字母品种代码命名的行（如 "IF2512"、"PP2605"）直接按品种索引识别，未收录的名称在完整返回时学习
+SINA_PRODUCT_NAMES: Dict[str, str] = {
+    "沪铜": "CU", "沪铝": "AL", "沪锌": "ZN", "沪铅": "PB", "沪镍": "NI", "沪锡": "SN", "黄金": "AU", "沪金": "AU",
+    "白银": "AG", "沪银": "AG", "螺纹钢": "RB", "线材": "WR", "热卷": "HC", "热轧卷板": "HC", "不锈钢": "SS",
+    "燃油": "FU", "燃料油": "FU", "沥青": "BU", "石油沥青": "BU", "橡胶": "RU", "天然橡胶": "RU", "纸浆": "SP",
+    "氧化铝": "AO", "合成橡胶": "BR", "铸造铝合金": "AD",
+    "原油": "SC", "低硫燃料油": "LU", "20号胶": "NR", "国际铜": "BC", "集运指数": "EC", "集运欧线": "EC",
+    "豆一": "A", "豆二": "B", "豆粕": "M", "豆油": "Y", "棕榈油": "P", "棕榈": "P", "玉米": "C", "玉米淀粉": "CS",
+    "淀粉": "CS", "鸡蛋": "JD", "粳米": "RR", "塑料": "L", "聚乙烯": "L", "聚氯乙烯": "V", "聚丙烯": "PP",
+    "乙二醇": "EG", "苯乙烯": "EB", "液化石油气": "PG", "焦炭": "J", "焦煤": "JM", "铁矿石": "I", "纤维板": "FB",
+    "胶合板": "BB", "生猪": "LH", "原木": "LG",
+    "棉花": "CF", "棉纱": "CY", "白糖": "SR", "菜油": "OI", "菜籽油": "OI", "菜粕": "RM", "甲醇": "MA", "玻璃": "FG",
+    "动力煤": "ZC", "硅铁": "SF", "锰硅": "SM", "苹果": "AP", "红枣": "CJ", "尿素": "UR", "纯碱": "SA", "短纤": "PF",
+    "花生": "PK", "对二甲苯": "PX", "烧碱": "SH", "瓶片": "PR", "强麦": "WH", "普麦": "PM", "早籼稻": "RI",
+    "晚籼稻": "LR", "粳稻": "JR", "菜籽": "RS",
+    "工业硅": "SI", "碳酸锂": "LC", "多晶硅": "PS",
+    "沪深300": "IF", "上证50": "IH", "中证500": "IC", "中证1000": "IM",
+    "2年期国债": "TS", "5年期国债": "TF", "10年期国债": "T", "30年期国债": "TL",
+    "PTA": "TA", "PVC": "V", "LPG": "PG",
+}
+# 单次批量行情最多的合约数
+MAX_BATCH_SYMBOLS = 200
+_main_contracts: Optional[Dict[str, Any]] = None
+# 解析后各主力合约的持仓量峰值，用于发现主力移仓：{行情名称: 持仓量}
+_hold_peaks: Dict[str, float] = {}
+_contracts_lock = threading.Lock()
+contracts_flight = singleflight.Group("futures_main_contracts")
+contract_stats = CacheStats()
+# 最近的主力合约切换记录
+_rollovers: List[Dict[str, Any]] = []
+_MAX_ROLLOVERS = 50
+
+
+def _main_list_ttl() -> float:
+    # 缓存有效期（秒），可通过环境变量 FUTURES_MAIN_TTL 配置
+    try:
+        return float(os.getenv("FUTURES_MAIN_TTL", "10"))
+    except ValueError:
+        return 10.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _fan_out(calls: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float]]:
+    """并发执行一组上游调用，返回 (结果, 错误, 耗时)，单个失败不影响其它"""
+    def timed(fn: Callable[[], Any]) -> Tuple[Any, Optional[str], float]:
+        start = time.perf_counter()
+        try:
+            return fn(), None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e) or type(e).__name__, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, len(calls))) as pool:
+        futures = {name: pool.submit(timed, fn) for name, fn in calls.items()}
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    latency: Dict[str, float] = {}
+    for name, fut in futures.items():
+        value, error, elapsed = fut.result()
+        latency[name] = round(elapsed, 3)
+        if error is None:
+            results[name] = value
+        else:
+            errors[name] = error
+    return results, errors, latency
+
+
+def get_main_contracts(force_refresh: bool = False) -> Dict[str, List[str]]:
+    """
+    各交易所主力合约代码 {交易所: [合约代码]}。同一期货交易日内只解析一次
+    （每次解析要对每个品种请求一次新浪），检测到主力移仓或手动刷新时重新解析。
+
+    Args:
+        force_refresh: 为 True 时忽略缓存重新解析
+    """
+    day = cal.futures_trading_day()
+    cache = _main_contracts
+    if not force_refresh and cache is not None and cache["trading_day"] == day and not cache["stale"]:
+        contract_stats.hit()
+        return cache["symbols"]
+    contract_stats.miss()
+    if force_refresh:
+        reason = "manual"
+    elif cache is None:
+        reason = "initial"
+    elif cache["trading_day"] != day:
+        reason = "new_trading_day"
+    else:
+        reason = cache["stale"]
+    return contracts_flight.do("main_contracts", lambda: _resolve_main_contracts(day, reason))["symbols"]
+
+
+def _resolve_main_contracts(day: date, reason: str) -> Dict[str, Any]:
+    global _main_contracts
+    import akshare as ak
+
+    start = time.perf_counter()
+    previous = _main_contracts
+    # 五个交易所并发解析，总耗时取决于最慢的交易所
+    texts, errors, latency = _fan_out({ex: (lambda ex=ex: ak.match_main_contract(symbol=ex)) for ex in MAIN_EXCHANGES})
+    logger.info(f"主力合约解析各交易所耗时(s): {latency}" + (f"，失败: {errors}" if errors else ""))
+    symbols: Dict[str, List[str]] = {}
+    for exchange in MAIN_EXCHANGES:
+        if exchange in texts:
+            symbols[exchange] = [s.strip() for s in str(texts[exchange] or "").split(",") if s.strip()]
+        else:
+            # 单个交易所解析失败时沿用上一次的结果
+            symbols[exchange] = list(previous["symbols"].get(exchange, [])) if previous else []
+    if not any(symbols.values()):
+        contract_stats.refreshed(time.perf_counter() - start, ok=False)
+        raise RuntimeError(f"Failed to resolve main contracts: {errors}")
+
+    changes = _contract_changes(previous["symbols"] if previous else {}, symbols)
+    cache = {
+        "trading_day": day,
+        "symbols": symbols,
+        "resolved_at": time.time(),
+        "monotonic": time.monotonic(),
+        "reason": reason,
+        "errors": errors,
+        "latency": latency,
+        "stale": None,
+    }
+    with _contracts_lock:
+        _main_contracts = cache
+        _hold_peaks.clear()
+        for exchange, codes in symbols.items():
+            for code in codes:
+                PRODUCT_EXCHANGES.setdefault(_product(code), exchange)
+        if previous is not None and changes:
+            _rollovers.append({"trading_day": day.isoformat(), "reason": reason, "changes": changes})
+            del _rollovers[:-_MAX_ROLLOVERS]
+    elapsed = time.perf_counter() - start
+    contract_stats.refreshed(elapsed)
+    logger.info(
+        f"主力合约解析完成（{reason}），交易日 {day}，共 {sum(len(v) for v in symbols.values())} 个，"
+        f"切换 {len(changes)} 个，耗时 {elapsed:.3f}s"
+    )
+    return cache
+
+
+def _product(code: str) -> str:
+    # 合约代码的品种部分，如 "RB2605" -> "RB"
+    return code.rstrip("0123456789").upper()
+
+
+def exchange_of(code: str) -> Optional[str]:
+    """按品种索引查合约所属交易所，如 "IF2512" -> "cffex"；未知品种返回 None"""
+    return PRODUCT_EXCHANGES.get(_product(code))
+
+
+def market_of(code: str) -> str:
+    """合约所属行情市场：中金所品种为 "FF"（金融期货），其余（含未知品种）为 "CF"（商品期货）"""
+    return "FF" if exchange_of(code) == "cffex" else "CF"
+
+
+def _contract_changes(old: Dict[str, List[str]], new: Dict[str, List[str]]) -> List[Dict[str, str]]:
+    # 同一品种主力合约代码的变化
+    before = {_product(c): c for codes in old.values() for c in codes}
+    return [
+        {"product": _product(c), "from": before[_product(c)], "to": c}
+        for codes in new.values() for c in codes
+        if _product(c) in before and before[_product(c)] != c
+    ]
+
+
+def _check_rollover(frame: Any) -> None:
+    """
+    根据主力合约行情检查是否可能发生移仓：某主力合约持仓量自解析后的峰值回落到一定比例以下，
+    说明持仓正在向其它月份转移。此时标记解析结果失效（受最小复查间隔限制），下次请求重新解析。
+    """
+    cache = _main_contracts
+    if cache is None or cache["stale"] or "hold" not in frame.columns:
+        return
+    ratio = _env_float("FUTURES_ROLLOVER_HOLD_RATIO", 0.8)
+    recheck = _env_float("FUTURES_ROLLOVER_RECHECK", 1800)
+    dropped = []
+    with _contracts_lock:
+        for rec in frame.records(columns=["symbol", "hold"]):
+            name, hold = rec["symbol"], rec["hold"]
+            if not name or hold is None:
+                continue
+            peak = _hold_peaks.get(name, 0.0)
+            if hold > peak:
+                _hold_peaks[name] = float(hold)
+            elif peak > 0 and hold < peak * ratio:
+                dropped.append(name)
+    if dropped and time.monotonic() - cache["monotonic"] >= recheck:
+        cache["stale"] = "rollover"
+        logger.info(f"主力合约持仓量明显回落，疑似移仓，下次请求重新解析: {dropped[:5]}")
+
+
+def refresh_main_contracts() -> Dict[str, Any]:
+    """手动重新解析主力合约代码，返回解析结果与相对上一次的切换"""
+    before = len(_rollovers)
+    get_main_contracts(force_refresh=True)
+    return main_contracts_status(changes=_rollovers[before:])
+
+
+def main_contracts_status(changes: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """主力合约解析缓存状态：交易日、各交易所合约、命中率、失效原因与最近的切换记录"""
+    cache = _main_contracts
+    stats = contract_stats.snapshot()
+    if cache is None:
+        stats.update({"trading_day": None, "symbols": {}, "rollovers": list(_rollovers)})
+        return stats
+    stats.update({
+        "trading_day": cache["trading_day"].isoformat(),
+        "resolved_at": datetime.fromtimestamp(cache["resolved_at"], cal.CN_TZ).strftime("%Y-%m-%d %H:%M:%S"),
+        "reason": cache["reason"],
+        "stale": cache["stale"],
+        "errors": cache["errors"],
+        "latency": cache["latency"],
+        "symbols": cache["symbols"],
+        "rollovers": list(_rollovers) if changes is None else changes,
+    })
+    return stats
+
+
+def _sina_product(prefix: str) -> Optional[str]:
+    # 新浪行情名称（不含月份）对应的品种；未知名称返回 None
+    return SINA_PRODUCT_NAMES.get(prefix) or (prefix.upper() if prefix.upper() in PRODUCT_EXCHANGES else None)
+
+
+def _align_quotes(codes: List[str], records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    把 futures_zh_spot 返回的行情行对应回合约代码。行情中的 symbol 是新浪名称（如 "螺纹钢2605"），
+    按 (品种, 月份) 查回请求的合约；没有最新价的合约会被上游丢弃，对应不上的合约视为缺失，不按位置顺延。
+    只有上游一行未丢（行数与请求相同）时才按订阅顺序对应名称未收录的行，并记下该名称
+    """
+    wanted = {(_product(code), code[-3:]): code for code in codes}
+    complete = len(records) == len(codes)
+    out: Dict[str, Dict[str, Any]] = {}
+    for pos, rec in enumerate(records):
+        name = str(rec.get("symbol", "")).strip()
+        prefix = name.rstrip("0123456789")
+        month = name[len(prefix):][-3:]
+        product = _sina_product(prefix)
+        code = wanted.get((product, month)) if product else None
+        if code is None and complete and month and codes[pos][-3:] == month:
+            code = codes[pos]
+            if prefix and product is None:
+                SINA_PRODUCT_NAMES.setdefault(prefix, _product(code))
+        if code is not None and code not in out:
+            out[code] = rec
+    return out
+
+
+def fetch_quotes(markets: Dict[str, str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    批量获取多个合约的实时行情：同一市场的合约合并为一次 futures_zh_spot 调用，不同市场并发请求
+
+    Args:
+        markets: {合约代码: 市场}，市场为 "CF"（商品期货）或 "FF"（金融期货）
+
+    Returns:
+        ({合约代码: 行情记录}, {市场: 错误信息})
+    """
+    import akshare as ak
+
+    by_market: Dict[str, List[str]] = {}
+    for code, market in markets.items():
+        by_market.setdefault(market, []).append(code)
+    frames, errors, latency = _fan_out({
+        market: (lambda market=market, codes=codes: ak.futures_zh_spot(symbol=",".join(codes), market=market, adjust='0'))
+        for market, codes in by_market.items()
+    })
+    logger.debug(f"批量行情 {len(markets)} 个合约，耗时(s): {latency}")
+    quotes: Dict[str, Dict[str, Any]] = {}
+    for market, df in frames.items():
+        if df is not None and not df.empty:
+            quotes.update(_align_quotes(by_market[market], serializer.records(df)))
+    return quotes, errors
+
+
+def get_futures_realtime(symbol: str, market: Optional[str] = None) -> Dict[str, Any]:
     """
     使用 akshare 获取国内期货实时行情数据
     
     Args:
         symbol: 期货合约代码，如 "V2205"（PVC2205）, "ZC2505"（动力煤2505）
-        market: 市场类型，"CF"表示商品期货，"FF"表示金融期货，默认"CF"
+        market: 市场类型，"CF"表示商品期货，"FF"表示金融期货，默认按品种所属交易所自动选择
         
     Returns:
         Dict 包含行情数据或错误信息
     """
     try:
+        import akshare as ak
+
         symbol = symbol.upper()
+        market = market.upper() if market else market_of(symbol)
         # akshare 的 futures_zh_spot 接口
         # 目标地址: https://finance.sina.com.cn/futuremarket/
         df = ak.futures_zh_spot(symbol=symbol, market=market, adjust='0')
         
         if df is not None and not df.empty:
             # 返回列表格式，与 get_futures_main_list 保持一致
-            data = df.to_dict(orient='records')
+            data = serializer.records(df)
             return {"success": True, "data": data, "count": len(data)}
         else:
             return {"success": False, "error": f"No data found for symbol {symbol}"}
@@ -33,46 +354,138 @@ def get_futures_realtime(symbol: str, market: str = "CF") -> Dict[str, Any]:
         logger.error(f"Error fetching futures data for {symbol}: {str(e)}")
         return {"success": False, "error": str(e)}
 
-def get_futures_main_list() -> Dict[str, Any]:
+
+def get_futures_realtime_batch(symbols: List[str]) -> Dict[str, Any]:
     """
-    获取国内期货主力合约行情列表（全部数据）
-    使用 futures_zh_spot 获取所有商品期货（大商所、上期所、郑商所、广期所）和金融期货（中金所）主力合约实时行情
+    批量获取任意商品/金融期货合约的实时行情：按品种索引把每个合约路由到 CF 或 FF 市场，
+    每个市场最多一次 futures_zh_spot 调用
+
+    Args:
+        symbols: 期货合约代码列表，如 ["RB2605", "M2609", "IF2512"]
+
+    Returns:
+        Dict，data 为 {合约代码: 行情记录}，markets 为各合约使用的市场
     """
+    codes = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+    if not codes:
+        return {"success": False, "error": "symbols 不能为空"}
+    if len(codes) > MAX_BATCH_SYMBOLS:
+        return {"success": False, "error": f"单次最多查询 {MAX_BATCH_SYMBOLS} 个合约，当前 {len(codes)} 个"}
+    markets = {code: market_of(code) for code in codes}
     try:
-        # 获取各交易所主力合约代码
-        dce_text = ak.match_main_contract(symbol="dce")      # 大连商品交易所
-        czce_text = ak.match_main_contract(symbol="czce")    # 郑州商品交易所
-        shfe_text = ak.match_main_contract(symbol="shfe")    # 上海期货交易所
-        gfex_text = ak.match_main_contract(symbol="gfex")    # 广州期货交易所
-        cffex_text = ak.match_main_contract(symbol="cffex")  # 中国金融期货交易所
-        
-        # 订阅所有商品期货主力合约
-        cf_df = ak.futures_zh_spot(
-            symbol=",".join([dce_text, czce_text, shfe_text, gfex_text]),
-            market="CF",
-            adjust='0'
-        )
-        
-        # 订阅所有金融期货主力合约
-        ff_df = ak.futures_zh_spot(
-            symbol=cffex_text,
-            market="FF",
-            adjust='0'
-        )
-        
-        # 合并商品期货和金融期货数据
-        all_data = []
-        if cf_df is not None and not cf_df.empty:
-            all_data.extend(cf_df.to_dict(orient='records'))
-        if ff_df is not None and not ff_df.empty:
-            all_data.extend(ff_df.to_dict(orient='records'))
-        
-        if all_data:
-            return {"success": True, "data": all_data, "count": len(all_data)}
-        return {"success": False, "error": "Failed to fetch main futures list"}
+        quotes, errors = fetch_quotes(markets)
     except Exception as e:
-        logger.error(f"Error fetching futures main list: {str(e)}")
+        logger.error(f"Error fetching futures batch quotes: {str(e)}")
         return {"success": False, "error": str(e)}
+    if not quotes:
+        return {"success": False, "error": errors or f"No data found for symbols {codes}", "markets": markets}
+    data = {code: quotes[code] for code in codes if code in quotes}
+    result: Dict[str, Any] = {"success": True, "data": data, "count": len(data), "markets": markets}
+    missing = [code for code in codes if code not in quotes]
+    if missing:
+        result["missing"] = missing
+    unknown = [code for code in codes if exchange_of(code) is None]
+    if unknown:
+        # 索引中没有的品种按商品期货查询
+        result["unknown_products"] = unknown
+    if errors:
+        result["partial"] = True
+        result["errors"] = errors
+    return result
+
+
+def get_futures_main_list(force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    获取国内期货主力合约行情列表（全部数据），有效期内直接返回缓存结果
+
+    Args:
+        force_refresh: 为 True 时忽略缓存重新获取
+    """
+    cache = _main_list_cache
+    if force_refresh or cache is None or time.monotonic() - cache["monotonic"] >= _main_list_ttl():
+        try:
+            # 并发的调用方共享同一次下载
+            cache = main_list_flight.do("main_list", _refresh_main_list_cache)
+        except Exception as e:
+            # 失败结果不缓存
+            logger.error(f"Error fetching futures main list: {str(e)}")
+            return {"success": False, "error": str(e)}
+    data = cache["frame"].records()
+    result: Dict[str, Any] = {"success": True, "data": data, "count": len(data)}
+    if cache["errors"]:
+        # 部分交易所失败时返回其余交易所的数据，并逐个交易所给出错误
+        result["partial"] = True
+        result["errors"] = cache["errors"]
+    return result
+
+
+def _refresh_main_list_cache() -> Dict[str, Any]:
+    global _main_list_cache
+    frame, errors, latency = _fetch_futures_main_frame()
+    _main_list_cache = {"frame": frame, "monotonic": time.monotonic(), "errors": errors, "latency": latency}
+    _check_rollover(frame)
+    return _main_list_cache
+
+
+def main_list_cache_age() -> Optional[float]:
+    """主力合约行情列表缓存距今的秒数，尚未加载时为 None"""
+    cache = _main_list_cache
+    return time.monotonic() - cache["monotonic"] if cache is not None else None
+
+
+def refresh_futures_main_list() -> int:
+    """强制刷新主力合约行情列表，返回合约数（供后台预取调用）"""
+    result = get_futures_main_list(force_refresh=True)
+    if not result.get("success"):
+        raise RuntimeError(result.get("error", "Failed to fetch main futures list"))
+    return result.get("count", 0)
+
+
+def _fetch_futures_main_frame() -> Tuple[Any, Dict[str, str], Dict[str, float]]:
+    """
+    获取国内期货主力合约行情列表（全部数据），返回 (紧凑列式快照 CompactFrame, {交易所: 错误}, {行情调用: 耗时})
+    使用 futures_zh_spot 获取所有商品期货（大商所、上期所、郑商所、广期所）和金融期货（中金所）主力合约实时行情，
+    商品期货与金融期货两次请求并发执行；一方失败时返回另一方的数据
+    """
+    import akshare as ak
+    import pandas as pd
+    try:
+        from .compact_frame import CompactFrame
+    except ImportError:
+        from compact_frame import CompactFrame  # type: ignore
+
+    # 各交易所主力合约代码（按交易日缓存，大商所、郑商所、上期所、广期所、中金所）
+    contracts = get_main_contracts()
+    commodity = [c for ex in COMMODITY_EXCHANGES for c in contracts.get(ex, [])]
+    financial = contracts.get("cffex", [])
+
+    calls: Dict[str, Callable[[], Any]] = {}
+    if commodity:
+        # 订阅所有商品期货主力合约
+        calls["CF"] = lambda: ak.futures_zh_spot(symbol=",".join(commodity), market="CF", adjust='0')
+    if financial:
+        # 订阅所有金融期货主力合约
+        calls["FF"] = lambda: ak.futures_zh_spot(symbol=",".join(financial), market="FF", adjust='0')
+    quotes, quote_errors, latency = _fan_out(calls)
+    logger.info(f"主力合约行情耗时(s): {latency}")
+
+    # 逐个交易所汇总错误：解析失败且无历史结果的交易所，以及所在市场行情请求失败的交易所
+    resolve_errors = _main_contracts["errors"] if _main_contracts is not None else {}
+    errors: Dict[str, str] = {}
+    for exchange in MAIN_EXCHANGES:
+        market = "FF" if exchange == "cffex" else "CF"
+        if not contracts.get(exchange) and exchange in resolve_errors:
+            errors[exchange] = resolve_errors[exchange]
+        elif market in quote_errors:
+            errors[exchange] = f"{market} quotes: {quote_errors[market]}"
+
+    # 合并商品期货和金融期货数据
+    frames = [df for df in quotes.values() if df is not None and not df.empty]
+    if not frames:
+        raise RuntimeError(f"Failed to fetch main futures list: {errors or 'no data'}")
+    if errors:
+        logger.warning(f"主力合约行情部分交易所失败: {errors}")
+    return CompactFrame(pd.concat(frames, ignore_index=True), key="symbol"), errors, latency
 
 def get_futures_financial_list() -> Dict[str, Any]:
     """
@@ -80,19 +493,23 @@ def get_futures_financial_list() -> Dict[str, Any]:
     使用 futures_zh_spot 获取中金所所有金融期货主力合约实时行情
     """
     try:
-        # 获取中金所主力合约代码
-        cffex_text = ak.match_main_contract(symbol="cffex")  # 中国金融期货交易所
-        
+        import akshare as ak
+
+        # 中金所主力合约代码（与主力合约列表共用按交易日缓存的解析结果）
+        financial = get_main_contracts().get("cffex", [])
+        if not financial:
+            return {"success": False, "error": "Failed to resolve financial futures main contracts"}
+
         # 订阅所有金融期货主力合约
         df = ak.futures_zh_spot(
-            symbol=cffex_text,
+            symbol=",".join(financial),
             market="FF",
             adjust='0'
         )
         
         if df is not None and not df.empty:
             # 返回全部数据
-            data = df.to_dict(orient='records')
+            data = serializer.records(df)
             return {"success": True, "data": data, "count": len(data)}
         return {"success": False, "error": "Failed to fetch financial futures list"}
     except Exception as e:
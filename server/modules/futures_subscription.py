@@ -0,0 +1,236 @@
+"""
+期货行情订阅
+客户端登记关注的合约后，由一个共享的轮询任务把所有订阅者关注的合约合并为每个市场一次 futures_zh_spot 调用；
+每个合约只保存最新行情与各字段最近一次变化的轮次，订阅者按各自的游标取回自上次以来变化的字段。
+上游请求与内存开销只随不同合约数增长，与订阅者数量无关。
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from . import futures_server, singleflight
+    from . import trading_calendar as cal
+except ImportError:
+    import futures_server  # type: ignore
+    import singleflight  # type: ignore
+    import trading_calendar as cal  # type: ignore
+
+logger = logging.getLogger('futures_subscription')
+
+MARKETS = ("CF", "FF")
+# 每个订阅者最多关注的合约数
+MAX_SYMBOLS_PER_SUBSCRIBER = 200
+
+
+def _idle_timeout() -> float:
+    # 订阅者超过该时间（秒）未取更新即视为断开，释放其订阅；可通过环境变量 FUTURES_SUB_IDLE 配置
+    try:
+        return float(os.getenv("FUTURES_SUB_IDLE", "600"))
+    except ValueError:
+        return 600.0
+
+
+class _Subscriber:
+    __slots__ = ("cursors", "last_seen", "created_at")
+
+    def __init__(self) -> None:
+        # {合约代码: 已发送到的轮次}，0 表示尚未发送过
+        self.cursors: Dict[str, int] = {}
+        self.last_seen = time.monotonic()
+        self.created_at = time.time()
+
+
+class SubscriptionHub:
+    """
+    共享轮询的期货行情订阅中心
+
+    Args:
+        fetch: 批量行情函数 {合约代码: 市场} -> ({合约代码: 行情记录}, {市场: 错误})，默认 futures_server.fetch_quotes
+    """
+
+    def __init__(self, fetch: Optional[Callable[[Dict[str, str]], Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]]] = None) -> None:
+        self._fetch = fetch or futures_server.fetch_quotes
+        self._lock = threading.Lock()
+        self._subs: Dict[str, _Subscriber] = {}
+        # 合约 -> 引用计数 / 市场
+        self._refs: Dict[str, int] = {}
+        self._markets: Dict[str, str] = {}
+        # 合约 -> 最新行情 / {字段: 最近变化的轮次}
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        self._changed: Dict[str, Dict[str, int]] = {}
+        self._tick = 0
+        self._polled_at: Optional[float] = None
+        self._errors: Dict[str, str] = {}
+        self.polls = 0
+        self.upstream_calls = 0
+        self._listeners: List[Callable[[List[str]], Any]] = []
+        # 定时轮询与新订阅触发的立即轮询同时发生时只请求一次上游
+        self._flight = singleflight.Group("futures_subscription")
+
+    # ---------------- 订阅管理 ----------------
+
+    def subscribe(self, subscriber_id: str, symbols: Iterable[str], market: str = "") -> Dict[str, Any]:
+        """
+        登记关注的合约，返回当前订阅列表
+
+        Args:
+            subscriber_id: 订阅者标识
+            symbols: 合约代码列表，如 ["RB2605", "M2605"]
+            market: 市场，"CF"（商品期货）或 "FF"（金融期货），默认按品种所属交易所自动选择
+        """
+        market = market.upper()
+        if market and market not in MARKETS:
+            raise ValueError(f"market 只支持 {MARKETS}，当前输入: {market}")
+        codes = [str(s).strip().upper() for s in symbols if str(s).strip()]
+        if not codes:
+            raise ValueError("symbols 不能为空")
+        with self._lock:
+            self._expire_locked()
+            sub = self._subs.setdefault(subscriber_id, _Subscriber())
+            sub.last_seen = time.monotonic()
+            added = [c for c in dict.fromkeys(codes) if c not in sub.cursors]
+            if len(sub.cursors) + len(added) > MAX_SYMBOLS_PER_SUBSCRIBER:
+                raise ValueError(f"每个订阅者最多关注 {MAX_SYMBOLS_PER_SUBSCRIBER} 个合约")
+            for code in added:
+                sub.cursors[code] = 0
+                self._refs[code] = self._refs.get(code, 0) + 1
+                # 合约所属市场由首个订阅者决定
+                self._markets.setdefault(code, market or futures_server.market_of(code))
+            return {"subscriber_id": subscriber_id, "added": added, "symbols": sorted(sub.cursors)}
+
+    def unsubscribe(self, subscriber_id: str, symbols: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """取消部分合约的订阅；symbols 为空时取消该订阅者的全部订阅"""
+        with self._lock:
+            sub = self._subs.get(subscriber_id)
+            if sub is None:
+                return {"subscriber_id": subscriber_id, "removed": [], "symbols": []}
+            codes = list(sub.cursors) if symbols is None else [str(s).strip().upper() for s in symbols]
+            removed = [c for c in codes if sub.cursors.pop(c, None) is not None]
+            for code in removed:
+                self._release_locked(code)
+            if not sub.cursors:
+                del self._subs[subscriber_id]
+            return {"subscriber_id": subscriber_id, "removed": removed, "symbols": sorted(sub.cursors)}
+
+    def _release_locked(self, code: str) -> None:
+        left = self._refs.get(code, 0) - 1
+        if left > 0:
+            self._refs[code] = left
+            return
+        # 最后一个订阅者离开后不再轮询该合约
+        for table in (self._refs, self._markets, self._quotes, self._changed):
+            table.pop(code, None)
+
+    def _expire_locked(self) -> None:
+        deadline = time.monotonic() - _idle_timeout()
+        for sid in [sid for sid, sub in self._subs.items() if sub.last_seen < deadline]:
+            logger.info(f"订阅者 {sid} 长时间未取更新，释放其 {len(self._subs[sid].cursors)} 个订阅")
+            for code in self._subs.pop(sid).cursors:
+                self._release_locked(code)
+
+    def subscriber_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._subs)
+
+    def has_pending_initial(self) -> bool:
+        """是否有尚无行情的已订阅合约（新订阅时用于立即轮询一次）"""
+        with self._lock:
+            return any(code not in self._quotes for code in self._refs)
+
+    # ---------------- 轮询 ----------------
+
+    def add_listener(self, fn: Callable[[List[str]], Any]) -> None:
+        """注册轮询后的回调，参数为有新变化的订阅者标识列表（在轮询线程中调用）"""
+        self._listeners.append(fn)
+
+    def poll_once(self) -> int:
+        """轮询一次全部订阅的合约（每个市场一次上游调用），返回轮询的合约数；无订阅时不请求上游"""
+        return self._flight.do("poll", self._poll)
+
+    def _poll(self) -> int:
+        with self._lock:
+            self._expire_locked()
+            markets = dict(self._markets)
+        if not markets:
+            return 0
+        quotes, errors = self._fetch(markets)
+        with self._lock:
+            self.polls += 1
+            self.upstream_calls += len(set(markets.values()))
+            self._tick += 1
+            tick = self._tick
+            self._polled_at = time.time()
+            self._errors = errors
+            changed_codes = set()
+            for code, rec in quotes.items():
+                if code not in self._refs:
+                    # 轮询期间已被取消订阅
+                    continue
+                old = self._quotes.get(code, {})
+                fields = self._changed.setdefault(code, {})
+                for name, value in rec.items():
+                    if name not in old or old[name] != value:
+                        fields[name] = tick
+                        changed_codes.add(code)
+                self._quotes[code] = rec
+            notify = [sid for sid, sub in self._subs.items() if any(c in changed_codes for c in sub.cursors)]
+        if errors:
+            logger.warning(f"订阅行情轮询部分失败: {errors}")
+        for fn in list(self._listeners):
+            try:
+                fn(notify)
+            except Exception as e:
+                logger.warning(f"订阅通知回调失败: {e}")
+        return len(markets)
+
+    def updates(self, subscriber_id: str) -> Dict[str, Any]:
+        """
+        取回订阅者自上次以来变化的字段：{合约代码: {字段: 新值}}；首次取回时为完整行情。
+        取回后游标前移，同一变化只发送一次。
+        """
+        with self._lock:
+            sub = self._subs.get(subscriber_id)
+            if sub is None:
+                raise KeyError(f"订阅者 {subscriber_id} 不存在或已过期，请重新订阅")
+            sub.last_seen = time.monotonic()
+            updates: Dict[str, Dict[str, Any]] = {}
+            pending: List[str] = []
+            for code, cursor in sub.cursors.items():
+                quote = self._quotes.get(code)
+                if quote is None:
+                    pending.append(code)
+                    continue
+                delta = {name: quote[name] for name, t in self._changed.get(code, {}).items() if t > cursor}
+                if delta:
+                    updates[code] = delta
+                sub.cursors[code] = self._tick
+            return {
+                "subscriber_id": subscriber_id,
+                "tick": self._tick,
+                "polled_at": self._fmt(self._polled_at),
+                "updates": updates,
+                "pending": pending,
+                "errors": dict(self._errors),
+            }
+
+    @staticmethod
+    def _fmt(ts: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(ts, cal.CN_TZ).strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "unique_contracts": len(self._refs),
+                "subscriptions": sum(len(s.cursors) for s in self._subs.values()),
+                "markets": sorted(set(self._markets.values())),
+                "tick": self._tick,
+                "polls": self.polls,
+                "upstream_calls": self.upstream_calls,
+                "polled_at": self._fmt(self._polled_at),
+                "errors": dict(self._errors),
+            }
@@ -0,0 +1,247 @@
+"""
+进程级共享 HTTP 客户端
+所有服务模块通过这里获取 httpx 客户端，复用连接池（keep-alive、可用时启用 HTTP/2、按主机限制连接数），
+避免每次请求都重新进行 TCP/TLS 握手。生命周期由 server/mcp_server.py 中 FastMCP 的 lifespan 管理。
+"""
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import httpx  # type: ignore
+except Exception:
+    httpx = None  # type: ignore
+
+logger = logging.getLogger('http_client')
+
+DEFAULT_TIMEOUT = 20.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _http2_available() -> bool:
+    # httpx 的 HTTP/2 支持依赖可选的 h2 包
+    try:
+        import h2  # type: ignore  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def _limits() -> Any:
+    return httpx.Limits(
+        max_connections=_env_int("HTTP_MAX_CONNECTIONS", 64),
+        max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE", 32),
+        keepalive_expiry=30.0,
+    )
+
+
+if httpx is not None:
+
+    class _ReleasingStream(httpx.SyncByteStream):
+        # 响应体读取完毕/关闭时释放主机信号量
+        def __init__(self, stream: Any, release: Callable[[], None]) -> None:
+            self._stream = stream
+            self._release = release
+            self._released = False
+
+        def __iter__(self) -> Any:
+            yield from self._stream
+
+        def close(self) -> None:
+            try:
+                self._stream.close()
+            finally:
+                if not self._released:
+                    self._released = True
+                    self._release()
+
+    class _AsyncReleasingStream(httpx.AsyncByteStream):
+        def __init__(self, stream: Any, release: Callable[[], None]) -> None:
+            self._stream = stream
+            self._release = release
+            self._released = False
+
+        async def __aiter__(self) -> Any:
+            async for chunk in self._stream:
+                yield chunk
+
+        async def aclose(self) -> None:
+            try:
+                await self._stream.aclose()
+            finally:
+                if not self._released:
+                    self._released = True
+                    self._release()
+
+    class _HostLimitedTransport(httpx.HTTPTransport):
+        """同步传输层：在连接池之上按主机限制并发连接数"""
+
+        def __init__(self, per_host: int, **kwargs: Any) -> None:
+            super().__init__(**kwargs)
+            self._per_host = per_host
+            self._sems: Dict[str, threading.BoundedSemaphore] = {}
+            self._lock = threading.Lock()
+
+        def _sem(self, host: str) -> threading.BoundedSemaphore:
+            with self._lock:
+                sem = self._sems.get(host)
+                if sem is None:
+                    sem = self._sems[host] = threading.BoundedSemaphore(self._per_host)
+                return sem
+
+        def handle_request(self, request: Any) -> Any:
+            sem = self._sem(request.url.host)
+            sem.acquire()
+            try:
+                resp = super().handle_request(request)
+            except BaseException:
+                sem.release()
+                raise
+            resp.stream = _ReleasingStream(resp.stream, sem.release)
+            return resp
+
+    class _AsyncHostLimitedTransport(httpx.AsyncHTTPTransport):
+        """异步传输层：按主机限制并发连接数（每个事件循环各自一份）"""
+
+        def __init__(self, per_host: int, **kwargs: Any) -> None:
+            super().__init__(**kwargs)
+            self._per_host = per_host
+            self._sems: Dict[str, asyncio.Semaphore] = {}
+
+        async def handle_async_request(self, request: Any) -> Any:
+            sem = self._sems.get(request.url.host)
+            if sem is None:
+                sem = self._sems[request.url.host] = asyncio.Semaphore(self._per_host)
+            await sem.acquire()
+            try:
+                resp = await super().handle_async_request(request)
+            except BaseException:
+                sem.release()
+                raise
+            resp.stream = _AsyncReleasingStream(resp.stream, sem.release)
+            return resp
+
+
+_lock = threading.Lock()
+_client: Optional[Any] = None
+# AsyncClient 的连接绑定在创建它的事件循环上，因此每个事件循环各持有一个：{事件循环: (客户端, 关闭任务)}；
+# 以弱引用为键，事件循环结束时随关闭任务一起移除，不会让已关闭的事件循环与连接池一直驻留
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Any, asyncio.Task]]" = weakref.WeakKeyDictionary()
+_io_loop: Optional[asyncio.AbstractEventLoop] = None
+_io_thread: Optional[threading.Thread] = None
+
+
+def get_client() -> Optional[Any]:
+    """获取进程共享的同步 httpx.Client；未安装 httpx 时返回 None"""
+    global _client
+    if httpx is None:
+        return None
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(
+                timeout=DEFAULT_TIMEOUT,
+                transport=_HostLimitedTransport(
+                    per_host=_env_int("HTTP_MAX_PER_HOST", 8),
+                    http2=_http2_available(),
+                    limits=_limits(),
+                ),
+            )
+        return _client
+
+
+def get_async_client() -> Optional[Any]:
+    """获取当前事件循环共享的 httpx.AsyncClient；未安装 httpx 时返回 None"""
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.get(loop)
+        if entry is not None and not entry[0].is_closed:
+            return entry[0]
+        client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            transport=_AsyncHostLimitedTransport(
+                per_host=_env_int("HTTP_MAX_PER_HOST", 8),
+                http2=_http2_available(),
+                limits=_limits(),
+            ),
+        )
+        _async_clients[loop] = (client, loop.create_task(_close_on_teardown(loop, client)))
+        return client
+
+
+async def _close_on_teardown(loop: asyncio.AbstractEventLoop, client: Any) -> None:
+    # asyncio.run 结束前会取消仍在运行的任务并等待其完成，借此在事件循环关闭前关闭该循环的客户端
+    try:
+        await loop.create_future()
+    finally:
+        with _lock:
+            entry = _async_clients.get(loop)
+            if entry is not None and entry[0] is client:
+                del _async_clients[loop]
+        await client.aclose()
+
+
+def _ensure_io_loop() -> asyncio.AbstractEventLoop:
+    # 后台 I/O 事件循环，供同步调用方执行协程并复用该循环上的 AsyncClient
+    global _io_loop, _io_thread
+    with _lock:
+        if _io_loop is None or _io_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="http-io-loop", daemon=True)
+            thread.start()
+            _io_loop, _io_thread = loop, thread
+        return _io_loop
+
+
+def run_sync(coro: Any, timeout: Optional[float] = None) -> Any:
+    """在后台 I/O 事件循环中执行协程并同步等待结果，可在任意线程（包括事件循环线程）中调用"""
+    loop = _ensure_io_loop()
+    if threading.current_thread() is _io_thread:
+        coro.close()
+        raise RuntimeError("run_sync 不能在 I/O 事件循环线程内调用")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def _close_loop_client() -> None:
+    with _lock:
+        entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        client, task = entry
+        task.cancel()
+        await client.aclose()
+
+
+def close() -> None:
+    """关闭同步客户端与后台 I/O 事件循环"""
+    global _client, _io_loop, _io_thread
+    with _lock:
+        client, _client = _client, None
+        loop, thread = _io_loop, _io_thread
+        _io_loop = _io_thread = None
+    if client is not None:
+        client.close()
+    if loop is not None and not loop.is_closed():
+        try:
+            asyncio.run_coroutine_threadsafe(_close_loop_client(), loop).result(5)
+        except Exception as e:
+            logger.warning(f"关闭 I/O 事件循环客户端失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(5)
+        loop.close()
+
+
+async def aclose() -> None:
+    """关闭当前事件循环的异步客户端以及同步客户端，在应用退出时调用"""
+    await _close_loop_client()
+    await asyncio.to_thread(close)
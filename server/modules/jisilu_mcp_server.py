@@ -1,28 +1,26 @@
+import os
 import sys
 import json
 import re
 import time
-from typing import List, Dict, Any
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple
 
 try:
-    import httpx  # type: ignore
-except Exception:
-    httpx = None  # type: ignore
-
-try:
-    from bs4 import BeautifulSoup  # type: ignore
-except Exception:
-    BeautifulSoup = None  # type: ignore
-
-
-try:
-    from mcp.server.fastmcp import FastMCP  # type: ignore
-except Exception:
-    FastMCP = None  # type: ignore
+    from . import http_client, singleflight
+except ImportError:
+    import http_client  # type: ignore
+    import singleflight  # type: ignore
 
 
 URL = "https://www.jisilu.cn/data/qdii/#qdiie"
 
+logger = logging.getLogger('jisilu_mcp_server')
+
 
 def _to_float_percent(s: str) -> float:
     # 将百分数字符串转为浮点数（去掉%和+号）
@@ -40,11 +38,11 @@ def _fetch_html(url: str) -> str:
         "Referer": "https://www.jisilu.cn/data/qdii/",
         "Accept-Language": "zh-CN,zh;q=0.9",
     }
-    if httpx is not None:
-        with httpx.Client(timeout=20) as client:
-            resp = client.get(url, headers=headers)
-            resp.raise_for_status()
-            return resp.text
+    client = http_client.get_client()
+    if client is not None:
+        resp = client.get(url, headers=headers, timeout=20)
+        resp.raise_for_status()
+        return resp.text
     import urllib.request
 
     req = urllib.request.Request(url, headers=headers)
@@ -52,184 +50,716 @@ def _fetch_html(url: str) -> str:
         return resp.read().decode("utf-8", errors="ignore")
 
 
-def _parse_with_bs4(html: str) -> List[Dict[str, Any]]:
-    # 使用BeautifulSoup解析表格，提取 T-1溢价率 与 申购状态 等字段
+# 页面解析使用的预编译正则
+_RE_TAG = re.compile(r"<[^>]+>")
+_RE_SPACE = re.compile(r"\s+")
+_RE_CODE_SPLIT = re.compile(r"(?=\b\d{6}\b)")
+_RE_CODE = re.compile(r"\b(\d{6})\b")
+_RE_NAME = re.compile(r"\b\d{6}\b\s*([^\d%\-]{2,}?)\s")
+_RE_T1 = re.compile(r"T-1溢价率\s*([+\-]?[\d\.]+)%")
+_RE_SUB = re.compile(r"申购状态\s*([\u4e00-\u9fffA-Za-z0-9%]+)")
+_RE_FUND_CODE = re.compile(r"\d{6}")
+
+# 表格单元格 data-name 属性 / 表头文字 -> 输出字段
+_HTML_FIELDS = {"fund_id": "代码", "fund_nm": "名称", "discount_rt": "T-1溢价率", "apply_status": "申购状态"}
+_HTML_ROW_FIELDS = ("代码", "名称", "T-1溢价率", "申购状态")
+_HTML_HEADERS = {"代码": "代码", "名称": "名称", "T-1溢价率": "T-1溢价率", "T-1 溢价率": "T-1溢价率", "溢价率": "T-1溢价率", "申购状态": "申购状态"}
+
+
+def _cell_text(el: Any) -> str:
+    # 纯文本单元格直接取 text，含子节点时才拼接并压缩空白
+    if len(el) == 0:
+        return (el.text or "").strip()
+    return _RE_SPACE.sub(" ", "".join(el.itertext())).strip()
+
+
+def _colspan(el: Any) -> int:
     try:
-        from lxml import html as lxml_html  # type: ignore
-    except Exception:
-        return []
+        return max(1, int(el.get("colspan") or 1))
+    except ValueError:
+        return 1
+
+
+def _header_fields(tr: Any) -> Dict[int, str]:
+    # 表头行：data-name 或表头文字 -> 字段，列位置按 colspan 累加
+    fields: Dict[int, str] = {}
+    col = 0
+    for th in tr:
+        if not isinstance(th.tag, str):
+            # 注释等非元素节点
+            continue
+        field = _HTML_FIELDS.get(th.get("data-name")) or _HTML_HEADERS.get(_RE_SPACE.sub("", _cell_text(th)))
+        if field is not None and field not in fields.values():
+            fields[col] = field
+        col += _colspan(th)
+    return fields
+
+
+def _known_row(tr: Any, columns: List[Tuple[int, Optional[str]]]) -> Optional[List[str]]:
+    # 按已记下的 (单元格下标, data-name) 直接取四个字段；单元格不足或 data-name 对不上时返回 None
+    if len(tr) <= max(idx for idx, _ in columns):
+        return None
+    texts: List[str] = []
+    for idx, name in columns:
+        td = tr[idx]
+        if name is None:
+            if not isinstance(td.tag, str):
+                return None
+        elif td.get("data-name") != name:
+            return None
+        texts.append(_cell_text(td))
+    return texts
+
+
+def _scan_row(tr: Any, header_fields: Dict[int, str]) -> Tuple[List[str], Optional[List[Tuple[int, Optional[str]]]]]:
+    # 整行扫描：优先按 data-name 取值，缺失时按表头列位置（含 colspan）取值；四个字段齐全时同时返回它们的位置
+    cells: Dict[str, Tuple[int, Any]] = {}
+    col = 0
+    for idx, td in enumerate(tr):
+        if not isinstance(td.tag, str):
+            continue
+        field = _HTML_FIELDS.get(td.get("data-name")) or header_fields.get(col)
+        if field is not None and field not in cells:
+            cells[field] = (idx, td)
+        col += _colspan(td)
+    texts = [_cell_text(cells[f][1]) if f in cells else "" for f in _HTML_ROW_FIELDS]
+    if len(cells) < len(_HTML_ROW_FIELDS):
+        return texts, None
+    return texts, [(cells[f][0], cells[f][1].get("data-name")) for f in _HTML_ROW_FIELDS]
+
+
+def _parse_html_rows(html: str) -> List[Dict[str, Any]]:
+    """
+    单遍解析集思录页面表格，取出每行的代码/名称/T-1溢价率/申购状态。
+    同一表格内各行列布局相同：第一行整行扫描后记下四个字段的单元格下标，后续行直接按下标取值，
+    下标与 data-name 不符（如合并单元格的汇总行）时再退回整行扫描
+    """
     try:
-        tree = lxml_html.fromstring(html)
+        from lxml import etree  # type: ignore
     except Exception:
+        return _parse_with_regex(html)
+    root = etree.fromstring(html, etree.HTMLParser())
+    if root is None:
         return []
-    nodes = tree.xpath('//td[@data-name="apply_status"]/text()')
+    header_fields: Dict[int, str] = {}
+    columns: Optional[List[Tuple[int, Optional[str]]]] = None
     result: List[Dict[str, Any]] = []
-    for txt in nodes:
-        s = str(txt).strip()
-        if s:
-            result.append({"申购状态": s})
+    seen: set = set()
+    for tr in root.iter("tr"):
+        if len(tr) and tr[0].tag == "th":
+            fields = _header_fields(tr)
+            if fields:
+                # 新表格（或分组表头的最后一行）：重新确定列位置
+                header_fields, columns = fields, None
+            continue
+        texts = _known_row(tr, columns) if columns else None
+        if texts is None:
+            texts, found = _scan_row(tr, header_fields)
+            if found is not None:
+                columns = found
+        code = texts[0] or tr.get("id", "")
+        if _RE_FUND_CODE.fullmatch(code) and code not in seen:
+            seen.add(code)
+            result.append({"代码": code, "名称": texts[1], "T-1溢价率": texts[2], "申购状态": texts[3]})
     return result
 
 
 def _parse_with_regex(html: str) -> List[Dict[str, Any]]:
-    # 当表格解析失败时，使用正则从纯文本回退提取核心字段
-    text = re.sub(r"<[^>]+>", " ", html)
-    text = re.sub(r"\s+", " ", text)
-    chunks = re.split(r"(?=\b\d{6}\b)", text)
+    # 当表格解析不可用时，使用正则从纯文本回退提取核心字段
+    text = _RE_TAG.sub(" ", html)
+    text = _RE_SPACE.sub(" ", text)
+    chunks = _RE_CODE_SPLIT.split(text)
     result: List[Dict[str, Any]] = []
     for chunk in chunks:
-        m_code = re.search(r"\b(\d{6})\b", chunk)
+        m_code = _RE_CODE.search(chunk)
         if not m_code:
             continue
         code = m_code.group(1)
-        m_name = re.search(r"\b\d{6}\b\s*([^\d%\-]{2,}?)\s", chunk)
+        m_name = _RE_NAME.search(chunk)
         name = m_name.group(1).strip() if m_name else ""
-        m_t1 = re.search(r"T-1溢价率\s*([+\-]?[\d\.]+)%", chunk)
+        m_t1 = _RE_T1.search(chunk)
         t1 = m_t1.group(1) + "%" if m_t1 else ""
-        m_sub = re.search(r"申购状态\s*([\u4e00-\u9fffA-Za-z0-9%]+)", chunk)
+        m_sub = _RE_SUB.search(chunk)
         sub = m_sub.group(1) if m_sub else ""
         if t1 or sub:
             result.append({"代码": code, "名称": name, "T-1溢价率": t1, "申购状态": sub})
     return result
 
 
-def _fetch_api_rows() -> List[Dict[str, Any]]:
-    """从集思录 API 获取数据，包括 QDII 和 LOF 基金"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
-        "Referer": "https://www.jisilu.cn/data/qdii/",
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "zh-CN,zh;q=0.9",
-    }
-    out: List[Dict[str, Any]] = []
-    
-    # 1. 获取 QDII 数据
-    for cat in ["E", "C", "A"]:
-        url = f"https://www.jisilu.cn/data/qdii/qdii_list/{cat}"
-        params = {"___jsl": f"LST___t={int(time.time()*1000)}", "rp": "22"}
+def _fetch_html_rows() -> List[Dict[str, Any]]:
+    # 页面回退：抓取集思录 QDII 页面并解析表格
+    try:
+        start = time.perf_counter()
+        rows = _parse_html_rows(_fetch_html(URL))
+        logger.info(f"集思录页面解析 {len(rows)} 条，耗时 {time.perf_counter() - start:.3f}s")
+        return rows
+    except Exception as e:
+        logger.warning(f"集思录页面获取失败: {e}")
+        return []
+
+
+API_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Referer": "https://www.jisilu.cn/data/qdii/",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-CN,zh;q=0.9",
+}
+
+QDII_LIST_URL = "https://www.jisilu.cn/data/qdii/qdii_list/{cat}"
+LOF_LIST_URL = "https://www.jisilu.cn/data/lof/index_lof_list/"
+QDII_CATEGORIES = ("E", "C", "A")
+QDII_PAGE_SIZE = 22
+LOF_PAGE_SIZE = 25
+API_TIMEOUT = 20
+
+
+def _jsl_stamp() -> str:
+    return f"LST___t={int(time.time()*1000)}"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _api_requests() -> List[Tuple[str, str, Dict[str, str], int]]:
+    # 生成需要并发请求的 (分类标签, URL, 参数, 每页条数) 列表：QDII 的 E/C/A 三类 + LOF
+    reqs: List[Tuple[str, str, Dict[str, str], int]] = []
+    for cat in QDII_CATEGORIES:
+        params: Dict[str, str] = {}
         if cat in ("E", "A"):
             params.update({"only_lof": "y", "only_etf": "y"})
-        try:
-            data = None
-            if httpx is not None:
-                resp = httpx.get(url, params=params, headers=headers, timeout=20)
-                resp.raise_for_status()
-                data = resp.json()
-            else:
-                import urllib.parse
-                import urllib.request
-                q = urllib.parse.urlencode(params)
-                req = urllib.request.Request(url + "?" + q, headers=headers)
-                with urllib.request.urlopen(req, timeout=20) as f:
-                    data = json.loads(f.read().decode("utf-8", errors="ignore"))
-        except Exception:
-            data = None
-        if not isinstance(data, dict):
-            continue
-        for row in data.get("rows", []):
-            cell = row.get("cell", {})
-            out.append({
-                "代码": str(cell.get("fund_id", "")),
-                "名称": str(cell.get("fund_nm", "")),
-                "T-1溢价率": str(cell.get("discount_rt", "")),
-                "申购状态": str(cell.get("apply_status", "")),
-            })
-    
-    # 2. 获取 LOF 数据
-    lof_url = "https://www.jisilu.cn/data/lof/index_lof_list/"
-    lof_params = {
-        "___jsl": f"LST___t={int(time.time()*1000)}",
-        "rp": "25",
-        "page": "1"
+        reqs.append((f"QDII-{cat}", QDII_LIST_URL.format(cat=cat), params, QDII_PAGE_SIZE))
+    reqs.append(("LOF", LOF_LIST_URL, {}, LOF_PAGE_SIZE))
+    return reqs
+
+
+def _cell_to_row(cell: Dict[str, Any]) -> Dict[str, Any]:
+    # QDII 与 LOF 接口的 cell 字段名一致，统一转换为中文字段
+    return {
+        "代码": str(cell.get("fund_id", "")),
+        "名称": str(cell.get("fund_nm", "")),
+        "T-1溢价率": str(cell.get("discount_rt", "")),
+        "申购状态": str(cell.get("apply_status", "")),
     }
+
+
+def _get_json_urllib(url: str, params: Dict[str, str]) -> Any:
+    import urllib.parse
+    import urllib.request
+
+    q = urllib.parse.urlencode(params)
+    req = urllib.request.Request(url + "?" + q, headers=API_HEADERS)
+    with urllib.request.urlopen(req, timeout=API_TIMEOUT) as f:
+        return json.loads(f.read().decode("utf-8", errors="ignore"))
+
+
+async def _get_json_async(client: Any, url: str, params: Dict[str, str]) -> Any:
+    if client is not None:
+        resp = await client.get(url, params=params, headers=API_HEADERS, timeout=API_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
+    # 没有 httpx 时退回 urllib，放到线程中执行以免阻塞其它分类
+    return await asyncio.to_thread(_get_json_urllib, url, params)
+
+
+def _rows_of(data: Any) -> List[Dict[str, Any]]:
+    if not isinstance(data, dict):
+        raise ValueError("unexpected payload")
+    return [_cell_to_row(row.get("cell", {})) for row in data.get("rows", [])]
+
+
+def _page_count(data: Dict[str, Any], page_size: int, first_len: int) -> int:
+    # 根据首页返回的 total 计算总页数，受 JISILU_MAX_PAGES 限制
     try:
-        data = None
-        if httpx is not None:
-            resp = httpx.get(lof_url, params=lof_params, headers=headers, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-        else:
-            import urllib.parse
-            import urllib.request
-            q = urllib.parse.urlencode(lof_params)
-            req = urllib.request.Request(lof_url + "?" + q, headers=headers)
-            with urllib.request.urlopen(req, timeout=20) as f:
-                data = json.loads(f.read().decode("utf-8", errors="ignore"))
-        
-        if isinstance(data, dict):
-            for row in data.get("rows", []):
-                cell = row.get("cell", {})
-                # LOF 数据格式可能与 QDII 略有不同，需要适配
-                out.append({
-                    "代码": str(cell.get("fund_id", "")),
-                    "名称": str(cell.get("fund_nm", "")),
-                    "T-1溢价率": str(cell.get("discount_rt", "")),
-                    "申购状态": str(cell.get("apply_status", "")),
-                })
-    except Exception as e:
-        # LOF 数据获取失败时不影响整体流程，记录错误但继续
-        pass
-    
+        total = int(data.get("total") or 0)
+    except (TypeError, ValueError):
+        total = 0
+    if total <= first_len:
+        return 1
+    return min(-(-total // page_size), _env_int("JISILU_MAX_PAGES", 50))
+
+
+async def _fetch_page(client: Any, url: str, params: Dict[str, str], page: int, page_size: int, sem: asyncio.Semaphore) -> Any:
+    async with sem:
+        page_params = dict(params, ___jsl=_jsl_stamp(), rp=str(page_size), page=str(page))
+        return await _get_json_async(client, url, page_params)
+
+
+async def _stream_category(client: Any, url: str, params: Dict[str, str], page_size: int, sem: asyncio.Semaphore) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    分页读取单个分类：先取第1页得到 total，再在并发上限内并行抓取其余页，
+    每页到达即产出。首页失败向上抛出，后续单页失败只记录日志。
+    """
+    first = await _fetch_page(client, url, params, 1, page_size, sem)
+    rows = _rows_of(first)
+    pages = _page_count(first, page_size, len(rows))
+    yield rows
+    if pages <= 1:
+        return
+    tasks = [asyncio.create_task(_fetch_page(client, url, params, p, page_size, sem)) for p in range(2, pages + 1)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                data = await fut
+                yield _rows_of(data)
+            except Exception as e:
+                logger.warning(f"集思录 {url} 分页获取失败: {e}")
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def _stream_api_rows(client: Any) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """所有分类并发分页抓取，按页到达顺序产出 (分类标签, 行列表)"""
+    queue: "asyncio.Queue[Tuple[str, Optional[List[Dict[str, Any]]]]]" = asyncio.Queue()
+    sem = asyncio.Semaphore(_env_int("JISILU_PAGE_CONCURRENCY", 6))
+
+    async def pump(label: str, url: str, params: Dict[str, str], page_size: int) -> None:
+        # 单个分类独立抓取，异常只影响本分类
+        start = time.perf_counter()
+        seen: set = set()
+        count = pages = 0
+        try:
+            async for rows in _stream_category(client, url, params, page_size, sem):
+                # 翻页期间数据可能移动，按代码去重
+                fresh = [r for r in rows if r["代码"] not in seen]
+                seen.update(r["代码"] for r in fresh)
+                count += len(fresh)
+                pages += 1
+                await queue.put((label, fresh))
+            logger.info(f"集思录 {label} 获取 {count} 条（{pages} 页），耗时 {time.perf_counter() - start:.3f}s")
+        except Exception as e:
+            logger.warning(f"集思录 {label} 获取失败，耗时 {time.perf_counter() - start:.3f}s: {str(e) or type(e).__name__}")
+        finally:
+            await queue.put((label, None))
+
+    tasks = [asyncio.create_task(pump(*req)) for req in _api_requests()]
+    pending = len(tasks)
+    try:
+        while pending:
+            label, rows = await queue.get()
+            if rows is None:
+                pending -= 1
+                continue
+            yield label, rows
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def _fetch_api_rows_async() -> List[Dict[str, Any]]:
+    """
+    并发分页获取集思录 QDII(E/C/A) 与 LOF 数据，按到达顺序合并。
+    各页在到达时即并入结果，但候选过滤在合并后的完整快照上执行：快照按 TTL 缓存并被多个阈值查询、
+    增量比对与历史存储共用，逐页过滤只对单个阈值有效，且全部行仍需保存在快照中
+    """
+    start = time.perf_counter()
+    out: List[Dict[str, Any]] = []
+    # 共享连接池客户端；未安装 httpx 时为 None，回退到 urllib
+    client = http_client.get_async_client()
+    async for _, rows in _stream_api_rows(client):
+        out.extend(rows)
+    logger.info(f"集思录全部分类获取完成，共 {len(out)} 条，总耗时 {time.perf_counter() - start:.3f}s")
     return out
 
 
+def _fetch_api_rows() -> List[Dict[str, Any]]:
+    """从集思录 API 获取数据，包括 QDII 和 LOF 基金"""
+    return http_client.run_sync(_fetch_api_rows_async())
+
+
+# akshare 集思录 QDII 接口（API 失败时的回退数据源）
+AK_QDII_FUNCS = (
+    "qdii_e_index_jsl",
+    "qdii_e_comm_jsl",
+    "qdii_c_jsl",
+    "qdii_a_jsl",
+)
+
+# 输出字段 -> DataFrame 中的候选列名（按优先级）
+AK_COLUMN_MAP = {
+    "代码": ("代码", "fund_id"),
+    "名称": ("名称", "fund_nm"),
+    "T-1溢价率": ("T-1溢价率", "T-1 溢价率", "discount_rt"),
+    "申购状态": ("申购状态", "apply_status"),
+}
+
+
+def _ak_df_to_rows(df: Any) -> List[Dict[str, Any]]:
+    # 每个 DataFrame 只做一次列映射，再按列整体转换为字符串后拼装记录；
+    # 不用 astype(str)：pandas 3 的字符串类型会保留缺失值，而旧的逐行实现输出 "nan" / "None"
+    n = len(df)
+    columns: List[List[str]] = []
+    for candidates in AK_COLUMN_MAP.values():
+        col = next((c for c in candidates if c in df.columns), None)
+        columns.append(list(map(str, df[col].tolist())) if col is not None else [""] * n)
+    fields = tuple(AK_COLUMN_MAP)
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+def _ak_fetch_one(ak: Any, name: str) -> Any:
+    fn = getattr(ak, name, None)
+    if not callable(fn):
+        return None
+    start = time.perf_counter()
+    df = fn()
+    logger.info(f"akshare {name} 获取 {0 if df is None else len(df)} 条，耗时 {time.perf_counter() - start:.3f}s")
+    return df
+
+
 def _fetch_ak_rows() -> List[Dict[str, Any]]:
     try:
         import akshare as ak  # type: ignore
     except Exception:
         return []
-    names = [
-        "qdii_e_index_jsl",
-        "qdii_e_comm_jsl",
-        "qdii_c_jsl",
-        "qdii_a_jsl",
-    ]
-    datasets: List[Any] = []
-    for n in names:
-        try:
-            fn = getattr(ak, n, None)
-            if callable(fn):
-                df = fn()
-                datasets.append(df)
-        except Exception:
-            continue
+    # 四个数据集在线程池中并行获取，单个失败不影响其它
+    with ThreadPoolExecutor(max_workers=len(AK_QDII_FUNCS)) as pool:
+        futures = [pool.submit(_ak_fetch_one, ak, n) for n in AK_QDII_FUNCS]
     out: List[Dict[str, Any]] = []
-    for df in datasets:
+    for name, fut in zip(AK_QDII_FUNCS, futures):
         try:
-            for _, r in df.iterrows():
-                out.append({
-                    "代码": str(r.get("代码", r.get("fund_id", ""))),
-                    "名称": str(r.get("名称", r.get("fund_nm", ""))),
-                    "T-1溢价率": str(r.get("T-1溢价率", r.get("T-1 溢价率", r.get("discount_rt", "")))),
-                    "申购状态": str(r.get("申购状态", r.get("apply_status", ""))),
-                })
-        except Exception:
+            df = fut.result()
+            if df is not None:
+                out.extend(_ak_df_to_rows(df))
+        except Exception as e:
+            logger.warning(f"akshare {name} 获取失败: {e}")
             continue
     return out
 
+
 def _fetch_data() -> List[Dict[str, Any]]:
-    rows = _fetch_api_rows()
-    if rows:
-        return rows
-    return _fetch_ak_rows()
+    # 回退链：集思录 API -> akshare -> 集思录页面解析
+    for source in (_fetch_api_rows, _fetch_ak_rows, _fetch_html_rows):
+        rows = source()
+        if rows:
+            return rows
+        logger.warning(f"数据源 {source.__name__} 无数据，尝试下一数据源")
+    return []
 
 
-def qdii_candidates(threshold: float = 2.0) -> List[Dict[str, Any]]:
-    # 过滤逻辑：T-1溢价率 > threshold 且 申购状态 ≠ "暂停申购" 且 申购状态 ≠ "开放申购"
-    rows = _fetch_data()
-    out: List[Dict[str, Any]] = []
+def _snapshot_ttl() -> float:
+    # 快照有效期（秒），可通过环境变量 JISILU_SNAPSHOT_TTL 配置
+    try:
+        return float(os.getenv("JISILU_SNAPSHOT_TTL", "60"))
+    except ValueError:
+        return 60.0
+
+
+def _failure_cooldown() -> float:
+    # 所有数据源均失败后的冷却时间（秒），期间不再重新抓取，可通过环境变量 JISILU_FAILURE_COOLDOWN 配置
+    try:
+        return float(os.getenv("JISILU_FAILURE_COOLDOWN", "15"))
+    except ValueError:
+        return 15.0
+
+
+# 原始行数据快照：阈值与申购状态过滤均在内存中针对快照执行
+_snapshot: Optional[Dict[str, Any]] = None
+# 最近一次所有数据源均失败的单调时钟时间，抓取成功后清空
+_failed_at: Optional[float] = None
+_snapshot_lock = threading.Lock()
+snapshot_flight = singleflight.Group("jisilu_snapshot")
+# 最近若干个版本的列式快照，用于增量比对；键为单调递增的版本号（毫秒时间戳，服务器重启后不会与旧版本号重合）
+_versions: "OrderedDict[int, QdiiColumns]" = OrderedDict()
+_version_seq = 0
+# 新快照产生后依次调用的监听器，如历史存储；监听器应尽快返回
+_snapshot_listeners: List[Callable[[Dict[str, Any]], Any]] = []
+
+
+def add_snapshot_listener(fn: Callable[[Dict[str, Any]], Any]) -> None:
+    """注册新快照监听器"""
+    if fn not in _snapshot_listeners:
+        _snapshot_listeners.append(fn)
+
+
+def _notify_snapshot(snap: Dict[str, Any]) -> None:
+    for fn in list(_snapshot_listeners):
+        try:
+            fn(snap)
+        except Exception as e:
+            logger.error(f"快照监听器 {getattr(fn, '__name__', fn)} 执行失败: {e}")
+
+
+# 不参与套利的申购状态
+EXCLUDED_STATUS = ("暂停申购", "开放申购")
+
+
+class QdiiColumns:
+    """
+    快照的列式表示：溢价率为 float64，申购状态为分类编码，
+    阈值与状态过滤以向量化方式执行，每个快照只构建一次
+    （numpy 在首次构建时才导入，不拖慢服务器启动）
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        import numpy as np
+
+        n = len(rows)
+        self.codes = np.array([str(r.get("代码", "")) for r in rows], dtype=object)
+        self.names = np.array([str(r.get("名称", "")) for r in rows], dtype=object)
+        self.premium = np.fromiter(
+            (_to_float_percent(str(r.get("T-1溢价率", ""))) for r in rows), dtype=np.float64, count=n
+        )
+        statuses = np.array([str(r.get("申购状态", "")) for r in rows], dtype=object)
+        if n:
+            categories, codes = np.unique(statuses, return_inverse=True)
+        else:
+            categories, codes = np.array([], dtype=object), np.array([], dtype=np.intp)
+        self.status_categories: List[str] = [str(c) for c in categories]
+        self.status_code = codes.astype(np.int16)
+        eligible_status = np.array([c not in EXCLUDED_STATUS for c in self.status_categories], dtype=bool)
+        # 溢价率有效且申购状态可套利的行；NaN 与任何阈值比较均为 False
+        self.eligible = eligible_status[self.status_code] & ~np.isnan(self.premium) if n else np.zeros(0, dtype=bool)
+        self.index = {c: i for i, c in enumerate(self.codes)}
+        # 可套利行按溢价率升序排列，多阈值查询通过二分查找一次得出
+        idx = np.flatnonzero(self.eligible)
+        order = np.argsort(self.premium[idx], kind="stable")
+        self._sorted_idx = idx[order]
+        self._sorted_premium = self.premium[self._sorted_idx]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return {
+            "代码": self.codes[i],
+            "名称": self.names[i],
+            "T-1溢价率": float(self.premium[i]),
+            "申购状态": self.status_categories[self.status_code[i]],
+        }
+
+    def candidates(self, threshold: float) -> List[Dict[str, Any]]:
+        """溢价率 > threshold 的可套利基金，保持原始行顺序"""
+        import numpy as np
+
+        mask = self.eligible & (self.premium > threshold)
+        return [self.record(i) for i in np.flatnonzero(mask)]
+
+    def candidates_multi(self, thresholds: List[float]) -> Dict[float, List[Dict[str, Any]]]:
+        """一次遍历回答多个阈值：结果按溢价率降序，共享同一批记录对象"""
+        import numpy as np
+
+        ranked = [self.record(i) for i in self._sorted_idx[::-1]]
+        cuts = np.searchsorted(self._sorted_premium, np.asarray(thresholds, dtype=np.float64), side="right")
+        total = len(ranked)
+        return {t: ranked[:total - int(c)] for t, c in zip(thresholds, cuts)}
+
+    def candidates_by_fund(self, fund_thresholds: Dict[str, float], default: Optional[float] = None) -> List[Dict[str, Any]]:
+        """每只基金使用各自阈值；未列出的基金使用 default，default 为 None 时不参与"""
+        import numpy as np
+
+        limits = np.full(len(self), np.inf if default is None else float(default), dtype=np.float64)
+        for code, t in fund_thresholds.items():
+            i = self.index.get(str(code))
+            if i is not None:
+                limits[i] = float(t)
+        mask = self.eligible & (self.premium > limits)
+        out = []
+        for i in np.flatnonzero(mask):
+            rec = self.record(i)
+            rec["阈值"] = float(limits[i])
+            out.append(rec)
+        return out
+
+
+def _intern_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 版本历史保留多份快照的列式数据；驻留代码/名称/申购状态字符串，使各版本共享同一批字符串对象
     for r in rows:
-        p = _to_float_percent(str(r.get("T-1溢价率", "")))
-        status = str(r.get("申购状态", ""))
-        # if p == p and p > threshold and status.startswith("限"):
-        if p == p and p > threshold and status != "暂停申购" and status != "开放申购":
-            out.append({
-                "代码": r.get("代码", ""),
-                "名称": r.get("名称", ""),
-                "T-1溢价率": p,
-                "申购状态": status,
-            })
-    return out
+        for key in ("代码", "名称", "申购状态"):
+            value = r.get(key)
+            if type(value) is str:
+                r[key] = sys.intern(value)
+    return rows
+
+
+def get_snapshot(force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    获取集思录原始行数据快照，在有效期内直接复用，不重复抓取
+
+    Args:
+        force_refresh: 为 True 时忽略有效期，立即重新抓取（已有抓取进行中时加入该次抓取）；
+            所有数据源刚刚失败时，冷却期（JISILU_FAILURE_COOLDOWN）内仍直接返回上一次的快照
+
+    Returns:
+        {"rows": 原始行列表, "columns": QdiiColumns, "version": 版本号, "fetched_at": 抓取时间戳, "monotonic": 单调时钟}
+    """
+    snap = _snapshot
+    if not force_refresh and snap is not None and snapshot_age(snap) < _snapshot_ttl():
+        return snap
+    failed_at = _failed_at
+    if failed_at is not None and time.monotonic() - failed_at < _failure_cooldown():
+        # 上游刚刚全部失败，冷却期内不再依次重试 API、akshare 与页面解析
+        return _failed_snapshot(snap)
+    # 并发的调用方共享同一次抓取
+    return snapshot_flight.do("qdii_lof", _fetch_snapshot)
+
+
+def _failed_snapshot(previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # 抓取失败时返回上一次成功的快照并标记为过期；从未成功过时返回空快照
+    if previous is not None:
+        return dict(previous, stale=True)
+    return {"rows": [], "columns": QdiiColumns([]), "fetched_at": time.time(), "monotonic": time.monotonic()}
+
+
+def _fetch_snapshot() -> Dict[str, Any]:
+    global _snapshot, _failed_at
+    rows = _intern_rows(_fetch_data())
+    if not rows:
+        # 抓取失败（空数据）时不覆盖已有快照；冷却期过后的调用才会再次尝试
+        _failed_at = time.monotonic()
+        previous = _snapshot
+        if previous is not None:
+            logger.warning(f"集思录数据获取失败，沿用 {snapshot_age(previous):.0f}s 前的快照，{_failure_cooldown():g}s 内不再重试")
+        return _failed_snapshot(previous)
+    snap = {"rows": rows, "columns": QdiiColumns(rows), "fetched_at": time.time(), "monotonic": time.monotonic()}
+    with _snapshot_lock:
+        _snapshot = snap
+        _failed_at = None
+        _remember_version(snap)
+    _notify_snapshot(snap)
+    return snap
+
+
+def _remember_version(snap: Dict[str, Any]) -> None:
+    # 调用方持有 _snapshot_lock
+    global _version_seq
+    _version_seq = max(_version_seq + 1, int(time.time() * 1000))
+    snap["version"] = _version_seq
+    _versions[_version_seq] = snap["columns"]
+    keep = _env_int("JISILU_SNAPSHOT_VERSIONS", 120)
+    while len(_versions) > keep:
+        _versions.popitem(last=False)
+
+
+def refresh_snapshot() -> int:
+    """强制刷新集思录快照，返回行数（供后台预取调用）"""
+    snap = get_snapshot(force_refresh=True)
+    if snap.get("stale") or not snap["rows"]:
+        raise RuntimeError("集思录数据获取失败")
+    return len(snap["rows"])
+
+
+def snapshot_age(snap: Dict[str, Any]) -> float:
+    """快照距今的秒数"""
+    return max(0.0, time.monotonic() - snap["monotonic"])
+
+
+def cached_snapshot_age() -> Optional[float]:
+    """当前缓存快照距今的秒数，尚未抓取时为 None"""
+    snap = _snapshot
+    return snapshot_age(snap) if snap is not None else None
+
+
+def _snapshot_meta(snap: Dict[str, Any]) -> Dict[str, Any]:
+    meta = {
+        "snapshot_version": snap.get("version", 0),
+        "snapshot_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snap["fetched_at"])),
+        "snapshot_age": round(snapshot_age(snap), 3),
+    }
+    if snap.get("stale"):
+        # 刷新失败，数据来自上一次成功的快照
+        meta["stale"] = True
+    return meta
+
+
+def qdii_candidates(threshold: float = 2.0, force_refresh: bool = False) -> List[Dict[str, Any]]:
+    # 过滤逻辑：T-1溢价率 > threshold 且 申购状态 ≠ "暂停申购" 且 申购状态 ≠ "开放申购"
+    return get_snapshot(force_refresh)["columns"].candidates(threshold)
+
+
+def qdii_candidates_with_meta(threshold: float = 2.0, force_refresh: bool = False) -> Dict[str, Any]:
+    """返回候选列表及快照时间、快照年龄（秒）"""
+    snap = get_snapshot(force_refresh)
+    data = snap["columns"].candidates(threshold)
+    return dict(_snapshot_meta(snap), count=len(data), data=data)
+
+
+def qdii_candidates_multi(
+    thresholds: Optional[List[float]] = None,
+    fund_thresholds: Optional[Dict[str, float]] = None,
+    default_threshold: Optional[float] = None,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    基于同一快照一次性回答多个阈值查询
+
+    Args:
+        thresholds: 阈值列表，每个阈值返回一组候选（按溢价率降序）
+        fund_thresholds: 按基金代码指定的阈值
+        default_threshold: fund_thresholds 未列出的基金所用阈值，None 表示只查询列出的基金
+        force_refresh: 是否忽略快照缓存强制重新抓取
+    """
+    snap = get_snapshot(force_refresh)
+    cols: QdiiColumns = snap["columns"]
+    result = _snapshot_meta(snap)
+    if thresholds:
+        by_threshold = cols.candidates_multi([float(t) for t in thresholds])
+        result["by_threshold"] = [{"threshold": t, "count": len(v), "data": v} for t, v in by_threshold.items()]
+    if fund_thresholds or default_threshold is not None:
+        data = cols.candidates_by_fund(fund_thresholds or {}, default_threshold)
+        result["by_fund"] = {"count": len(data), "data": data}
+    return result
+
+
+def _diff_candidates(old: QdiiColumns, new: QdiiColumns, threshold: float, premium_delta: float) -> Dict[str, List[Dict[str, Any]]]:
+    # 候选集合以基金代码为键做集合运算，共同部分通过代码索引直接定位比较
+    old_set = set(old.codes[old.eligible & (old.premium > threshold)])
+    new_set = set(new.codes[new.eligible & (new.premium > threshold)])
+    entered = [new.record(i) for i in sorted(new.index[c] for c in new_set - old_set)]
+    exited = [old.record(k) for k in sorted(old.index[c] for c in old_set - new_set)]
+    changed: List[Dict[str, Any]] = []
+    for c in new_set & old_set:
+        i, k = new.index[c], old.index[c]
+        moved = abs(float(new.premium[i]) - float(old.premium[k])) >= premium_delta
+        status_changed = new.status_categories[new.status_code[i]] != old.status_categories[old.status_code[k]]
+        if moved or status_changed:
+            rec = new.record(i)
+            rec["前T-1溢价率"] = float(old.premium[k])
+            rec["前申购状态"] = old.status_categories[old.status_code[k]]
+            changed.append(rec)
+    changed.sort(key=lambda r: new.index[r["代码"]])
+    return {"entered": entered, "exited": exited, "changed": changed}
+
+
+def qdii_candidate_changes(
+    threshold: float = 2.0,
+    since_version: Optional[int] = None,
+    premium_delta: float = 0.5,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    返回相对 since_version 新进入、退出或明显变化的套利候选
+
+    Args:
+        threshold: 溢价率阈值
+        since_version: 上次拿到的 snapshot_version；为空或已过期时返回全部候选（full=True）
+        premium_delta: 溢价率变动达到该值（百分点）视为变化
+        force_refresh: 是否忽略快照缓存强制重新抓取
+    """
+    snap = get_snapshot(force_refresh)
+    new: QdiiColumns = snap["columns"]
+    with _snapshot_lock:
+        old = _versions.get(since_version) if since_version is not None else None
+    result = _snapshot_meta(snap)
+    result["since_version"] = since_version
+    if "version" not in snap:
+        # 从未成功抓取过：返回空的增量而不是把所有旧候选列为退出，客户端保留原有列表
+        result["full"] = False
+        result["error"] = "集思录数据获取失败"
+        diff: Dict[str, List[Dict[str, Any]]] = {"entered": [], "exited": [], "changed": []}
+    elif old is None:
+        result["full"] = True
+        diff = {"entered": new.candidates(threshold), "exited": [], "changed": []}
+    else:
+        result["full"] = False
+        diff = _diff_candidates(old, new, threshold, premium_delta) if old is not new else {"entered": [], "exited": [], "changed": []}
+    result.update(diff)
+    result["count"] = {k: len(v) for k, v in diff.items()}
+    return result
+
 
 if __name__ == "__main__":
     res = qdii_candidates(2.0)
@@ -0,0 +1,268 @@
+"""
+QDII/LOF 溢价率时间序列存储
+每次集思录快照都追加写入本地 SQLite（按 基金代码 + 时间 聚簇），
+写入由后台线程完成，不阻塞工具响应；定期执行保留期清理与历史数据压缩。
+"""
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('premium_store')
+
+# 交易数据统一按北京时间解释，避免容器时区（通常为 UTC）影响
+CN_TZ = timezone(timedelta(hours=8))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS premium (
+    code TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    name TEXT,
+    premium REAL,
+    status TEXT,
+    PRIMARY KEY (code, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_premium_ts ON premium (ts);
+"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_db_path() -> str:
+    # 默认位于项目根目录 data/ 下（modules -> server -> root），可通过 PREMIUM_DB_PATH 覆盖
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.getenv("PREMIUM_DB_PATH", os.path.join(root, "data", "premium_history.db"))
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def parse_time(value: str, default: datetime) -> int:
+    """将 "YYYY-MM-DD" / "YYYY-MM-DD HH:MM[:SS]"（北京时间）转换为时间戳，空字符串使用默认值"""
+    value = (value or "").strip()
+    if not value:
+        return int(default.timestamp())
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y%m%d"):
+        try:
+            return int(datetime.strptime(value, fmt).replace(tzinfo=CN_TZ).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析时间: {value}")
+
+
+class PremiumStore:
+    """
+    追加写入的溢价率存储
+
+    Args:
+        path: SQLite 文件路径
+        retention_days: 保留天数，更早的数据会被删除
+        compact_after_days: 超过该天数的数据压缩为每只基金每小时一条
+        maintenance_interval: 两次保留期清理/压缩之间的最小间隔（秒）
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        retention_days: Optional[float] = None,
+        compact_after_days: Optional[float] = None,
+        maintenance_interval: float = 3600.0,
+        max_pending: int = 64,
+    ) -> None:
+        self.path = path or default_db_path()
+        self.retention_days = retention_days if retention_days is not None else _env_float("PREMIUM_RETENTION_DAYS", 90)
+        self.compact_after_days = compact_after_days if compact_after_days is not None else _env_float("PREMIUM_COMPACT_AFTER_DAYS", 7)
+        self.maintenance_interval = maintenance_interval
+        self._queue: "queue.Queue[Optional[Tuple[int, List[Tuple[Any, ...]]]]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_maintenance = time.monotonic()
+        self.dropped = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with _connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+
+    # ---------------- 写入 ----------------
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._writer, name="premium-store-writer", daemon=True)
+                self._thread.start()
+
+    def append(self, ts: float, rows: List[Tuple[str, str, float, str]]) -> bool:
+        """
+        异步追加一批 (代码, 名称, 溢价率, 申购状态) 记录，立即返回
+
+        Returns:
+            是否成功入队；队列满时丢弃该批并返回 False
+        """
+        if not rows:
+            return True
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((int(ts), rows))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("溢价率存储写入队列已满，丢弃本次快照")
+            return False
+
+    def record_snapshot(self, snap: Dict[str, Any]) -> bool:
+        """集思录快照监听器：将快照的列式数据写入存储"""
+        cols = snap["columns"]
+        categories = cols.status_categories
+        rows = [
+            (code, name, None if p != p else float(p), categories[sc])
+            for code, name, p, sc in zip(cols.codes, cols.names, cols.premium.tolist(), cols.status_code.tolist())
+        ]
+        return self.append(snap["fetched_at"], rows)
+
+    def _writer(self) -> None:
+        conn = _connect(self.path)
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    ts, rows = item
+                    start = time.perf_counter()
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO premium (code, ts, name, premium, status) VALUES (?, ?, ?, ?, ?)",
+                            [(code, ts, name, p, status) for code, name, p, status in rows],
+                        )
+                    logger.debug(f"写入 {len(rows)} 条溢价率记录，耗时 {time.perf_counter() - start:.3f}s")
+                    if time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+                        self._maintain(conn)
+                except Exception as e:
+                    logger.error(f"溢价率存储写入失败: {e}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self) -> None:
+        """等待已入队的写入全部完成"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """写完剩余数据后停止后台写线程"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(10)
+
+    # ---------------- 维护 ----------------
+
+    def _maintain(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        self._last_maintenance = time.monotonic()
+        now = int(time.time())
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM premium WHERE ts < ?", (now - int(self.retention_days * 86400),)
+            ).rowcount
+            # 压缩：早于阈值的数据每只基金每小时只保留最后一条
+            cutoff = now - int(self.compact_after_days * 86400)
+            compacted = conn.execute(
+                """
+                DELETE FROM premium WHERE ts < :cutoff AND (code, ts) NOT IN (
+                    SELECT code, MAX(ts) FROM premium WHERE ts < :cutoff GROUP BY code, ts / 3600
+                )
+                """,
+                {"cutoff": cutoff},
+            ).rowcount
+        if deleted or compacted:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+        logger.info(f"溢价率存储维护完成：过期删除 {deleted} 条，压缩删除 {compacted} 条")
+        return {"expired": deleted, "compacted": compacted}
+
+    def maintain(self) -> Dict[str, int]:
+        """立即执行一次保留期清理与压缩"""
+        conn = _connect(self.path)
+        try:
+            return self._maintain(conn)
+        finally:
+            conn.close()
+
+    # ---------------- 查询 ----------------
+
+    def query(self, code: str, start: str = "", end: str = "", resample: str = "") -> Dict[str, Any]:
+        """
+        查询单只基金的溢价率历史
+
+        Args:
+            code: 基金代码
+            start: 开始时间（北京时间），默认当天 00:00
+            end: 结束时间（北京时间），默认当前时间
+            resample: pandas 重采样周期，如 "5min"、"1h"、"1D"；为空返回原始采样点
+        """
+        now = datetime.now(CN_TZ)
+        ts_start = parse_time(start, now.replace(hour=0, minute=0, second=0, microsecond=0))
+        ts_end = parse_time(end, now)
+        if len((end or "").strip()) in (8, 10):
+            # 仅给出日期时包含当天全天
+            ts_end += 86399
+        conn = _connect(self.path)
+        try:
+            # 主键 (code, ts) 聚簇，范围查询只读取目标基金的连续页
+            cur = conn.execute(
+                "SELECT ts, name, premium, status FROM premium WHERE code = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (code, ts_start, ts_end),
+            )
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        name = rows[-1][1] if rows else ""
+        if resample and rows:
+            data = self._resample(rows, resample)
+        else:
+            data = [
+                {"时间": datetime.fromtimestamp(ts, CN_TZ).strftime("%Y-%m-%d %H:%M:%S"), "T-1溢价率": p, "申购状态": status}
+                for ts, _, p, status in rows
+            ]
+        return {"code": code, "name": name, "resample": resample, "count": len(data), "data": data}
+
+    @staticmethod
+    def _resample(rows: List[Tuple[Any, ...]], rule: str) -> List[Dict[str, Any]]:
+        import pandas as pd
+
+        df = pd.DataFrame(rows, columns=["ts", "name", "premium", "status"])
+        df.index = pd.to_datetime(df["ts"], unit="s", utc=True).dt.tz_convert("Asia/Shanghai")
+        grouped = df.resample(rule)
+        out = pd.DataFrame({
+            "open": grouped["premium"].first(),
+            "high": grouped["premium"].max(),
+            "low": grouped["premium"].min(),
+            "close": grouped["premium"].last(),
+            "mean": grouped["premium"].mean(),
+            "status": grouped["status"].last(),
+            "samples": grouped["premium"].count(),
+        })
+        out = out[out["samples"] > 0]
+        return [
+            {
+                "时间": idx.strftime("%Y-%m-%d %H:%M:%S"),
+                "开": r.open, "高": r.high, "低": r.low, "收": r.close,
+                "均值": round(float(r.mean), 4), "申购状态": r.status, "采样数": int(r.samples),
+            }
+            for idx, r in zip(out.index, out.itertuples(index=False))
+        ]
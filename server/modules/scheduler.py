@@ -0,0 +1,173 @@
+"""
+交易时段感知的后台预取调度器
+随 FastMCP 应用启动，在各自交易时段内按固定间隔刷新数据快照（集思录 QDII/LOF、A股全市场行情、期货主力合约），
+使工具直接读取内存中的预计算结果。休市期间任务休眠到下一次开盘。
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from . import executor
+    from . import trading_calendar as cal
+except ImportError:
+    import executor  # type: ignore
+    import trading_calendar as cal  # type: ignore
+
+logger = logging.getLogger('scheduler')
+
+# 休市时最长休眠时间，便于及时响应交易日历变化
+_MAX_IDLE_SLEEP = 300.0
+
+
+def _fmt(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, cal.CN_TZ).strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+
+class Job:
+    """
+    预取任务
+
+    Args:
+        name: 任务名称
+        fn: 同步刷新函数，在线程中执行
+        interval: 交易时段内的刷新间隔（秒）
+        session: 交易时段类型，"stock" / "futures" / "always"
+        lane: 执行通道（上游名称），与同一上游的工具调用共享并发上限；为空时使用默认线程池
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, session: str, lane: str = "") -> None:
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.session = session
+        self.lane = lane
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_start: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None
+        self.state = "idle"
+
+    async def run_once(self) -> None:
+        self.state = "running"
+        self.last_start = time.time()
+        start = time.perf_counter()
+        try:
+            if self.lane:
+                self.last_result = await executor.run(self.lane, self.fn)
+            else:
+                self.last_result = await asyncio.to_thread(self.fn)
+            self.last_success = time.time()
+            self.last_error = None
+            self.consecutive_failures = 0
+        except Exception as e:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e) or type(e).__name__
+            logger.warning(f"预取任务 {self.name} 失败: {self.last_error}")
+        finally:
+            self.runs += 1
+            self.last_duration = time.perf_counter() - start
+            self.state = "idle"
+        logger.debug(f"预取任务 {self.name} 完成，耗时 {self.last_duration:.3f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "session": self.session,
+            "lane": self.lane or None,
+            "interval": self.interval,
+            "state": self.state,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_start": _fmt(self.last_start),
+            "last_success": _fmt(self.last_success),
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "next_run": _fmt(self.next_run),
+        }
+
+
+class Scheduler:
+    """在同一事件循环内为每个任务维护一个 asyncio 任务"""
+
+    def __init__(self) -> None:
+        self.jobs: List[Job] = []
+        self._tasks: List[asyncio.Task] = []
+        self.started_at: Optional[float] = None
+
+    def add_job(self, name: str, fn: Callable[[], Any], interval: float, session: str = "stock", lane: str = "") -> Job:
+        job = Job(name, fn, interval, session, lane)
+        self.jobs.append(job)
+        return job
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            now = cal.now_cn()
+            if cal.in_session(job.session, now):
+                await job.run_once()
+                # 失败时按间隔指数退避，最多 8 倍
+                delay = job.interval * min(8, 2 ** job.consecutive_failures) if job.consecutive_failures else job.interval
+            else:
+                job.state = "sleeping"
+                delay = min((cal.next_session_start(job.session, now) - now).total_seconds(), _MAX_IDLE_SLEEP)
+            delay = max(delay, 0.0)
+            job.next_run = time.time() + delay
+            await asyncio.sleep(delay)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self.started_at = time.time()
+        # 交易日历需要网络，放在线程中加载，失败时退化为工作日判断
+        source = await asyncio.to_thread(cal.load)
+        logger.info(f"交易日历来源: {source}")
+        for job in self.jobs:
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"prefetch-{job.name}"))
+        logger.info(f"预取调度器已启动，任务: {[j.name for j in self.jobs]}")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("预取调度器已停止")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def prefetching(self, name: str) -> bool:
+        """任务当前是否在预取（调度器已启动且处于该任务的交易时段）"""
+        return self.running and any(job.name == name and cal.in_session(job.session) for job in self.jobs)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": _fmt(self.started_at),
+            "now": cal.now_cn().strftime("%Y-%m-%d %H:%M:%S"),
+            "calendar": cal.status(),
+            "sessions": {s: cal.in_session(s) for s in ("stock", "futures")},
+            "jobs": [job.status() for job in self.jobs],
+        }
+
+
+def env_interval(name: str, default: float) -> float:
+    try:
+        return max(1.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def enabled() -> bool:
+    return os.getenv("PREFETCH_ENABLED", "1").lower() not in ("0", "false", "no", "off")
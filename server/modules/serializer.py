@@ -0,0 +1,152 @@
+"""
+工具返回结果的统一序列化
+DataFrame 按列依据 dtype 一次性转换为 Python 原生类型（NaN/NaT -> None，时间 -> 字符串，numpy 数值 -> int/float），
+再以紧凑格式输出 JSON；安装了 orjson 时使用 orjson 编码，否则退化为标准库 json。
+"""
+import json
+import math
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
+logger = logging.getLogger('serializer')
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def native(value: Any) -> Any:
+    """将单个 numpy/pandas/日期等标量转换为可 JSON 序列化的 Python 原生值"""
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, datetime):
+        # pandas.Timestamp 也是 datetime 的子类；NaT 需要单独识别
+        return None if value != value else value.strftime(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "item"):
+        return native(value.item())
+    try:
+        if value != value:
+            # NaT 等缺失值
+            return None
+    except TypeError:
+        # pd.NA 不能参与布尔判断
+        return None
+    return value
+
+
+def _column_values(col: Any) -> List[Any]:
+    # 按 dtype 整列转换，避免逐格判断类型
+    import numpy as np
+    import pandas as pd
+
+    kind = col.dtype.kind
+    if kind in "iub":
+        return col.tolist()
+    if kind == "f":
+        values = col.to_numpy(dtype=object, copy=True)
+        mask = col.isna().to_numpy()
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+    if kind == "M":
+        mask = col.isna().to_numpy()
+        dt = col.dt.tz_localize(None) if getattr(col.dt, "tz", None) is not None else col
+        fmt = DATE_FORMAT if (dt.dropna() == dt.dropna().dt.normalize()).all() else DATETIME_FORMAT
+        values = dt.dt.strftime(fmt).to_numpy(dtype=object, copy=True)
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return [native(v) for v in col.astype(object).tolist()]
+    inferred = pd.api.types.infer_dtype(col, skipna=True)
+    if inferred in ("string", "empty"):
+        values = col.to_numpy(dtype=object, copy=True)
+        mask = col.isna().to_numpy()
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+    if inferred == "date":
+        return [None if v is None or v != v else v.strftime(DATE_FORMAT) for v in col.tolist()]
+    # 混合类型的 object 列才逐个转换
+    return [native(v) for v in np.asarray(col, dtype=object).tolist()]
+
+
+def records(df: Any, columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    将 DataFrame 转换为字典列表（等价于 to_dict('records')，但值均为 Python 原生类型）
+
+    Args:
+        df: pandas DataFrame
+        columns: 只输出这些列，默认全部列
+    """
+    if df is None:
+        return []
+    if columns is not None:
+        df = df[list(columns)]
+    keys = [str(c) for c in df.columns]
+    if df.empty:
+        return []
+    values = [_column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def _default(value: Any) -> Any:
+    # 编码器无法直接处理的对象
+    if hasattr(value, "to_dict") and hasattr(value, "columns"):
+        return records(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    converted = native(value)
+    if converted is value:
+        raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+    return converted
+
+
+def _finite(obj: Any) -> Any:
+    # 标准库 json 会把 NaN/Infinity 原样写出（不是合法 JSON），与 orjson 一致地替换为 null
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if obj is None or isinstance(obj, (str, int)):
+        return obj
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return _finite(_default(obj))
+
+
+def _dumps_json(obj: Any) -> str:
+    options: Dict[str, Any] = {"ensure_ascii": False, "separators": (",", ":"), "default": _default}
+    try:
+        return json.dumps(obj, allow_nan=False, **options)
+    except ValueError:
+        # 含非有限浮点数时才做一次清洗，常见路径不额外遍历
+        return json.dumps(_finite(obj), allow_nan=False, **options)
+
+
+if orjson is not None:
+    # 日期时间交给 _default 统一格式化，与标准库路径输出一致
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(obj: Any) -> str:
+    """序列化为紧凑 JSON 字符串（中文不转义，NaN/Infinity 输出为 null）；安装了 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+    return _dumps_json(obj)
@@ -0,0 +1,146 @@
+"""
+相同上游请求的合并（single-flight）
+同一数据集键同时只允许一次上游下载：并发的调用方（线程或协程）加入正在进行的那一次并共享其结果或异常，
+避免多个 MCP 会话同时请求时对东方财富、新浪、集思录发出重复下载。
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+logger = logging.getLogger('singleflight')
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class Group:
+    """
+    一组按键合并的调用
+
+    Args:
+        name: 名称，用于统计输出
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.executions = 0
+        self.failures = 0
+        _groups[name] = self
+
+    # ---------------- 线程 ----------------
+
+    def _do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+            if call.waiters:
+                logger.debug(f"{self.name}[{key}] 合并了 {call.waiters} 个并发请求")
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行 fn 或加入键相同的进行中调用，返回其结果（异常同样共享）
+
+        Args:
+            key: 数据集键
+            fn: 同步下载函数
+        """
+        with self._lock:
+            self.calls += 1
+        return self._do(key, fn)
+
+    # ---------------- 协程 ----------------
+
+    async def do_async(self, key: Hashable, fn: Union[Callable[[], Awaitable[Any]], Callable[[], Any]]) -> Any:
+        """
+        协程版本：同一事件循环内的并发调用共享一个任务，只占用一个执行者。
+        fn 为协程函数时在当前事件循环执行；为同步函数时放到线程中执行，并与同键的线程调用方合并。
+        下载任务不属于任何一个调用方：任一调用方（包括发起者）被取消时，其它调用方照常拿到结果。
+        """
+        loop = asyncio.get_running_loop()
+        akey = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+            task = self._async_calls.get(akey)
+            if task is None:
+                task = self._async_calls[akey] = loop.create_task(self._run_async(akey, key, fn))
+                task.add_done_callback(_retrieve_exception)
+        return await asyncio.shield(task)
+
+    async def _run_async(self, akey: Tuple[int, Hashable], key: Hashable, fn: Callable[[], Any]) -> Any:
+        try:
+            if not asyncio.iscoroutinefunction(fn):
+                return await asyncio.to_thread(self._do, key, fn)
+            with self._lock:
+                self.executions += 1
+            try:
+                return await fn()
+            except BaseException:
+                with self._lock:
+                    self.failures += 1
+                raise
+        finally:
+            with self._lock:
+                self._async_calls.pop(akey, None)
+
+    # ---------------- 统计 ----------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, executions = self.calls, self.executions
+            in_flight = len(self._calls) + len(self._async_calls)
+        return {
+            "calls": calls,
+            "executions": executions,
+            # 加入已有下载、没有自己发起上游请求的调用数
+            "coalesced": max(0, calls - executions),
+            "failures": self.failures,
+            "in_flight": in_flight,
+        }
+
+
+def _retrieve_exception(task: "asyncio.Task[Any]") -> None:
+    # 所有调用方都已取消时没有人读取异常，避免 "exception was never retrieved" 警告
+    if not task.cancelled():
+        task.exception()
+
+
+_groups: Dict[str, Group] = {}
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """所有合并组的统计"""
+    return {name: group.stats() for name, group in list(_groups.items())}
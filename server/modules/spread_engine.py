@@ -0,0 +1,398 @@
+"""
+期货价差引擎
+按品种的多个月份与配置的价差定义（跨期价差、压榨/裂解等线性组合、比价）从缓存行情中一次性计算全部价差，
+并给出滚动窗口 z-score 与跨期价差的年化展期收益（carry）。全部计算以矩阵运算完成：
+线性价差为 权重矩阵 @ 价格向量，比价与 carry 为下标数组上的逐元素运算。
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from . import futures_server, singleflight
+except ImportError:
+    import futures_server  # type: ignore
+    import singleflight  # type: ignore
+
+logger = logging.getLogger('spread_engine')
+
+SPREAD_TYPES = ("calendar", "spread", "ratio")
+# 行情记录中用于计算的价格字段，依次回退
+PRICE_FIELDS = ("current_price", "last_settle_price", "last_close")
+
+# 合约行情缓存：{合约代码: {"price": 价格, "monotonic": 单调时钟}}
+_quotes: Dict[str, Dict[str, Any]] = {}
+_quotes_lock = threading.Lock()
+quotes_flight = singleflight.Group("futures_spread_quotes")
+# 各价差的历史样本：{价差名称: _Ring}（按最近使用排序，超过 SPREAD_MAX_SERIES 时淘汰最久未用的），
+# 以及最近一次采样所用行情的时间
+_history: "OrderedDict[str, _Ring]" = OrderedDict()
+_sampled_at: Dict[str, float] = {}
+_history_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _quote_ttl() -> float:
+    # 价差所用行情的缓存有效期（秒），可通过环境变量 SPREAD_QUOTE_TTL 配置
+    try:
+        return float(os.getenv("SPREAD_QUOTE_TTL", "10"))
+    except ValueError:
+        return 10.0
+
+
+def load_config() -> Dict[str, Any]:
+    """从项目根目录 config.json 的 "futures_spreads" 读取默认价差配置：{"products": {...}, "pairs": [...]}"""
+    cfg_path = Path(__file__).parent.parent.parent / "config.json"
+    if cfg_path.exists():
+        try:
+            data = json.loads(cfg_path.read_text(encoding="utf-8")).get("futures_spreads")
+            if isinstance(data, dict):
+                return data
+        except Exception as e:
+            logger.warning(f"读取价差配置失败: {e}")
+    return {}
+
+
+# ---------------- 价差定义 ----------------
+
+def _delivery(code: str, today: Optional[date] = None) -> Optional[date]:
+    """合约交割月（取当月 15 日）：四位数字为 YYMM（RB2605），郑商所三位数字为 YMM（TA605），取离今天最近的十年"""
+    digits = code[len(code.rstrip("0123456789")):]
+    if len(digits) == 4:
+        year, month = 2000 + int(digits[:2]), int(digits[2:])
+    elif len(digits) == 3:
+        today = today or date.today()
+        year, month = today.year - today.year % 10 + int(digits[0]), int(digits[1:])
+        if year < today.year - 1:
+            year += 10
+    else:
+        return None
+    return date(year, month, 15) if 1 <= month <= 12 else None
+
+
+def build_pairs(products: Optional[Dict[str, List[str]]] = None, pairs: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    展开并校验价差定义
+
+    Args:
+        products: {品种: [月份]}，如 {"RB": ["2605", "2610"]}，为每个品种生成相邻月份的跨期价差（近月 - 远月）
+        pairs: 自定义价差，支持三种类型：
+            {"name": "RB 05-10", "type": "calendar", "near": "RB2605", "far": "RB2610"}
+            {"name": "大豆压榨", "type": "spread", "legs": {"M2605": 0.785, "Y2605": 0.185, "A2605": -1}}
+            {"name": "豆油/棕榈油", "type": "ratio", "numerator": "Y2605", "denominator": "P2605"}
+    """
+    out: List[Dict[str, Any]] = []
+    for product, months in (products or {}).items():
+        codes = [f"{str(product).upper()}{str(m).strip()}" for m in months]
+        for near, far in zip(codes, codes[1:]):
+            out.append({"name": f"{near}-{far}", "type": "calendar", "near": near, "far": far})
+    for i, pair in enumerate(pairs or []):
+        kind = str(pair.get("type", "")).lower()
+        if kind not in SPREAD_TYPES:
+            raise ValueError(f"第 {i + 1} 个价差类型无效: {pair.get('type')}，可选 {SPREAD_TYPES}")
+        if kind == "calendar":
+            legs = {"near": str(pair.get("near", "")).upper(), "far": str(pair.get("far", "")).upper()}
+            default_name = f"{legs['near']}-{legs['far']}"
+        elif kind == "ratio":
+            legs = {"numerator": str(pair.get("numerator", "")).upper(), "denominator": str(pair.get("denominator", "")).upper()}
+            default_name = f"{legs['numerator']}/{legs['denominator']}"
+        else:
+            raw = pair.get("legs") or {}
+            if not isinstance(raw, dict) or not raw:
+                raise ValueError(f"第 {i + 1} 个价差缺少 legs（{{合约: 系数}}）")
+            legs = {"legs": {str(c).upper(): float(w) for c, w in raw.items()}}
+            default_name = " ".join(f"{w:+g}*{c}" for c, w in legs["legs"].items())
+        codes = list(legs["legs"]) if kind == "spread" else list(legs.values())
+        if not all(codes):
+            raise ValueError(f"第 {i + 1} 个价差缺少合约代码: {pair}")
+        out.append({"name": str(pair.get("name") or default_name), "type": kind, **legs})
+    names = [p["name"] for p in out]
+    if len(set(names)) != len(names):
+        raise ValueError("价差名称重复")
+    return out
+
+
+def _pair_contracts(pair: Dict[str, Any]) -> List[str]:
+    if pair["type"] == "calendar":
+        return [pair["near"], pair["far"]]
+    if pair["type"] == "ratio":
+        return [pair["numerator"], pair["denominator"]]
+    return list(pair["legs"])
+
+
+class SpreadBook:
+    """
+    一组价差定义编译成的矩阵：线性价差（跨期、压榨/裂解）的权重矩阵、比价的分子分母下标、
+    跨期价差的近远月下标与期限（年）
+
+    Args:
+        pairs: build_pairs 展开后的价差定义
+    """
+
+    def __init__(self, pairs: List[Dict[str, Any]]) -> None:
+        import numpy as np
+
+        self.pairs = pairs
+        self.names = [p["name"] for p in pairs]
+        self.contracts = sorted({c for p in pairs for c in _pair_contracts(p)})
+        col = {c: j for j, c in enumerate(self.contracts)}
+        n = len(pairs)
+        self.weights = np.zeros((n, len(self.contracts)), dtype=np.float64)
+        self.is_ratio = np.zeros(n, dtype=bool)
+        self.num = np.zeros(n, dtype=np.intp)
+        self.den = np.zeros(n, dtype=np.intp)
+        self.is_calendar = np.zeros(n, dtype=bool)
+        self.near = np.zeros(n, dtype=np.intp)
+        self.far = np.zeros(n, dtype=np.intp)
+        self.years = np.full(n, np.nan)
+        for i, p in enumerate(pairs):
+            if p["type"] == "ratio":
+                self.is_ratio[i] = True
+                self.num[i], self.den[i] = col[p["numerator"]], col[p["denominator"]]
+            elif p["type"] == "calendar":
+                self.is_calendar[i] = True
+                self.near[i], self.far[i] = col[p["near"]], col[p["far"]]
+                self.weights[i, self.near[i]] += 1.0
+                self.weights[i, self.far[i]] -= 1.0
+                d_near, d_far = _delivery(p["near"]), _delivery(p["far"])
+                if d_near and d_far and d_far != d_near:
+                    self.years[i] = (d_far - d_near).days / 365.0
+            else:
+                for c, w in p["legs"].items():
+                    self.weights[i, col[c]] += w
+
+    def evaluate(self, prices: Any) -> Tuple[Any, Any]:
+        """
+        给定与 contracts 对齐的价格向量（缺失为 NaN），返回 (价差值, 年化 carry)；
+        carry 只对跨期价差有定义：(远月 - 近月) / 近月 / 期限年数
+        """
+        import numpy as np
+
+        prices = np.asarray(prices, dtype=np.float64)
+        # 线性价差中任一腿缺失则结果为 NaN（0 * NaN 仍为 NaN）
+        legs_missing = (self.weights != 0) & np.isnan(prices)[None, :]
+        linear = np.where(legs_missing.any(axis=1), np.nan, self.weights @ np.nan_to_num(prices))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = prices[self.num] / prices[self.den]
+            near, far = prices[self.near], prices[self.far]
+            carry = np.where(self.is_calendar, (far - near) / near / self.years, np.nan)
+        values = np.where(self.is_ratio, ratio, linear)
+        return values, carry
+
+
+# ---------------- 滚动窗口 ----------------
+
+class _Ring:
+    """定长环形缓冲区，未填满部分为 NaN；legs 为价差的各腿合约，expires 为其中最早的交割月"""
+
+    def __init__(self, window: int, legs: Tuple[str, ...] = ()) -> None:
+        import numpy as np
+
+        self.values = np.full(window, np.nan)
+        self.pos = 0
+        self.legs = legs
+        deliveries = [d for d in map(_delivery, legs) if d is not None]
+        self.expires = min(deliveries) if deliveries else None
+
+    def append(self, value: float) -> None:
+        self.values[self.pos % len(self.values)] = value
+        self.pos += 1
+
+    def expired(self, today: date) -> bool:
+        # 交割月过后该腿不再有行情，价差无法再采样
+        return self.expires is not None and (today.year, today.month) > (self.expires.year, self.expires.month)
+
+
+def _evict(today: date, max_series: int) -> None:
+    # 调用方需持有 _history_lock：先移除有腿已过交割月的价差，再按最近使用淘汰超出上限的部分
+    for name in [n for n, ring in _history.items() if ring.expired(today)]:
+        del _history[name]
+        _sampled_at.pop(name, None)
+    while len(_history) > max_series:
+        name, _ = _history.popitem(last=False)
+        _sampled_at.pop(name, None)
+
+
+def _record_samples(names: List[str], legs: List[Tuple[str, ...]], values: Any, fetched: Any, window: int) -> Any:
+    """有新行情的价差追加一个样本，返回按 names 排列的历史矩阵（价差数 × 窗口）"""
+    import numpy as np
+
+    max_series = _env_int("SPREAD_MAX_SERIES", 500)
+    with _history_lock:
+        rows = []
+        for name, contracts, value, at in zip(names, legs, values, fetched):
+            ring = _history.get(name)
+            # 窗口变化或同名价差换了合约时重新积累样本
+            if ring is None or len(ring.values) != window or ring.legs != contracts:
+                ring = _history[name] = _Ring(window, contracts)
+                _sampled_at.pop(name, None)
+            _history.move_to_end(name)
+            if np.isfinite(value) and at > _sampled_at.get(name, -1.0):
+                ring.append(float(value))
+                _sampled_at[name] = at
+            rows.append(ring.values.copy())
+        _evict(date.today(), max_series)
+    return np.vstack(rows) if rows else np.zeros((0, window))
+
+
+def _zscores(values: Any, history: Any, min_samples: int) -> Tuple[Any, Any, Any, Any]:
+    """逐价差的滚动均值、标准差、样本数与 z-score（样本不足或标准差为 0 时为 NaN）"""
+    import numpy as np
+
+    counts = np.sum(~np.isnan(history), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sums = np.nansum(history, axis=1)
+        means = np.where(counts > 0, sums / counts, np.nan)
+        sq = np.nansum((history - means[:, None]) ** 2, axis=1)
+        stds = np.where(counts > 1, np.sqrt(sq / (counts - 1)), np.nan)
+        z = np.where((counts >= min_samples) & (stds > 0), (values - means) / stds, np.nan)
+    return means, stds, counts, z
+
+
+# ---------------- 行情缓存 ----------------
+
+def _price_of(rec: Dict[str, Any]) -> Optional[float]:
+    for field in PRICE_FIELDS:
+        value = rec.get(field)
+        if isinstance(value, (int, float)) and value > 0:
+            return float(value)
+    return None
+
+
+def _cached_quotes(contracts: Iterable[str], force_refresh: bool = False) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    返回各合约的有效缓存价格；缺失或过期的合约合并为每个市场一次 futures_zh_spot 调用刷新，
+    并发的相同请求共享同一次下载。刷新失败的合约不返回过期价格，由调用方列为缺失
+    """
+    contracts = list(dict.fromkeys(contracts))
+    now = time.monotonic()
+    # 早于 cutoff 的行情视为过期；强制刷新时只接受本次刷新得到的行情
+    cutoff = now if force_refresh else now - _quote_ttl()
+    with _quotes_lock:
+        stale = [c for c in contracts if c not in _quotes or _quotes[c]["monotonic"] <= cutoff]
+    errors: Dict[str, str] = {}
+    if stale:
+        key = ",".join(sorted(stale))
+        errors = quotes_flight.do(key, lambda: _refresh_quotes(stale))
+    with _quotes_lock:
+        return {c: dict(_quotes[c]) for c in contracts if c in _quotes and _quotes[c]["monotonic"] > cutoff}, errors
+
+
+def _refresh_quotes(contracts: List[str]) -> Dict[str, str]:
+    quotes, errors = futures_server.fetch_quotes({c: futures_server.market_of(c) for c in contracts})
+    fetched_at = time.monotonic()
+    with _quotes_lock:
+        for code in contracts:
+            price = _price_of(quotes[code]) if code in quotes else None
+            if price is not None:
+                _quotes[code] = {"price": price, "monotonic": fetched_at}
+    missing = [c for c in contracts if c not in quotes]
+    if missing:
+        logger.warning(f"价差行情缺失 {len(missing)} 个合约: {missing[:10]}")
+    return errors
+
+
+# ---------------- 对外接口 ----------------
+
+def compute_spreads(
+    products: Optional[Dict[str, List[str]]] = None,
+    pairs: Optional[List[Dict[str, Any]]] = None,
+    window: Optional[int] = None,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    计算全部价差、滚动 z-score 与年化 carry。未传 products 与 pairs 时使用 config.json 中的默认配置。
+    每次取得新行情时各价差追加一个样本，z-score 基于最近 window 个样本。
+
+    Args:
+        products: {品种: [月份]}，生成相邻月份的跨期价差
+        pairs: 自定义价差定义，见 build_pairs
+        window: 滚动窗口样本数，默认 SPREAD_WINDOW（240）
+        force_refresh: 是否忽略行情缓存
+    """
+    import numpy as np
+
+    if products is None and pairs is None:
+        config = load_config()
+        products, pairs = config.get("products"), config.get("pairs")
+    definitions = build_pairs(products, pairs)
+    if not definitions:
+        raise ValueError("未指定价差：请传入 products / pairs，或在 config.json 的 futures_spreads 中配置")
+    window = window or _env_int("SPREAD_WINDOW", 240)
+    min_samples = _env_int("SPREAD_MIN_SAMPLES", 20)
+
+    book = SpreadBook(definitions)
+    quotes, errors = _cached_quotes(book.contracts, force_refresh)
+    prices = np.array([quotes[c]["price"] if c in quotes else np.nan for c in book.contracts])
+    fetched = np.array([quotes[c]["monotonic"] if c in quotes else -np.inf for c in book.contracts])
+    values, carry = book.evaluate(prices)
+    # 价差的行情时间取各腿中最新的一次，只有出现更新的行情时才追加样本
+    leg_times = np.where(book.weights != 0, fetched[None, :], -np.inf)
+    leg_times[book.is_ratio, book.num[book.is_ratio]] = fetched[book.num[book.is_ratio]]
+    leg_times[book.is_ratio, book.den[book.is_ratio]] = fetched[book.den[book.is_ratio]]
+    legs = [tuple(_pair_contracts(p)) for p in definitions]
+    history = _record_samples(book.names, legs, values, leg_times.max(axis=1), window)
+    means, stds, counts, z = _zscores(values, history, min_samples)
+
+    def num(x: float, digits: int = 4) -> Optional[float]:
+        return round(float(x), digits) if np.isfinite(x) else None
+
+    spreads = []
+    for i, pair in enumerate(definitions):
+        legs = _pair_contracts(pair)
+        spreads.append({
+            **pair,
+            "value": num(values[i]),
+            "zscore": num(z[i], 3),
+            "mean": num(means[i]),
+            "std": num(stds[i]),
+            "samples": int(counts[i]),
+            # 年化展期收益（%），仅跨期价差
+            "carry_annualized": num(carry[i] * 100, 2) if pair["type"] == "calendar" else None,
+            "missing": [c for c in legs if c not in quotes],
+        })
+    return {
+        "count": len(spreads),
+        "window": window,
+        "min_samples": min_samples,
+        "prices": {c: quotes[c]["price"] for c in book.contracts if c in quotes},
+        # 各合约行情距今的秒数
+        "quote_age": {c: round(time.monotonic() - quotes[c]["monotonic"], 3) for c in book.contracts if c in quotes},
+        "spreads": spreads,
+        "errors": errors,
+    }
+
+
+def refresh_configured_spreads() -> int:
+    """按 config.json 中的配置刷新行情并采样（供后台预取调用），未配置时不请求上游，返回价差数"""
+    config = load_config()
+    if not config.get("products") and not config.get("pairs"):
+        return 0
+    return compute_spreads(config.get("products"), config.get("pairs"), force_refresh=True)["count"]
+
+
+def stats() -> Dict[str, Any]:
+    """价差引擎的行情缓存与历史样本统计"""
+    with _quotes_lock:
+        cached = len(_quotes)
+    with _history_lock:
+        samples = {name: min(ring.pos, len(ring.values)) for name, ring in _history.items()}
+    return {
+        "cached_contracts": cached,
+        "quote_ttl": _quote_ttl(),
+        "spreads_tracked": len(samples),
+        "max_series": _env_int("SPREAD_MAX_SERIES", 500),
+        "samples": samples,
+    }
@@ -2,13 +2,138 @@
 A股实时行情数据服务
 使用 akshare 获取单只股票的实时行情数据
 """
+import os
 import json
-from typing import Dict, Any, Optional
+import time
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
+try:
+    from . import bar_store, executor, serializer, singleflight
+    from .cache_stats import CacheStats
+    from .bar_store import BarStore
+except ImportError:
+    import bar_store  # type: ignore
+    import executor  # type: ignore
+    import serializer  # type: ignore
+    import singleflight  # type: ignore
+    from cache_stats import CacheStats  # type: ignore
+    from bar_store import BarStore  # type: ignore
+
 # 配置日志
 logger = logging.getLogger('stock_server')
 
+# 全市场实时行情快照缓存：{"frame": CompactFrame, "fetched_at": 时间戳, "monotonic": 单调时钟}
+_spot_cache: Optional[Dict[str, Any]] = None
+spot_stats = CacheStats()
+spot_flight = singleflight.Group("stock_spot")
+
+# 历史K线本地缓存，首次使用时创建
+_bar_store: Optional[BarStore] = None
+_bar_store_lock = threading.Lock()
+
+HIST_ADJUSTS = ("", "qfq", "hfq")
+# 周期别名；其余周期写作 "<N><单位>"：D=交易日，W=自然周，M=自然月，Q=季度，如 "5D"、"2W"、"Q"
+HIST_PERIOD_ALIASES = {"daily": "1D", "weekly": "1W", "monthly": "1M", "quarterly": "1Q"}
+_PERIOD_RE = re.compile(r"^(\d*)([DWMQ])$")
+# 周线分组锚点（周一），多周K线从这里开始每 N 周一组
+_WEEK_ANCHOR = date(1970, 1, 5)
+# 只给出 limit 时估算每根K线跨越的日历天数（含节假日余量）
+_UNIT_DAYS = {"D": 1.6, "W": 7.0, "M": 31.0}
+
+
+def get_bar_store() -> BarStore:
+    global _bar_store
+    with _bar_store_lock:
+        if _bar_store is None:
+            _bar_store = BarStore()
+        return _bar_store
+
+
+def _spot_ttl() -> float:
+    # 快照有效期（秒），可通过环境变量 STOCK_SPOT_TTL 配置
+    try:
+        return float(os.getenv("STOCK_SPOT_TTL", "15"))
+    except ValueError:
+        return 15.0
+
+
+def get_spot_table(force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    获取全市场A股实时行情快照，在有效期内直接复用
+
+    Args:
+        force_refresh: 为 True 时忽略有效期，立即重新下载（已有下载进行中时加入该次下载）
+
+    Returns:
+        {"frame": 紧凑列式行情快照（按代码二分查找）, "fetched_at": 下载时间戳, "monotonic": 单调时钟}
+    """
+    if not force_refresh:
+        cache = _spot_cache
+        if cache is not None and time.monotonic() - cache["monotonic"] < _spot_ttl():
+            spot_stats.hit()
+            return cache
+        spot_stats.miss()
+    # 并发的调用方共享同一次下载
+    return spot_flight.do("stock_zh_a_spot_em", _download_spot_table)
+
+
+def _download_spot_table() -> Dict[str, Any]:
+    global _spot_cache
+    import akshare as ak
+    try:
+        from .compact_frame import CompactFrame
+    except ImportError:
+        from compact_frame import CompactFrame  # type: ignore
+
+    start = time.perf_counter()
+    try:
+        df = ak.stock_zh_a_spot_em()
+    except Exception:
+        spot_stats.refreshed(time.perf_counter() - start, ok=False)
+        raise
+    # 常驻内存的快照转换为紧凑列式表示（int32 代码、字典编码名称、float32 价格），原始 DataFrame 随即释放
+    frame = CompactFrame(df, key="代码")
+    cache = {"frame": frame, "fetched_at": time.time(), "monotonic": time.monotonic()}
+    _spot_cache = cache
+    elapsed = time.perf_counter() - start
+    spot_stats.refreshed(elapsed)
+    logger.info(f"A股实时行情快照刷新完成，共 {len(frame)} 条，耗时 {elapsed:.3f}s")
+    return cache
+
+
+def spot_cache_stats() -> Dict[str, Any]:
+    """全市场行情快照缓存统计：命中率、刷新次数与刷新耗时"""
+    stats = spot_stats.snapshot()
+    cache = _spot_cache
+    stats["rows"] = len(cache["frame"]) if cache is not None else 0
+    stats["bytes"] = cache["frame"].nbytes() if cache is not None else 0
+    stats["age"] = round(time.monotonic() - cache["monotonic"], 3) if cache is not None else None
+    stats["ttl"] = _spot_ttl()
+    return stats
+
+
+def spot_cache_age() -> Optional[float]:
+    """全市场行情快照距今的秒数，尚未加载时为 None"""
+    cache = _spot_cache
+    return time.monotonic() - cache["monotonic"] if cache is not None else None
+
+
+def refresh_spot_table() -> int:
+    """强制刷新全市场实时行情快照，返回行数（供后台预取调用）"""
+    return len(get_spot_table(force_refresh=True)["frame"])
+
+
+def _symbol_error(symbol: str) -> Optional[str]:
+    # 验证股票代码格式（6位数字）
+    if not symbol or len(symbol) != 6 or not symbol.isdigit():
+        return f"股票代码格式错误，应为6位数字，当前输入: {symbol}"
+    return None
+
+
 def get_stock_realtime(symbol: str) -> Dict[str, Any]:
     """
     获取单只A股的实时行情数据
@@ -29,41 +154,27 @@ def get_stock_realtime(symbol: str) -> Dict[str, Any]:
         }
     
     try:
-        # 验证股票代码格式（6位数字）
-        if not symbol or len(symbol) != 6 or not symbol.isdigit():
+        error = _symbol_error(symbol)
+        if error:
             return {
-                "error": f"股票代码格式错误，应为6位数字，当前输入: {symbol}",
+                "error": error,
                 "symbol": symbol
             }
         
         logger.info(f"开始获取股票 {symbol} 的实时行情数据")
         
-        # 调用 akshare 获取实时行情
-        # stock_zh_a_spot_em 返回的是所有A股的实时行情
-        # 我们需要筛选出指定的股票
-        df = ak.stock_zh_a_spot_em()
-        
-        # 过滤出指定股票代码
-        stock_data = df[df['代码'] == symbol]
+        # stock_zh_a_spot_em 返回的是所有A股的实时行情，使用缓存的快照并按代码二分查找
+        row = get_spot_table()["frame"].get(symbol)
         
-        if stock_data.empty:
+        if row is None:
             logger.warning(f"未找到股票代码 {symbol} 的数据")
             return {
                 "error": f"未找到股票代码 {symbol} 的数据",
                 "symbol": symbol
             }
         
-        # 转换为字典格式
-        result = stock_data.iloc[0].to_dict()
-        
-        # 将数值类型转换为 Python 原生类型（避免 JSON 序列化问题）
-        processed_result = {}
-        for key, value in result.items():
-            # 处理 pandas 的数据类型
-            if hasattr(value, 'item'):
-                processed_result[key] = value.item()
-            else:
-                processed_result[key] = value
+        # 转换为字典格式，并将数值类型转换为 Python 原生类型（避免 JSON 序列化问题）
+        processed_result = row.to_dict()
         
         logger.info(f"成功获取股票 {symbol} 的实时行情数据")
         return {
@@ -81,27 +192,225 @@ def get_stock_realtime(symbol: str) -> Dict[str, Any]:
         }
 
 
-def get_stock_hist(symbol: str, period: str = "daily", adjust: str = "") -> Dict[str, Any]:
+def get_stock_realtime_batch(symbols: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    基于同一份全市场行情快照批量获取多只A股的实时行情
+
+    Args:
+        symbols: 股票代码列表，格式如 ["000001", "600000"]
+        fields: 需要返回的列名，如 ["名称", "最新价", "涨跌幅"]；为空时返回全部列
+
+    Returns:
+        {"data": {代码: 行情}, "errors": {代码: 错误信息}, ...}，单只股票的错误不影响其它股票
+    """
+    try:
+        import akshare as ak  # noqa: F401
+    except ImportError:
+        logger.error("akshare 库未安装")
+        return {"error": "akshare 库未安装", "symbols": symbols}
+
+    errors: Dict[str, str] = {}
+    valid: List[str] = []
+    for symbol in dict.fromkeys(str(x).strip() for x in symbols):
+        error = _symbol_error(symbol)
+        if error:
+            errors[symbol] = error
+        else:
+            valid.append(symbol)
+
+    data: Dict[str, Any] = {}
+    result: Dict[str, Any] = {"success": True, "requested": len(symbols)}
+    if valid:
+        try:
+            spot = get_spot_table()
+        except Exception as e:
+            error_msg = f"获取全市场实时行情时发生错误: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return {"error": error_msg, "symbols": symbols}
+        frame = spot["frame"]
+        columns = list(frame.columns)
+        if fields:
+            unknown = [c for c in fields if c not in frame.columns]
+            if unknown:
+                result["unknown_fields"] = unknown
+            columns = [c for c in dict.fromkeys(fields) if c in frame.columns]
+        found, positions = [], []
+        for symbol in valid:
+            pos = frame.find(symbol)
+            if pos is not None:
+                found.append(symbol)
+                positions.append(pos)
+            else:
+                errors[symbol] = f"未找到股票代码 {symbol} 的数据"
+        # 一次按行号取出全部命中行并投影所需列
+        records = frame.records(positions, columns) if found else []
+        data = dict(zip(found, records))
+        result["fields"] = columns
+        result["snapshot_time"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(spot["fetched_at"]))
+
+    result.update({"count": len(data), "data": data, "errors": errors})
+    logger.info(f"批量获取实时行情：请求 {len(symbols)} 只，成功 {len(data)} 只，失败 {len(errors)} 只")
+    return result
+
+
+def _hist_date(value: str) -> str:
+    # 接受 "YYYYMMDD" / "YYYY-MM-DD"，统一为 "YYYY-MM-DD"；空字符串表示不限
+    value = (value or "").strip()
+    if not value:
+        return ""
+    for fmt in ("%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"日期格式错误，应为 YYYYMMDD 或 YYYY-MM-DD，当前输入: {value}")
+
+
+def parse_period(period: str) -> Tuple[int, str]:
+    """解析K线周期，返回 (N, 单位)，单位为 "D"(交易日) / "W"(周) / "M"(月)；季度折算为 3 个月"""
+    rule = HIST_PERIOD_ALIASES.get(period, (period or "").upper())
+    m = _PERIOD_RE.match(rule)
+    n = int(m.group(1) or 1) if m else 0
+    if n < 1:
+        raise ValueError(f"不支持的周期: {period}，可选 {list(HIST_PERIOD_ALIASES)} 或 \"<N>D/W/M/Q\"（如 \"5D\"、\"2W\"）")
+    unit = m.group(2)
+    return (n * 3, "M") if unit == "Q" else (n, unit)
+
+
+def _group_keys(dates: Any, n: int, unit: str) -> Any:
+    # 每根日K线所属的聚合组编号（随时间递增）
+    import numpy as np
+    import pandas as pd
+
+    if unit == "W":
+        # 按自然周（周一至周日）分组，节假日只会让该周交易日变少，不会跨周
+        return (dates - pd.Timestamp(_WEEK_ANCHOR)).dt.days.to_numpy() // (7 * n)
+    if unit == "M":
+        return ((dates.dt.year * 12 + dates.dt.month - 1) // n).to_numpy()
+    # N 个交易日一组，从最新一根K线向前划分，保证最近一组完整
+    return -(np.arange(len(dates))[::-1] // n)
+
+
+def _group_start(day: str, n: int, unit: str) -> str:
+    # 给定日期所在聚合组的第一天，用于对齐日K线读取起点
+    d = datetime.strptime(day, "%Y-%m-%d").date()
+    if unit == "W":
+        d = _WEEK_ANCHOR + timedelta(days=(d - _WEEK_ANCHOR).days // (7 * n) * 7 * n)
+    elif unit == "M":
+        m = (d.year * 12 + d.month - 1) // n * n
+        d = date(m // 12, m % 12 + 1, 1)
+    return d.strftime("%Y-%m-%d")
+
+
+def resample_bars(daily: Any, period: str) -> Any:
+    """
+    由日K线聚合出更长周期的K线（向量化分组聚合）
+
+    Args:
+        daily: 按日期升序的日K线 DataFrame（akshare stock_zh_a_hist 列名）
+        period: 目标周期，如 "weekly"、"monthly"、"quarterly"、"2W"、"5D"
+
+    Returns:
+        聚合后的 DataFrame，日期为每组最后一个交易日，另附 "交易日数" 列
+    """
+    import pandas as pd
+
+    n, unit = parse_period(period)
+    if daily.empty:
+        return daily.assign(交易日数=pd.Series(dtype="int64"))
+    dates = pd.to_datetime(daily["日期"])
+    grouped = daily.groupby(_group_keys(dates, n, unit), sort=True)
+    out = grouped.agg(
+        日期=("日期", "last"),
+        开盘=("开盘", "first"),
+        收盘=("收盘", "last"),
+        最高=("最高", "max"),
+        最低=("最低", "min"),
+        成交量=("成交量", "sum"),
+        成交额=("成交额", "sum"),
+        换手率=("换手率", "sum"),
+        交易日数=("日期", "size"),
+    ).reset_index(drop=True)
+    # 前收盘：上一组收盘价；第一组由首日收盘价减涨跌额还原
+    prev_close = out["收盘"].shift(1)
+    prev_close.iloc[0] = daily["收盘"].iloc[0] - daily["涨跌额"].iloc[0]
+    out["涨跌额"] = (out["收盘"] - prev_close).round(2)
+    out["涨跌幅"] = (out["涨跌额"] / prev_close * 100).round(2)
+    out["振幅"] = ((out["最高"] - out["最低"]) / prev_close * 100).round(2)
+    out["换手率"] = out["换手率"].round(2)
+    if "股票代码" in daily.columns:
+        out["股票代码"] = daily["股票代码"].iloc[0]
+    columns = [c for c in daily.columns if c in out.columns] + ["交易日数"]
+    return out[columns]
+
+
+def _window_start(n: int, unit: str, end: str, limit: int) -> str:
+    # 估算包含最近 limit 根K线的下载起点，避免为少量K线下载整段历史
+    end_day = datetime.strptime(end, "%Y-%m-%d") if end else datetime.now()
+    days = int(limit * n * _UNIT_DAYS[unit]) + 30
+    return (end_day - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _load_bars(symbol: str, adjust: str, period: str, start: str, end: str, limit: Optional[int]) -> Tuple[Any, Dict[str, Any]]:
+    # 同步并读取日K线缓存；非日线周期由日K线在本地聚合，不再单独请求上游
+    import pandas as pd
+
+    n, unit = parse_period(period)
+    store = get_bar_store()
+    if n == 1 and unit == "D":
+        # 只下载请求范围内缺失的部分（未给开始日期时按 limit 估算），之后按日期索引直接读取
+        sync_from = start or (_window_start(n, unit, end, limit) if limit else "")
+        sync = store.sync(symbol, "daily", adjust, start=sync_from)
+        df = store.read(symbol, "daily", adjust, start=start, end=end, limit=limit)
+        if not start and limit and len(df) < limit and sync["covered_from"] > bar_store.LISTING_START:
+            # 估算窗口内K线不足（长期停牌等），补齐更早的历史
+            sync = store.sync(symbol, "daily", adjust)
+            df = store.read(symbol, "daily", adjust, end=end, limit=limit)
+        return df, sync
+
+    # 读取起点对齐到所在聚合组的第一天，避免首根K线只聚合了部分交易日
+    read_from = start or (_window_start(n, unit, end, limit + 1) if limit else "")
+    read_from = _group_start(read_from, n, unit) if read_from else ""
+    sync = store.sync(symbol, "daily", adjust, start=read_from)
+    while True:
+        # 聚合是纯 DataFrame 计算，启用进程池时放到子进程中执行
+        bars = executor.cpu(resample_bars, store.read(symbol, "daily", adjust, start=read_from, end=end), period)
+        if unit == "D" and read_from and len(bars) and bars["交易日数"].iloc[0] < n:
+            # N 日K线从最新一根向前划分，读取窗口截断的首组不完整
+            bars = bars.iloc[1:]
+        if start:
+            bars = bars[pd.to_datetime(bars["日期"]) >= pd.Timestamp(start)]
+        if limit:
+            bars = bars.tail(limit)
+        if start or not limit or len(bars) >= limit or sync["covered_from"] <= bar_store.LISTING_START:
+            return bars.drop(columns="交易日数").reset_index(drop=True), sync
+        read_from = ""
+        sync = store.sync(symbol, "daily", adjust)
+
+
+def get_stock_hist(
+    symbol: str,
+    period: str = "daily",
+    adjust: str = "",
+    start_date: str = "",
+    end_date: str = "",
+    limit: int = 10,
+) -> Dict[str, Any]:
     """
     获取单只A股的历史行情数据
     
     Args:
         symbol: 股票代码，格式如 "000001" 或 "600000"
-        period: 周期，可选 "daily"(日), "weekly"(周), "monthly"(月)
+        period: 周期，可选 "daily"(日), "weekly"(周), "monthly"(月), "quarterly"(季)，
+            或 "<N>D/W/M/Q" 形式的自定义周期（如 "5D"、"2W"），非日线均由日K线在本地聚合
         adjust: 复权类型，可选 ""(不复权), "qfq"(前复权), "hfq"(后复权)
+        start_date: 开始日期，格式 "YYYYMMDD" 或 "YYYY-MM-DD"，为空不限
+        end_date: 结束日期（含），格式同上，为空不限
+        limit: 返回范围内最近的K线根数，小于等于 0 返回范围内全部
     
     Returns:
         包含历史行情数据的字典
     """
-    try:
-        import akshare as ak
-    except ImportError:
-        logger.error("akshare 库未安装")
-        return {
-            "error": "akshare 库未安装",
-            "symbol": symbol
-        }
-    
     try:
         # 验证股票代码格式
         if not symbol or len(symbol) != 6 or not symbol.isdigit():
@@ -109,41 +418,38 @@ def get_stock_hist(symbol: str, period: str = "daily", adjust: str = "") -> Dict
                 "error": f"股票代码格式错误，应为6位数字，当前输入: {symbol}",
                 "symbol": symbol
             }
-        
-        logger.info(f"开始获取股票 {symbol} 的历史行情数据，周期: {period}")
-        
-        # 调用 akshare 获取历史行情
-        df = ak.stock_zh_a_hist(symbol=symbol, period=period, adjust='qfq')
-        
+        if adjust not in HIST_ADJUSTS:
+            return {"error": f"不支持的复权类型: {adjust}，可选 {list(HIST_ADJUSTS)}", "symbol": symbol}
+        try:
+            parse_period(period)
+            start, end = _hist_date(start_date), _hist_date(end_date)
+        except ValueError as e:
+            return {"error": str(e), "symbol": symbol}
+        limit = limit if limit and limit > 0 else None
+
+        logger.info(f"开始获取股票 {symbol} 的历史行情数据，周期: {period}，复权: {adjust or '不复权'}，范围: {start or '-'} ~ {end or '-'}，条数: {limit or '全部'}")
+
+        df, sync = _load_bars(symbol, adjust, period, start, end, limit)
+        logger.info(f"股票 {symbol} 日K线缓存同步方式: {sync['mode']}，下载 {sync['downloaded']} 条")
+
         if df.empty:
             logger.warning(f"未找到股票代码 {symbol} 的历史数据")
             return {
                 "error": f"未找到股票代码 {symbol} 的历史数据",
                 "symbol": symbol
             }
-        
-        # 转换为字典列表格式（只返回最近10条记录）
-        records = df.tail(10).to_dict('records')
-        
-        # 处理数据类型
-        processed_records = []
-        for record in records:
-            processed_record = {}
-            for key, value in record.items():
-                if hasattr(value, 'item'):
-                    processed_record[key] = value.item()
-                elif hasattr(value, 'isoformat'):  # 处理日期类型
-                    processed_record[key] = value.isoformat()
-                else:
-                    processed_record[key] = value
-            processed_records.append(processed_record)
-        
+
+        # 按列转换为 Python 原生类型的字典列表
+        processed_records = serializer.records(df)
+
         logger.info(f"成功获取股票 {symbol} 的历史行情数据，返回 {len(processed_records)} 条记录")
         return {
             "success": True,
             "symbol": symbol,
             "period": period,
             "adjust": adjust,
+            "start_date": start,
+            "end_date": end,
             "count": len(processed_records),
             "data": processed_records
         }
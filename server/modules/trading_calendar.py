@@ -0,0 +1,123 @@
+"""
+中国交易日历与交易时段
+交易日优先取自 akshare 新浪交易日历（首次使用时加载并缓存），获取失败时退化为周一至周五。
+所有时间均按北京时间处理。
+"""
+import logging
+import threading
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('trading_calendar')
+
+CN_TZ = timezone(timedelta(hours=8))
+
+# 各品种交易时段（北京时间，左闭右开）；跨零点的期货夜盘拆成两段
+SESSIONS: Dict[str, List[Tuple[dtime, dtime]]] = {
+    # A股/场内基金：集合竞价 9:15 起
+    "stock": [(dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))],
+    # 国内期货日盘（商品 9:00 开盘，金融期货 13:00 开始下午盘，取并集）
+    "futures": [(dtime(9, 0), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))],
+}
+# 期货夜盘：交易日 21:00 至次日 02:30
+NIGHT_OPEN = dtime(21, 0)
+NIGHT_CLOSE = dtime(2, 30)
+
+_lock = threading.Lock()
+_trade_dates: Optional[Set[date]] = None
+_bounds: Optional[Tuple[date, date]] = None
+_source = "weekday"
+
+
+def now_cn() -> datetime:
+    return datetime.now(CN_TZ)
+
+
+def load(force: bool = False) -> str:
+    """从 akshare 加载交易日历，返回数据来源（"sina" 或 "weekday"）"""
+    global _trade_dates, _bounds, _source
+    with _lock:
+        if _trade_dates is not None and not force:
+            return _source
+    try:
+        import akshare as ak  # type: ignore
+        df = ak.tool_trade_date_hist_sina()
+        dates = {d if isinstance(d, date) else datetime.strptime(str(d)[:10], "%Y-%m-%d").date() for d in df["trade_date"]}
+        source = "sina"
+    except Exception as e:
+        logger.warning(f"加载交易日历失败，按周一至周五处理: {e}")
+        dates, source = set(), "weekday"
+    with _lock:
+        _trade_dates, _source = dates, source
+        _bounds = (min(dates), max(dates)) if dates else None
+    return source
+
+
+def is_trading_day(d: date) -> bool:
+    dates, bounds = _trade_dates, _bounds
+    # 日历覆盖范围之外（或未加载）时按工作日判断
+    if dates and bounds and bounds[0] <= d <= bounds[1]:
+        return d in dates
+    return d.weekday() < 5
+
+
+def next_trading_day(d: date) -> date:
+    d += timedelta(days=1)
+    while not is_trading_day(d):
+        d += timedelta(days=1)
+    return d
+
+
+def has_night_session(d: date) -> bool:
+    # 节假日前最后一个交易日不开夜盘；普通周五夜盘延续到周一
+    return is_trading_day(d) and (next_trading_day(d) - d).days <= 3
+
+
+def futures_trading_day(at: Optional[datetime] = None) -> date:
+    """期货交易日：夜盘（21:00 起，含延续到次日凌晨的部分）与休市日归属下一个交易日"""
+    at = (at or now_cn()).astimezone(CN_TZ)
+    d = at.date()
+    if at.time() >= NIGHT_OPEN or not is_trading_day(d):
+        return next_trading_day(d)
+    return d
+
+
+def in_session(session: str, at: Optional[datetime] = None) -> bool:
+    """判断给定时刻是否处于 session（"stock" / "futures" / "always"）的交易时段"""
+    if session == "always":
+        return True
+    at = (at or now_cn()).astimezone(CN_TZ)
+    d, t = at.date(), at.time()
+    if session == "futures":
+        if t >= NIGHT_OPEN and has_night_session(d):
+            return True
+        if t < NIGHT_CLOSE and has_night_session(d - timedelta(days=1)):
+            return True
+    if not is_trading_day(d):
+        return False
+    return any(start <= t < end for start, end in SESSIONS.get(session, []))
+
+
+def next_session_start(session: str, at: Optional[datetime] = None) -> datetime:
+    """给定时刻之后最近一次开盘时间；已在交易时段内时返回 at 本身"""
+    at = (at or now_cn()).astimezone(CN_TZ)
+    if in_session(session, at):
+        return at
+    d = at.date()
+    for _ in range(30):
+        opens = [start for start, _ in SESSIONS.get(session, [])]
+        if session == "futures" and has_night_session(d):
+            opens.append(NIGHT_OPEN)
+        if is_trading_day(d):
+            for start in sorted(opens):
+                candidate = datetime.combine(d, start, CN_TZ)
+                if candidate > at:
+                    return candidate
+        d += timedelta(days=1)
+    return at + timedelta(days=1)
+
+
+def status() -> Dict[str, object]:
+    with _lock:
+        dates = _trade_dates
+    return {"source": _source, "loaded": dates is not None, "days": len(dates or ())}
@@ -0,0 +1,94 @@
+"""
+启动预热与就绪状态
+服务器启动时不导入 akshare / pandas / numpy 等重型库，SSE 端口先打开；
+预热任务在后台线程中导入这些库，就绪状态同时报告各数据缓存是否已有快照。
+"""
+import time
+import logging
+import importlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger('warmup')
+
+# 按依赖顺序导入：akshare 依赖 pandas，pandas 依赖 numpy
+HEAVY_MODULES = ("numpy", "pandas", "akshare")
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    "started_at": None,
+    "finished_at": None,
+    "modules": {},
+    "errors": {},
+}
+
+
+def import_heavy_modules(modules: Iterable[str] = HEAVY_MODULES) -> Dict[str, float]:
+    """
+    依次导入重型库并记录各自耗时（秒），已导入的库耗时约为 0；导入失败只记录错误，不抛出
+
+    Args:
+        modules: 模块名列表
+    """
+    with _lock:
+        _state["started_at"] = _state["started_at"] or time.time()
+    timings: Dict[str, float] = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"预热导入 {name} 失败: {e}")
+            with _lock:
+                _state["errors"][name] = str(e) or type(e).__name__
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+        with _lock:
+            _state["modules"][name] = timings[name]
+            _state["errors"].pop(name, None)
+    with _lock:
+        _state["finished_at"] = time.time()
+    logger.info(f"重型库预热完成: {timings}")
+    return timings
+
+
+def imports_ready() -> bool:
+    """预热已结束（失败的库会在首次使用时再次尝试导入）"""
+    return _state["finished_at"] is not None
+
+
+def status(caches: Dict[str, Tuple[Callable[[], Optional[float]], bool]]) -> Dict[str, Any]:
+    """
+    就绪状态：重型库预热结果与各数据缓存是否已有快照
+
+    Args:
+        caches: {缓存名: (返回缓存年龄秒数或 None 的函数, 当前是否应当已预热)}；
+            休市或未启用预取时缓存在首次请求时才加载，不计入就绪判断
+    """
+    with _lock:
+        state = {
+            "started_at": _state["started_at"],
+            "finished_at": _state["finished_at"],
+            "modules": dict(_state["modules"]),
+            "errors": dict(_state["errors"]),
+        }
+    cache_status = {}
+    for name, (age_fn, expected) in caches.items():
+        age = age_fn()
+        cache_status[name] = {
+            "warm": age is not None,
+            "age": round(age, 3) if age is not None else None,
+            "expected": expected,
+        }
+    imports = state["finished_at"] is not None
+    duration = state["finished_at"] - state["started_at"] if imports and state["started_at"] else None
+    return {
+        "ready": imports and all(c["warm"] or not c["expected"] for c in cache_status.values()),
+        "imports": {
+            "ready": imports,
+            "duration": round(duration, 3) if duration is not None else None,
+            "modules": state["modules"],
+            "errors": state["errors"],
+        },
+        "caches": cache_status,
+    }
@@ -13,9 +13,13 @@ import asyncio
 import json
 import os
 from pathlib import Path
-import httpx
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from . import http_client
+except ImportError:
+    import http_client  # type: ignore
+
 mcp = FastMCP("wechat-notify", json_response=True)
 
 
@@ -45,19 +49,21 @@ def _build_api_url() -> str:
 
 async def send_wechat(title: str, desp: str) -> dict[str, Any]:
     api_url = _build_api_url()
-    async with httpx.AsyncClient() as client:
-        headers = {"Content-Type": "application/json"}
-        payload = {"title": title, "desp": desp}
+    client = http_client.get_async_client()
+    if client is None:
+        return {"error": "httpx 未安装，无法发送微信通知"}
+    headers = {"Content-Type": "application/json"}
+    payload = {"title": title, "desp": desp}
+    try:
+        resp = await client.post(api_url, json=payload, headers=headers, timeout=30.0)
+        data: Any
         try:
-            resp = await client.post(api_url, json=payload, headers=headers, timeout=30.0)
-            data: Any
-            try:
-                data = resp.json()
-            except Exception:
-                data = {"text": resp.text}
-            return {"status_code": resp.status_code, "response": data}
-        except Exception as e:
-            return {"error": str(e)}
+            data = resp.json()
+        except Exception:
+            data = {"text": resp.text}
+        return {"status_code": resp.status_code, "response": data}
+    except Exception as e:
+        return {"error": str(e)}
 
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(prog="wechat_server")
@@ -84,7 +90,10 @@ async def _run_send(api_url: str, title: str, desp: str, dry_run: bool) -> None:
         url = _build_api_url() if key else "<missing key>"
         print({"api_url": url, "payload": {"title": title, "desp": desp}})
         return
-    result = await send_wechat(title, desp)
+    try:
+        result = await send_wechat(title, desp)
+    finally:
+        await http_client.aclose()
     print(result)
 
 
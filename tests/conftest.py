@@ -0,0 +1,136 @@
+"""
+测试共用的离线上游替身（pytest fixtures）
+"""
+import sys
+import os
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import stock_server
+from server.modules import futures_server
+from server.modules import futures_subscription
+from server.modules import spread_engine
+
+
+@pytest.fixture
+def fake_spot(monkeypatch):
+    """替换 A 股全市场行情接口并清空快照缓存，返回上游调用记录"""
+    import akshare as ak
+    import pandas as pd
+
+    calls = []
+
+    def fake():
+        calls.append(1)
+        return pd.DataFrame({
+            "代码": ["000001", "600519", "300750"],
+            "名称": ["平安银行", "贵州茅台", "宁德时代"],
+            "最新价": [11.5, 1500.0, 200.1],
+        })
+
+    monkeypatch.setattr(ak, "stock_zh_a_spot_em", fake)
+    monkeypatch.setattr(stock_server, "_spot_cache", None)
+    monkeypatch.setattr(stock_server, "spot_stats", stock_server.CacheStats())
+    return calls
+
+
+@pytest.fixture
+def fake_futures_akshare(monkeypatch):
+    """
+    替换主力合约解析与新浪期货行情接口，并清空主力合约缓存。
+    返回 install(mains, holds)：mains 为 {交易所: [主力合约]}，holds 为 {合约: 持仓量}，
+    两者可在测试中修改；install 返回 {"match": [...], "spot": [...]} 调用记录
+    """
+    import akshare as ak
+    import pandas as pd
+
+    def install(mains, holds):
+        calls = {"match": [], "spot": []}
+
+        def fake_match(symbol):
+            calls["match"].append(symbol)
+            return ",".join(mains.get(symbol, []))
+
+        def fake_spot(symbol, market, adjust):
+            calls["spot"].append((market, symbol))
+            codes = symbol.split(",")
+            return pd.DataFrame({
+                "symbol": codes,
+                "time": ["145959"] * len(codes),
+                "current_price": [100.0] * len(codes),
+                "hold": [holds.get(c, 1000.0) for c in codes],
+            })
+
+        monkeypatch.setattr(ak, "match_main_contract", fake_match)
+        monkeypatch.setattr(ak, "futures_zh_spot", fake_spot)
+        monkeypatch.setattr(futures_server, "_main_contracts", None)
+        monkeypatch.setattr(futures_server, "_main_list_cache", None)
+        monkeypatch.setattr(futures_server, "_hold_peaks", {})
+        monkeypatch.setattr(futures_server, "_rollovers", [])
+        monkeypatch.setattr(futures_server, "contract_stats", futures_server.CacheStats())
+        return calls
+
+    return install
+
+
+class QuoteFeed:
+    """futures_server.fetch_quotes 的替身：按 prices 返回行情，记录每次请求的 {合约: 市场}"""
+
+    def __init__(self):
+        self.prices = {}
+        self.calls = []
+        # 未在 prices 中的合约使用的价格；None 表示上游不返回该合约
+        self.default = None
+        # 非空时模拟上游整体失败，返回 ({}, errors)
+        self.errors = {}
+
+    def fetch(self, markets):
+        self.calls.append(dict(markets))
+        if self.errors:
+            return {}, dict(self.errors)
+        quotes = {}
+        for code in markets:
+            price = self.prices.get(code, self.default)
+            if price is not None:
+                quotes[code] = {"symbol": code, "current_price": price, "hold": 10.0}
+        return quotes, {}
+
+
+@pytest.fixture
+def quote_feed():
+    """期货行情替身，见 QuoteFeed"""
+    return QuoteFeed()
+
+
+@pytest.fixture
+def hub(quote_feed):
+    """使用 quote_feed 拉取行情的订阅中心，所有合约默认价格 100"""
+    quote_feed.default = 100.0
+    return futures_subscription.SubscriptionHub(fetch=quote_feed.fetch)
+
+
+class SpreadDate(date):
+    """价差引擎看到的“今天”，固定在测试合约（2605 等）交割之前"""
+
+    @classmethod
+    def today(cls):
+        return cls(2025, 12, 1)
+
+
+@pytest.fixture
+def spread_quotes(monkeypatch, quote_feed):
+    """
+    替换价差引擎使用的 futures_server.fetch_quotes 并清空其行情缓存与样本，
+    把引擎的日期固定为 SpreadDate.today()，返回 quote_feed
+    """
+    monkeypatch.setattr(spread_engine, "date", SpreadDate)
+    monkeypatch.setattr(futures_server, "fetch_quotes", quote_feed.fetch)
+    monkeypatch.setattr(spread_engine, "_quotes", {})
+    monkeypatch.setattr(spread_engine, "_history", OrderedDict())
+    monkeypatch.setattr(spread_engine, "_sampled_at", {})
+    return quote_feed
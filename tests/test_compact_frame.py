@@ -0,0 +1,62 @@
+"""
+测试常驻快照的紧凑列式表示
+"""
+import sys
+import os
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from server.modules import serializer
+from server.modules.compact_frame import CompactFrame
+
+
+def test_compact_roundtrip_and_lookup():
+    """测试紧凑存储的列类型选择、按代码二分查找、行视图以及还原结果与原表一致"""
+    df = pd.DataFrame({
+        "序号": [1, 2, 3],
+        "代码": ["600519", "000001", "300750"],
+        "名称": ["贵州茅台", "平安银行", None],
+        "最新价": [1500.13, 11.5, np.nan],
+        "总市值": [1.88e12, 2.2e11, 8.7e11],
+        "量比": [0.123456, 1.0, 2.0],
+    })
+    frame = CompactFrame(df, key="代码")
+    layout = frame.layout()
+    assert layout["代码"] == "code:int32"
+    assert layout["名称"].startswith("dict:")
+    assert layout["最新价"] == "f32:float32/2dp"
+    # 超出 float32 精度或小数位过多的列保持 float64
+    assert layout["总市值"].startswith("raw:float64") and layout["量比"].startswith("raw:float64")
+
+    assert frame.records() == serializer.records(df)
+    row = frame.get("000001")
+    assert row["名称"] == "平安银行" and row["最新价"] == 11.5 and type(row["序号"]) is int
+    assert frame.get("300750").to_dict(["名称", "最新价"]) == {"名称": None, "最新价": None}
+    # 行视图逐格取值，结果与按列还原一致且为 Python 原生类型
+    for pos, expected in enumerate(serializer.records(df)):
+        values = frame.row(pos).to_dict()
+        assert values == expected
+        assert [type(v) for v in values.values()] == [type(v) for v in expected.values()]
+    assert frame.find("999999") is None and frame.find("abc") is None
+    assert frame.nbytes() < df.memory_usage(deep=True).sum()
+
+
+def test_null_string_columns():
+    """测试整列缺失与大部分缺失的字符串列可以正常还原"""
+    df = pd.DataFrame({
+        "代码": ["600519", "000001", "300750"],
+        "板块": [None, None, None],
+        "备注": [None, np.nan, "停牌"],
+    })
+    frame = CompactFrame(df, key="代码")
+    assert frame.layout()["板块"].startswith("dict:")
+    assert frame.records() == [
+        {"代码": "600519", "板块": None, "备注": None},
+        {"代码": "000001", "板块": None, "备注": None},
+        {"代码": "300750", "板块": None, "备注": "停牌"},
+    ]
+    assert frame.get("000001").to_dict(["板块"]) == {"板块": None}
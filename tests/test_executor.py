@@ -0,0 +1,73 @@
+"""
+测试按上游划分的执行层（离线）
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import executor as ex
+
+
+def test_lanes_isolate_slow_upstream(monkeypatch):
+    """测试一个上游占满并排队时，其它上游的调用仍立即执行，且排队深度被统计"""
+    monkeypatch.setenv("EXECUTOR_SLOWUP_WORKERS", "1")
+    ex.shutdown()
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return "slow"
+
+    async def main():
+        slow = [asyncio.ensure_future(ex.run("slowup", blocked)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        depth = ex.lane("slowup").stats()
+        started = time.perf_counter()
+        fast = await ex.run("fastup", lambda x: x * 2, 21)
+        elapsed = time.perf_counter() - started
+        release.set()
+        return depth, fast, elapsed, await asyncio.gather(*slow)
+
+    try:
+        depth, fast, elapsed, slow = asyncio.run(main())
+    finally:
+        release.set()
+    assert depth["workers"] == 1 and depth["running"] == 1 and depth["queued"] == 2
+    assert fast == 42 and elapsed < 1
+    assert slow == ["slow"] * 3
+    stats = ex.stats()["lanes"]["slowup"]
+    assert stats["completed"] == 3 and stats["queued"] == 0 and stats["max_queued"] >= 2
+    assert stats["wait_max"] > 0
+    ex.shutdown()
+
+
+def test_failures_and_cpu(monkeypatch):
+    """测试异常透传与失败计数；未启用进程池时计算在当前线程执行，启用后在子进程执行"""
+    ex.shutdown()
+
+    def boom():
+        raise ValueError("bad symbol")
+
+    async def main():
+        try:
+            await ex.run("errup", boom)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(main()) == "bad symbol"
+    assert ex.stats()["lanes"]["errup"]["failed"] == 1
+
+    monkeypatch.delenv("EXECUTOR_PROCESS_WORKERS", raising=False)
+    assert ex.cpu(threading.get_ident) == threading.get_ident()
+    monkeypatch.setenv("EXECUTOR_PROCESS_WORKERS", "1")
+    try:
+        assert ex.cpu(os.getpid) != os.getpid()
+        assert ex.stats()["process_pool_started"]
+    finally:
+        ex.shutdown()
+    assert not ex.stats()["process_pool_started"]
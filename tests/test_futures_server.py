@@ -0,0 +1,138 @@
+"""
+测试期货主力合约解析缓存（离线）
+"""
+import sys
+import os
+from datetime import date
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import futures_server as f
+from server.modules import trading_calendar as cal
+
+
+def test_main_contracts_cached_per_trading_day(monkeypatch, fake_futures_akshare):
+    """测试主力合约按交易日解析一次，之后每次行情请求只调用 futures_zh_spot；换交易日时重新解析"""
+    mains = {"dce": ["M2605"], "czce": ["TA605"], "shfe": ["RB2605"], "gfex": [], "cffex": ["IF2512"]}
+    calls = fake_futures_akshare(mains, {})
+    day = {"value": date(2025, 12, 5)}
+    monkeypatch.setattr(cal, "futures_trading_day", lambda at=None: day["value"])
+
+    for _ in range(3):
+        result = f.get_futures_main_list(force_refresh=True)
+        assert result["success"] and result["count"] == 4
+    assert f.get_futures_financial_list()["count"] == 1
+    assert len(calls["match"]) == 5
+    assert sorted(calls["spot"][:2]) == [("CF", "M2605,TA605,RB2605"), ("FF", "IF2512")]
+    assert "errors" not in result
+
+    # 新的交易日（含夜盘归属下一交易日）重新解析，并记录主力切换
+    day["value"] = date(2025, 12, 8)
+    mains["shfe"] = ["RB2610"]
+    f.get_futures_main_list(force_refresh=True)
+    assert len(calls["match"]) == 10
+    status = f.main_contracts_status()
+    assert status["reason"] == "new_trading_day" and status["trading_day"] == "2025-12-08"
+    assert status["rollovers"][-1]["changes"] == [{"product": "RB", "from": "RB2605", "to": "RB2610"}]
+
+    # 手动刷新
+    mains["dce"] = ["M2609"]
+    refreshed = f.refresh_main_contracts()
+    assert refreshed["reason"] == "manual"
+    assert refreshed["rollovers"] == [{"trading_day": "2025-12-08", "reason": "manual",
+                                       "changes": [{"product": "M", "from": "M2605", "to": "M2609"}]}]
+
+
+def test_rollover_detected_from_open_interest(monkeypatch, fake_futures_akshare):
+    """测试主力合约持仓量从峰值明显回落时标记失效，下次请求重新解析"""
+    mains = {"dce": ["M2605"], "czce": [], "shfe": [], "gfex": [], "cffex": []}
+    holds = {"M2605": 1000.0}
+    calls = fake_futures_akshare(mains, holds)
+    monkeypatch.setattr(cal, "futures_trading_day", lambda at=None: date(2025, 12, 5))
+    monkeypatch.setenv("FUTURES_ROLLOVER_RECHECK", "0")
+
+    f.get_futures_main_list(force_refresh=True)
+    holds["M2605"] = 900.0
+    f.get_futures_main_list(force_refresh=True)
+    assert len(calls["match"]) == 5 and f.main_contracts_status()["stale"] is None
+
+    holds["M2605"] = 600.0
+    mains["dce"] = ["M2609"]
+    f.get_futures_main_list(force_refresh=True)
+    assert f.main_contracts_status()["stale"] == "rollover"
+    f.get_futures_main_list(force_refresh=True)
+    assert len(calls["match"]) == 10
+    status = f.main_contracts_status()
+    assert status["reason"] == "rollover" and status["symbols"]["dce"] == ["M2609"]
+    assert calls["spot"][-1] == ("CF", "M2609")
+
+
+def test_fan_out_partial_results(monkeypatch, fake_futures_akshare):
+    """测试交易所解析与商品/金融行情并发执行，部分交易所失败时返回其余数据并逐个交易所给出错误"""
+    import time
+    import akshare as ak
+
+    mains = {"dce": ["M2605"], "czce": ["TA605"], "shfe": ["RB2605"], "gfex": ["SI2605"], "cffex": ["IF2512"]}
+    calls = fake_futures_akshare(mains, {})
+    monkeypatch.setattr(cal, "futures_trading_day", lambda at=None: date(2025, 12, 5))
+    fake_match, fake_spot = ak.match_main_contract, ak.futures_zh_spot
+
+    def slow_match(symbol):
+        time.sleep(0.2)
+        if symbol == "gfex":
+            raise ConnectionError("gfex timeout")
+        return fake_match(symbol)
+
+    def slow_spot(symbol, market, adjust):
+        time.sleep(0.2)
+        if market == "FF":
+            raise ConnectionError("sina FF down")
+        return fake_spot(symbol, market, adjust)
+
+    monkeypatch.setattr(ak, "match_main_contract", slow_match)
+    monkeypatch.setattr(ak, "futures_zh_spot", slow_spot)
+
+    start = time.perf_counter()
+    result = f.get_futures_main_list(force_refresh=True)
+    # 5 次解析 + 2 次行情串行需要 1.4s，并发后约为 0.4s
+    assert time.perf_counter() - start < 1.0
+    assert result["success"] and result["partial"]
+    assert [r["symbol"] for r in result["data"]] == ["M2605", "TA605", "RB2605"]
+    assert result["errors"] == {"gfex": "gfex timeout", "cffex": "FF quotes: sina FF down"}
+    status = f.main_contracts_status()
+    assert set(status["latency"]) == set(f.MAIN_EXCHANGES) and status["errors"] == {"gfex": "gfex timeout"}
+
+
+def test_align_quotes(monkeypatch):
+    """测试行情行按新浪名称与月份对应回合约代码，上游丢弃的合约保持缺失，不把下一行顺延给它"""
+    monkeypatch.setattr(f, "SINA_PRODUCT_NAMES", dict(f.SINA_PRODUCT_NAMES))
+    codes = ["RB2605", "HC2605", "TA605", "M2609", "IF2512"]
+    rows = [{"symbol": "热卷2605"}, {"symbol": "PTA2605"}, {"symbol": "豆粕2609"}, {"symbol": "IF2512"}]
+    # RB2605 没有最新价被丢弃：同月份的热卷行不能归给它
+    assert f._align_quotes(codes, rows) == {"HC2605": rows[0], "TA605": rows[1], "M2609": rows[2], "IF2512": rows[3]}
+    assert f._align_quotes(["RB2605", "TA605"], [{"symbol": "螺纹钢2605"}, {"symbol": "豆粕2609"}]) == {"RB2605": {"symbol": "螺纹钢2605"}}
+
+    # 未收录的名称：一行未丢时按订阅顺序对应并记住名称，之后即使有合约被丢弃也能按名称识别
+    new_rows = [{"symbol": "螺纹钢2605"}, {"symbol": "新品种2607"}]
+    assert f._align_quotes(["RB2605", "XY2607"], new_rows) == {"RB2605": new_rows[0], "XY2607": new_rows[1]}
+    assert f._align_quotes(["RB2605", "XY2607"], new_rows[1:]) == {"XY2607": new_rows[1]}
+    assert f._align_quotes(["RB2605", "ZZ2607"], [{"symbol": "另一品种2607"}]) == {}
+
+
+def test_batch_quotes_routed_by_exchange(fake_futures_akshare):
+    """测试批量行情按品种索引把合约路由到 CF / FF，每个市场只请求一次，结果按合约代码返回"""
+    calls = fake_futures_akshare({}, {})
+    assert f.exchange_of("if2512") == "cffex" and f.market_of("T2603") == "FF"
+    assert f.exchange_of("TA605") == "czce" and f.market_of("SC2601") == "CF"
+
+    result = f.get_futures_realtime_batch(["rb2605", "IF2512", "M2609", "T2603", "RB2605", "XX2601"])
+    assert result["success"] and result["count"] == 5
+    assert sorted(calls["spot"]) == [("CF", "RB2605,M2609,XX2601"), ("FF", "IF2512,T2603")]
+    assert list(result["data"]) == ["RB2605", "IF2512", "M2609", "T2603", "XX2601"]
+    assert result["markets"]["IF2512"] == "FF" and result["unknown_products"] == ["XX2601"]
+
+    # 单合约查询未指定市场时同样自动路由
+    f.get_futures_realtime("ic2512")
+    assert calls["spot"][-1] == ("FF", "IC2512")
+    assert not f.get_futures_realtime_batch([" "])["success"]
@@ -0,0 +1,70 @@
+"""
+测试期货行情订阅的共享轮询与增量更新（离线）
+"""
+import sys
+import os
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_shared_poll_and_deltas(hub, quote_feed):
+    """测试多个订阅者共用一次轮询，各自只收到自上次以来变化的字段"""
+    prices, calls = quote_feed.prices, quote_feed.calls
+    notified = []
+    hub.add_listener(notified.append)
+    hub.subscribe("a", ["rb2605", "M2605"])
+    hub.subscribe("b", ["RB2605", "IF2512"], market="FF")
+    assert hub.stats()["unique_contracts"] == 3 and hub.stats()["subscriptions"] == 4
+
+    hub.poll_once()
+    assert calls == [{"RB2605": "CF", "M2605": "CF", "IF2512": "FF"}]
+    assert sorted(notified[-1]) == ["a", "b"]
+    first = hub.updates("a")["updates"]
+    assert first == {
+        "RB2605": {"symbol": "RB2605", "current_price": 100.0, "hold": 10.0},
+        "M2605": {"symbol": "M2605", "current_price": 100.0, "hold": 10.0},
+    }
+
+    prices["RB2605"] = 101.0
+    hub.poll_once()
+    assert hub.updates("a")["updates"] == {"RB2605": {"current_price": 101.0}}
+    # b 尚未取过更新，收到完整行情
+    assert hub.updates("b")["updates"]["IF2512"]["hold"] == 10.0
+    assert hub.updates("a")["updates"] == {}
+
+    prices["IF2512"] = 99.0
+    hub.poll_once()
+    assert notified[-1] == ["b"]
+    assert hub.updates("b")["updates"] == {"IF2512": {"current_price": 99.0}}
+    assert len(calls) == 3 and hub.stats()["upstream_calls"] == 6
+
+
+def test_unsubscribe_and_expiry(monkeypatch, hub, quote_feed):
+    """测试取消订阅按引用计数释放合约，长时间未取更新的订阅者被清理，无订阅时不请求上游"""
+    calls = quote_feed.calls
+    hub.subscribe("a", ["RB2605", "M2605"])
+    hub.subscribe("b", ["RB2605"])
+    hub.unsubscribe("a", ["RB2605"])
+    hub.poll_once()
+    assert set(calls[-1]) == {"RB2605", "M2605"}
+
+    hub.unsubscribe("a")
+    hub.poll_once()
+    assert set(calls[-1]) == {"RB2605"}
+
+    monkeypatch.setenv("FUTURES_SUB_IDLE", "0")
+    assert hub.poll_once() == 0
+    assert hub.stats()["subscribers"] == 0 and len(calls) == 2
+    try:
+        hub.updates("b")
+        assert False, "过期订阅者应当报错"
+    except KeyError:
+        pass
+
+    for bad in ([], ["RB2605"]):
+        try:
+            hub.subscribe("c", bad, market="XX" if bad else "CF")
+            assert False
+        except ValueError:
+            pass
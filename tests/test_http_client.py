@@ -0,0 +1,37 @@
+"""
+测试进程共享 HTTP 客户端（离线）
+"""
+import sys
+import os
+import asyncio
+import gc
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import http_client
+
+
+def test_async_client_closed_with_its_loop():
+    """测试每个事件循环共享一个 AsyncClient，asyncio.run 结束时客户端被关闭并且不再持有该事件循环"""
+    async def use():
+        first = http_client.get_async_client()
+        assert http_client.get_async_client() is first
+        return first
+
+    clients = [asyncio.run(use()) for _ in range(3)]
+    gc.collect()
+    assert len({id(c) for c in clients}) == 3
+    assert all(c.is_closed for c in clients)
+    assert len(http_client._async_clients) == 0
+
+
+def test_explicit_aclose():
+    """测试应用退出时显式关闭当前事件循环的客户端"""
+    async def use():
+        client = http_client.get_async_client()
+        await http_client.aclose()
+        return client, len(http_client._async_clients)
+
+    client, left = asyncio.run(use())
+    assert client.is_closed and left == 0
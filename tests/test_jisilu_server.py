@@ -0,0 +1,301 @@
+"""
+测试集思录 QDII/LOF 数据模块（离线，替换网络请求）
+"""
+import sys
+import os
+import time
+import asyncio
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import jisilu_mcp_server as j
+
+
+def _cell(code, name, premium, status):
+    return {"cell": {"fund_id": code, "fund_nm": name, "discount_rt": premium, "apply_status": status}}
+
+
+def test_fetch_api_rows_concurrent(monkeypatch):
+    """测试各分类并发抓取，单个分类失败不影响其它分类"""
+    payloads = {
+        "QDII-E": [_cell("513100", "纳指ETF", "3.10%", "限额申购")],
+        "QDII-C": [_cell("160216", "国泰商品", "1.20%", "开放申购")],
+        "QDII-A": [_cell("513030", "德国ETF", "2.50%", "限大额")],
+    }
+    by_url = {req[1]: req[0] for req in j._api_requests()}
+
+    async def fake_get_json(client, url, params):
+        await asyncio.sleep(0.2)
+        label = by_url[url]
+        if label == "LOF":
+            raise RuntimeError("boom")
+        return {"rows": payloads[label]}
+
+    monkeypatch.setattr(j, "_get_json_async", fake_get_json)
+    start = time.perf_counter()
+    rows = j._fetch_api_rows()
+    elapsed = time.perf_counter() - start
+
+    assert sorted(r["代码"] for r in rows) == ["160216", "513030", "513100"]
+    # 四个分类各 0.2s，并发执行时总耗时应远小于 0.8s
+    assert elapsed < 0.6
+
+
+def test_snapshot_cache(monkeypatch):
+    """测试快照缓存：不同阈值复用同一快照，force_refresh 强制重新抓取"""
+    calls = []
+
+    def fake_fetch_data():
+        calls.append(1)
+        return [
+            {"代码": "513100", "名称": "纳指ETF", "T-1溢价率": "3.10%", "申购状态": "限额申购"},
+            {"代码": "513030", "名称": "德国ETF", "T-1溢价率": "1.50%", "申购状态": "限大额"},
+            {"代码": "160216", "名称": "国泰商品", "T-1溢价率": "5.00%", "申购状态": "开放申购"},
+        ]
+
+    monkeypatch.setattr(j, "_fetch_data", fake_fetch_data)
+    monkeypatch.setattr(j, "_snapshot", None)
+    monkeypatch.setattr(j, "_failed_at", None)
+    monkeypatch.setenv("JISILU_SNAPSHOT_TTL", "60")
+
+    assert [r["代码"] for r in j.qdii_candidates(2.0)] == ["513100"]
+    assert len(j.qdii_candidates(1.0)) == 2
+    assert len(calls) == 1
+
+    result = j.qdii_candidates_with_meta(1.0, force_refresh=True)
+    assert len(calls) == 2
+    assert result["count"] == 2
+    assert result["snapshot_age"] < 1
+
+
+def test_snapshot_failed_refresh_keeps_previous(monkeypatch):
+    """测试有效期过后刷新失败时返回上一次成功的快照并标记 stale，而不是空结果"""
+    batches = [[{"代码": "513100", "名称": "纳指ETF", "T-1溢价率": "3.10%", "申购状态": "限额申购"}], []]
+    monkeypatch.setattr(j, "_fetch_data", lambda: batches.pop(0))
+    monkeypatch.setattr(j, "_snapshot", None)
+    monkeypatch.setattr(j, "_failed_at", None)
+
+    first = j.qdii_candidates_with_meta(2.0)
+    assert "stale" not in first
+    result = j.qdii_candidates_with_meta(2.0, force_refresh=True)
+    assert result["stale"] is True and result["count"] == 1
+    assert result["snapshot_version"] == first["snapshot_version"]
+    assert not j.get_snapshot().get("stale")
+
+
+def test_snapshot_failure_cooldown(monkeypatch):
+    """测试所有数据源失败后冷却期内直接返回旧快照而不重复抓取，冷却期过后再次尝试"""
+    batches = [[{"代码": "513100", "名称": "纳指ETF", "T-1溢价率": "3.10%", "申购状态": "限额申购"}]]
+    calls = []
+
+    def fake_fetch_data():
+        calls.append(1)
+        return batches.pop(0) if batches else []
+
+    monkeypatch.setattr(j, "_fetch_data", fake_fetch_data)
+    monkeypatch.setattr(j, "_snapshot", None)
+    monkeypatch.setattr(j, "_failed_at", None)
+    monkeypatch.setenv("JISILU_SNAPSHOT_TTL", "0")
+    monkeypatch.setenv("JISILU_FAILURE_COOLDOWN", "60")
+
+    first = j.get_snapshot()
+    failed = j.get_snapshot()
+    assert failed["stale"] is True and failed["version"] == first["version"] and len(calls) == 2
+    for _ in range(3):
+        assert j.get_snapshot(force_refresh=True)["stale"] is True
+    assert len(calls) == 2
+
+    monkeypatch.setenv("JISILU_FAILURE_COOLDOWN", "0")
+    batches.append([{"代码": "159941", "名称": "纳指ETF", "T-1溢价率": "2.50%", "申购状态": "限额申购"}])
+    fresh = j.get_snapshot()
+    assert len(calls) == 3 and "stale" not in fresh and j._failed_at is None
+
+
+def test_fetch_api_rows_paginated(monkeypatch):
+    """测试按首页 total 分页并行抓取，并发数不超过上限"""
+    lof_url = j.LOF_LIST_URL
+    total = 60
+    in_flight = []
+    peak = []
+
+    async def fake_get_json(client, url, params):
+        if url != lof_url:
+            return {"rows": [], "total": 0}
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.pop()
+        page, rp = int(params["page"]), int(params["rp"])
+        codes = range((page - 1) * rp, min(page * rp, total))
+        return {"page": page, "total": total, "rows": [_cell(f"{c:06d}", "LOF", "3%", "限额申购") for c in codes]}
+
+    monkeypatch.setattr(j, "_get_json_async", fake_get_json)
+    monkeypatch.setenv("JISILU_PAGE_CONCURRENCY", "2")
+    rows = j._fetch_api_rows()
+
+    assert len(rows) == total
+    assert len({r["代码"] for r in rows}) == total
+    assert max(peak) <= 2
+
+
+def test_candidates_multi():
+    """测试列式引擎的多阈值与按基金阈值查询"""
+    cols = j.QdiiColumns([
+        {"代码": "A", "名称": "a", "T-1溢价率": "1.00%", "申购状态": "限额申购"},
+        {"代码": "B", "名称": "b", "T-1溢价率": "3.00%", "申购状态": "限大额"},
+        {"代码": "C", "名称": "c", "T-1溢价率": "5.00%", "申购状态": "开放申购"},
+        {"代码": "D", "名称": "d", "T-1溢价率": "-", "申购状态": "限额申购"},
+        {"代码": "E", "名称": "e", "T-1溢价率": "+2.00%", "申购状态": "限100"},
+    ])
+    assert [r["代码"] for r in cols.candidates(1.5)] == ["B", "E"]
+
+    multi = cols.candidates_multi([0.5, 2.0, 10.0])
+    assert [r["代码"] for r in multi[0.5]] == ["B", "E", "A"]
+    assert [r["代码"] for r in multi[2.0]] == ["B"]
+    assert multi[10.0] == []
+
+    by_fund = cols.candidates_by_fund({"A": 0.5, "B": 4.0})
+    assert [r["代码"] for r in by_fund] == ["A"]
+    by_fund = cols.candidates_by_fund({"B": 4.0}, default=1.5)
+    assert [r["代码"] for r in by_fund] == ["E"]
+
+
+def test_candidate_changes(monkeypatch):
+    """测试按版本号增量返回候选变化"""
+    batches = [
+        [
+            {"代码": "A", "名称": "a", "T-1溢价率": "3.00%", "申购状态": "限额申购"},
+            {"代码": "B", "名称": "b", "T-1溢价率": "4.00%", "申购状态": "限额申购"},
+            {"代码": "C", "名称": "c", "T-1溢价率": "5.00%", "申购状态": "限大额"},
+        ],
+        [
+            {"代码": "A", "名称": "a", "T-1溢价率": "3.10%", "申购状态": "限额申购"},
+            {"代码": "B", "名称": "b", "T-1溢价率": "1.00%", "申购状态": "限额申购"},
+            {"代码": "C", "名称": "c", "T-1溢价率": "5.00%", "申购状态": "限100"},
+            {"代码": "D", "名称": "d", "T-1溢价率": "2.50%", "申购状态": "限额申购"},
+        ],
+    ]
+    monkeypatch.setattr(j, "_fetch_data", lambda: batches.pop(0))
+    monkeypatch.setattr(j, "_snapshot", None)
+    monkeypatch.setattr(j, "_failed_at", None)
+
+    first = j.qdii_candidate_changes(2.0)
+    assert first["full"] is True
+    assert [r["代码"] for r in first["entered"]] == ["A", "B", "C"]
+
+    second = j.qdii_candidate_changes(2.0, since_version=first["snapshot_version"], force_refresh=True)
+    assert second["full"] is False
+    assert [r["代码"] for r in second["entered"]] == ["D"]
+    assert [r["代码"] for r in second["exited"]] == ["B"]
+    assert [(r["代码"], r["前申购状态"]) for r in second["changed"]] == [("C", "限大额")]
+    assert second["snapshot_version"] > first["snapshot_version"] > time.time() * 1000 - 60000
+
+    # 重启后（版本历史为空）旧进程的版本号不会匹配到新快照，返回全部候选
+    monkeypatch.setattr(j, "_versions", j.OrderedDict())
+    monkeypatch.setattr(j, "_version_seq", 0)
+    batches.append([{"代码": "A", "名称": "a", "T-1溢价率": "3.10%", "申购状态": "限额申购"}])
+    third = j.qdii_candidate_changes(2.0, since_version=1, force_refresh=True)
+    assert third["full"] is True and third["snapshot_version"] != 1
+
+
+def test_candidate_changes_on_failed_fetch(monkeypatch):
+    """测试抓取失败时增量为空，不会把旧候选全部列为退出"""
+    batches = [
+        [{"代码": "A", "名称": "a", "T-1溢价率": "3.00%", "申购状态": "限额申购"}],
+        [],
+    ]
+    monkeypatch.setattr(j, "_fetch_data", lambda: batches.pop(0) if batches else [])
+    monkeypatch.setattr(j, "_snapshot", None)
+    monkeypatch.setattr(j, "_failed_at", None)
+
+    first = j.qdii_candidate_changes(2.0)
+    second = j.qdii_candidate_changes(2.0, since_version=first["snapshot_version"], force_refresh=True)
+    assert second["stale"] is True and second["full"] is False
+    assert second["count"] == {"entered": 0, "exited": 0, "changed": 0}
+
+    monkeypatch.setattr(j, "_snapshot", None)
+    empty = j.qdii_candidate_changes(2.0, since_version=first["snapshot_version"])
+    assert empty["error"] and empty["full"] is False and empty["exited"] == []
+
+
+def test_parse_html_rows():
+    """测试页面解析：data-name 单元格与按表头位置两种表格"""
+    html = """
+    <table><tr><th>代码</th><th>名称</th><th>现价</th><th>T-1溢价率</th><th>申购状态</th></tr>
+    <tr><td><a href="#">513100</a></td><td>纳指ETF</td><td>1.234</td><td>+3.10%</td><td>限额申购</td></tr></table>
+    <table><tr id="160216"><td data-name="fund_nm">国泰 商品</td><td data-name="discount_rt">1.20%</td>
+    <td data-name="apply_status"><span>暂停申购</span></td></tr></table>
+    """
+    rows = j._parse_html_rows(html)
+    assert rows == [
+        {"代码": "513100", "名称": "纳指ETF", "T-1溢价率": "+3.10%", "申购状态": "限额申购"},
+        {"代码": "160216", "名称": "国泰 商品", "T-1溢价率": "1.20%", "申购状态": "暂停申购"},
+    ]
+
+
+def test_parse_html_fragment():
+    """测试保存的页面片段：分组表头与合并单元格、嵌套标签、汇总行与跨表重复代码"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "jisilu_qdii_fragment.html")
+    with open(path, encoding="utf-8") as fh:
+        html = fh.read()
+    rows = j._parse_html_rows(html)
+    assert rows == [
+        {"代码": "161970", "名称": "德国ETF LOF", "T-1溢价率": "1.37%", "申购状态": "暂停申购"},
+        # 估值列合并后该行后续单元格整体左移，需重新按 data-name 定位
+        {"代码": "159564", "名称": "黄金主题LOF1", "T-1溢价率": "2.65%", "申购状态": "限额申购"},
+        {"代码": "160047", "名称": "华宝油气2", "T-1溢价率": "3.23%", "申购状态": "开放申购"},
+        # 无 data-name 的表格按表头位置取值，"现价 / 涨幅" 占两列
+        {"代码": "513100", "名称": "纳指ETF", "T-1溢价率": "+3.10%", "申购状态": "限额申购"},
+    ]
+
+
+def _legacy_ak_rows(df):
+    # 旧实现的行转换：iterrows + 嵌套 r.get 回退（与 benchmarks/bench_ak_rows.py 中的对照实现一致）
+    return [
+        {
+            "代码": str(r.get("代码", r.get("fund_id", ""))),
+            "名称": str(r.get("名称", r.get("fund_nm", ""))),
+            "T-1溢价率": str(r.get("T-1溢价率", r.get("T-1 溢价率", r.get("discount_rt", "")))),
+            "申购状态": str(r.get("申购状态", r.get("apply_status", ""))),
+        }
+        for _, r in df.iterrows()
+    ]
+
+
+def test_ak_df_to_rows_matches_legacy():
+    """测试 akshare 回退路径的按列转换与旧的逐行转换结果一致（数值/NaN/百分比字符串/缺失列/英文列名）"""
+    import numpy as np
+    import pandas as pd
+
+    frames = [
+        # qdii_e_index_jsl 形态：数值溢价率，含 NaN
+        pd.DataFrame({
+            "代码": ["513100", "513500", "159941"],
+            "名称": ["纳指ETF", "标普500ETF", "纳指ETF广发"],
+            "现价": [1.523, 2.01, np.nan],
+            "T-1溢价率": [3.1, np.nan, -0.25],
+            "申购状态": ["限额申购", "暂停申购", None],
+        }),
+        # 百分比字符串与空值
+        pd.DataFrame({
+            "代码": ["160216", "164824"],
+            "名称": ["国泰商品", None],
+            "T-1溢价率": ["1.20%", "-"],
+            "申购状态": ["开放申购", "限100"],
+        }),
+        # 英文列名，申购状态列缺失，溢价率列名带空格
+        pd.DataFrame({"fund_id": ["501018", "161129"], "fund_nm": ["南方原油", "原油LOF"], "T-1 溢价率": [5.5, np.nan]}),
+        pd.DataFrame({"fund_id": ["161125"], "discount_rt": ["12.34%"], "apply_status": ["限大额"]}),
+        pd.DataFrame({"代码": [], "T-1溢价率": []}),
+    ]
+    for df in frames:
+        assert j._ak_df_to_rows(df) == _legacy_ak_rows(df)
+
+
+def test_fetch_data_falls_back_to_html(monkeypatch):
+    """测试 API 与 akshare 均无数据时回退到页面解析"""
+    monkeypatch.setattr(j, "_fetch_api_rows", lambda: [])
+    monkeypatch.setattr(j, "_fetch_ak_rows", lambda: [])
+    monkeypatch.setattr(j, "_fetch_html", lambda url: '<tr id="513100"><td data-name="discount_rt">3%</td></tr>')
+    assert [r["代码"] for r in j._fetch_data()] == ["513100"]
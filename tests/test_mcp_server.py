@@ -47,7 +47,9 @@ async def test_arbitrage_mcp():
                         
                         # 尝试解析JSON
                         try:
-                            candidates = json.loads(candidates_text)
+                            payload = json.loads(candidates_text)
+                            candidates = payload.get("data", [])
+                            print(f"[INFO] 快照年龄: {payload.get('snapshot_age')}s")
                             print(f"[OK] 成功获取 {len(candidates)} 只基金")
                             
                             # 显示前3只基金
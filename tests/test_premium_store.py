@@ -0,0 +1,53 @@
+"""
+测试溢价率时间序列存储（使用临时 SQLite 文件）
+"""
+import sys
+import os
+import time
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import premium_store as ps
+from server.modules import jisilu_mcp_server as j
+
+
+def _snap(ts, premiums):
+    rows = [{"代码": code, "名称": f"基金{code}", "T-1溢价率": f"{p}%", "申购状态": "限额申购"} for code, p in premiums.items()]
+    return {"rows": rows, "columns": j.QdiiColumns(rows), "fetched_at": ts}
+
+
+def test_append_query_resample(tmp_path):
+    """测试快照写入、范围查询与重采样"""
+    store = ps.PremiumStore(str(tmp_path / "premium.db"))
+    base = ps.parse_time("2025-12-01 10:00", None)
+    for minute in range(10):
+        store.record_snapshot(_snap(base + minute * 60, {"513100": 1.0 + minute, "161226": 5.0}))
+    store.flush()
+
+    result = store.query("513100", "2025-12-01", "2025-12-01")
+    assert result["count"] == 10
+    assert result["data"][0]["T-1溢价率"] == 1.0
+    assert result["data"][-1]["时间"] == "2025-12-01 10:09:00"
+
+    result = store.query("513100", "2025-12-01 10:00", "2025-12-01 10:09", resample="5min")
+    assert [r["采样数"] for r in result["data"]] == [5, 5]
+    assert result["data"][0]["高"] == 5.0
+    assert result["data"][1]["收"] == 10.0
+    store.close()
+
+
+def test_retention_and_compaction(tmp_path):
+    """测试保留期清理与历史数据按小时压缩"""
+    store = ps.PremiumStore(str(tmp_path / "premium.db"), retention_days=30, compact_after_days=1)
+    now = int(time.time())
+    old_hour = (now - 3 * 86400) // 3600 * 3600
+    store.append(now - 40 * 86400, [("513100", "纳指", 1.0, "限额申购")])
+    for i in range(6):
+        store.append(old_hour + i * 60, [("513100", "纳指", float(i), "限额申购")])
+    store.append(now, [("513100", "纳指", 9.0, "限额申购")])
+    store.flush()
+
+    stats = store.maintain()
+    assert stats == {"expired": 1, "compacted": 5}
+    store.close()
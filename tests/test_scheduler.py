@@ -0,0 +1,63 @@
+"""
+测试交易日历与后台预取调度器（离线，交易日按工作日判断）
+"""
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import trading_calendar as cal
+from server.modules import scheduler as sched
+
+
+def _at(s):
+    return datetime.strptime(s, "%Y-%m-%d %H:%M").replace(tzinfo=cal.CN_TZ)
+
+
+def test_sessions():
+    """测试A股与期货交易时段判断（2025-12-05 为周五）"""
+    assert cal.in_session("stock", _at("2025-12-05 10:00"))
+    assert not cal.in_session("stock", _at("2025-12-05 12:00"))
+    assert not cal.in_session("stock", _at("2025-12-06 10:00"))
+    # 周五夜盘延续到周六凌晨
+    assert cal.in_session("futures", _at("2025-12-05 22:00"))
+    assert cal.in_session("futures", _at("2025-12-06 01:00"))
+    assert not cal.in_session("futures", _at("2025-12-06 03:00"))
+    assert cal.next_session_start("stock", _at("2025-12-05 16:00")) == _at("2025-12-08 09:15")
+    assert cal.next_session_start("futures", _at("2025-12-05 16:00")) == _at("2025-12-05 21:00")
+    # 期货交易日：夜盘及周末归属下一个交易日
+    assert cal.futures_trading_day(_at("2025-12-05 10:00")).isoformat() == "2025-12-05"
+    assert cal.futures_trading_day(_at("2025-12-05 21:30")).isoformat() == "2025-12-08"
+    assert cal.futures_trading_day(_at("2025-12-06 01:00")).isoformat() == "2025-12-08"
+    assert cal.futures_trading_day(_at("2025-12-09 01:00")).isoformat() == "2025-12-09"
+
+
+def test_scheduler_runs_and_reports():
+    """测试调度器按间隔运行任务并记录失败信息"""
+    calls = []
+
+    def ok():
+        calls.append(1)
+        return len(calls)
+
+    def bad():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        s = sched.Scheduler()
+        s.add_job("ok", ok, interval=0.05, session="always")
+        s.add_job("bad", bad, interval=0.05, session="always")
+        await s.start()
+        await asyncio.sleep(0.2)
+        status = s.status()
+        await s.stop()
+        return status
+
+    status = asyncio.run(run())
+    jobs = {j["name"]: j for j in status["jobs"]}
+    assert status["running"] is True
+    assert jobs["ok"]["runs"] >= 2 and jobs["ok"]["failures"] == 0
+    assert jobs["bad"]["failures"] >= 1 and jobs["bad"]["last_error"] == "upstream down"
@@ -0,0 +1,86 @@
+"""
+测试工具返回结果的统一序列化
+"""
+import sys
+import os
+import json
+from datetime import date
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from server.modules import serializer
+
+
+def test_records_and_dumps():
+    """测试按 dtype 整列转换（NaN/NaT、日期、numpy 数值、混合类型）与紧凑 JSON 输出"""
+    df = pd.DataFrame({
+        "代码": ["000001", None],
+        "最新价": [11.5, np.nan],
+        "成交量": np.array([100, 200], dtype=np.int64),
+        "日期": [date(2024, 1, 15), date(2024, 1, 16)],
+        "时间": pd.to_datetime(["2024-01-15 09:30:00", None]),
+        "混合": [np.float32(1.5), pd.NA],
+    })
+    rows = serializer.records(df)
+    assert rows == [
+        {"代码": "000001", "最新价": 11.5, "成交量": 100, "日期": "2024-01-15", "时间": "2024-01-15 09:30:00", "混合": 1.5},
+        {"代码": None, "最新价": None, "成交量": 200, "日期": "2024-01-16", "时间": None, "混合": None},
+    ]
+    assert type(rows[0]["成交量"]) is int and type(rows[0]["混合"]) is float
+    assert serializer.records(df, ["代码"]) == [{"代码": "000001"}, {"代码": None}]
+
+    text = serializer.dumps({"data": rows[:1], "n": np.int64(3), "ts": pd.Timestamp("2024-01-15 10:00")})
+    assert ", " not in text and "\"代码\"" in text
+    assert json.loads(text) == {"data": rows[:1], "n": 3, "ts": "2024-01-15 10:00:00"}
+
+
+def test_dumps_without_orjson(monkeypatch):
+    """测试未安装 orjson 时标准库路径同样输出合法 JSON（NaN/Infinity 为 null）且结果与 orjson 路径一致"""
+    obj = {
+        "price": float("nan"),
+        "rows": [{"v": float("inf")}, {"v": -float("inf")}, (1.5, np.float64("nan"))],
+        "arr": np.array([1.0, np.nan]),
+        "n": np.int64(3),
+        "ts": pd.Timestamp("2024-01-15 10:00"),
+        "名称": "纳指",
+    }
+    expected = {"price": None, "rows": [{"v": None}, {"v": None}, [1.5, None]], "arr": [1.0, None], "n": 3,
+                "ts": "2024-01-15 10:00:00", "名称": "纳指"}
+    if serializer.orjson is not None:
+        assert json.loads(serializer.dumps(obj)) == expected
+    monkeypatch.setattr(serializer, "orjson", None)
+    text = serializer.dumps(obj)
+    assert "NaN" not in text and "Infinity" not in text and "纳指" in text
+    assert json.loads(text) == expected
+    assert serializer.dumps({"a": [1, 2]}) == '{"a":[1,2]}'
+
+
+def test_futures_main_list_records(monkeypatch):
+    """测试期货主力合约列表工具经统一序列化返回 Python 原生值，NaN 输出为 null（离线）"""
+    import akshare as ak
+    from server.modules import futures_server as f
+
+    mains = {"dce": "M2605", "czce": "TA605", "shfe": "RB2605", "gfex": "", "cffex": "IF2512"}
+
+    def fake_spot(symbol, market, adjust):
+        codes = [c for c in symbol.split(",") if c]
+        return pd.DataFrame({
+            "symbol": codes,
+            "current_price": [np.nan if c == "TA605" else 100.0 for c in codes],
+            "hold": np.array([1000] * len(codes), dtype=np.int64),
+        })
+
+    monkeypatch.setattr(ak, "match_main_contract", lambda symbol: mains[symbol])
+    monkeypatch.setattr(ak, "futures_zh_spot", fake_spot)
+    monkeypatch.setattr(f, "_main_list_cache", None)
+
+    result = f.get_futures_main_list(force_refresh=True)
+    assert result["success"] and result["count"] == 4
+    rows = {r["symbol"]: r for r in result["data"]}
+    assert set(rows) == {"M2605", "TA605", "RB2605", "IF2512"}
+    assert rows["TA605"]["current_price"] is None and type(rows["IF2512"]["hold"]) is int
+    assert json.loads(serializer.dumps(result))["count"] == 4
@@ -0,0 +1,123 @@
+"""
+测试相同上游请求的合并（离线）
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import singleflight
+
+
+def test_threads_share_one_execution():
+    """测试并发线程只触发一次下载并共享结果与异常"""
+    group = singleflight.Group("test_threads")
+    started = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"rows": 5}
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(group.do("k", slow))) for _ in range(5)]
+    workers[0].start()
+    started.wait(1)
+    for t in workers[1:]:
+        t.start()
+    for t in workers:
+        t.join()
+    assert len(runs) == 1 and len(results) == 5
+    assert all(r is results[0] for r in results)
+    stats = group.stats()
+    assert stats["calls"] == 5 and stats["executions"] == 1 and stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+    # 异常同样共享，且不会被缓存：下一次调用重新执行
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    def call():
+        try:
+            group.do("k", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    started.clear()
+    workers = [threading.Thread(target=call) for _ in range(3)]
+    workers[0].start()
+    started.wait(1)
+    for t in workers[1:]:
+        t.start()
+    for t in workers:
+        t.join()
+    assert errors == ["upstream down"] * 3
+    assert group.stats()["failures"] == 1
+    assert group.do("k", lambda: 7) == 7
+    assert "test_threads" in singleflight.stats()
+
+
+def test_async_callers_coalesce():
+    """测试协程调用方合并：协程函数与放到线程中执行的同步函数"""
+    group = singleflight.Group("test_async")
+    runs = []
+
+    async def fetch_async():
+        runs.append("async")
+        await asyncio.sleep(0.05)
+        return "a"
+
+    def fetch_sync():
+        runs.append("sync")
+        time.sleep(0.05)
+        return "s"
+
+    async def main():
+        first = await asyncio.gather(*(group.do_async("x", fetch_async) for _ in range(4)))
+        second = await asyncio.gather(*(group.do_async("y", fetch_sync) for _ in range(4)))
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ["a"] * 4 and second == ["s"] * 4
+    assert runs == ["async", "sync"]
+    stats = group.stats()
+    assert stats["calls"] == 8 and stats["executions"] == 2 and stats["coalesced"] == 6
+
+
+def test_async_leader_cancelled():
+    """测试发起下载的协程被取消时，其它等待方仍拿到结果，下载只执行一次"""
+    group = singleflight.Group("test_async_cancel")
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(group.do_async("k", fetch))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(group.do_async("k", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        try:
+            await leader
+            cancelled = False
+        except asyncio.CancelledError:
+            cancelled = True
+        return results, cancelled
+
+    results, cancelled = asyncio.run(main())
+    assert cancelled and results == ["done"] * 3 and runs == [1]
+    assert group.stats()["in_flight"] == 0
@@ -0,0 +1,121 @@
+"""
+测试期货价差引擎（离线）
+"""
+import sys
+import os
+import math
+from datetime import date
+
+# 将项目根目录添加到路径（tests 的父目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.modules import spread_engine as se
+
+
+def test_build_pairs_and_delivery():
+    """测试按品种月份生成相邻跨期价差、校验自定义价差，以及郑商所三位月份的年份推断"""
+    pairs = se.build_pairs({"rb": ["2605", "2610", "2701"]}, [{"type": "ratio", "numerator": "y2605", "denominator": "P2605"}])
+    assert [p["name"] for p in pairs] == ["RB2605-RB2610", "RB2610-RB2701", "Y2605/P2605"]
+    assert se._delivery("RB2605") == date(2026, 5, 15)
+    assert se._delivery("TA605", today=date(2025, 12, 5)) == date(2026, 5, 15)
+    assert se._delivery("TA001", today=date(2029, 11, 1)) == date(2030, 1, 15)
+    for bad in ([{"type": "butterfly"}], [{"type": "spread", "legs": {}}], [{"type": "calendar", "near": "RB2605"}]):
+        try:
+            se.build_pairs(None, bad)
+            assert False, f"应当拒绝 {bad}"
+        except ValueError:
+            pass
+
+
+def test_spreads_vectorized(spread_quotes):
+    """测试跨期、线性组合与比价一次算出，年化 carry 按合约月份间隔折算，缺腿的价差为空"""
+    spread_quotes.prices.update({"RB2605": 3000.0, "RB2610": 3060.0, "M2605": 2800.0, "Y2605": 7500.0, "A2605": 4000.0, "P2605": 8000.0})
+    calls = spread_quotes.calls
+    result = se.compute_spreads(
+        {"RB": ["2605", "2610"]},
+        [
+            {"name": "crush", "type": "spread", "legs": {"M2605": 0.785, "Y2605": 0.185, "A2605": -1}},
+            {"type": "ratio", "numerator": "Y2605", "denominator": "P2605"},
+            {"type": "calendar", "near": "M2605", "far": "M2609"},
+        ],
+    )
+    by_name = {s["name"]: s for s in result["spreads"]}
+    calendar = by_name["RB2605-RB2610"]
+    assert calendar["value"] == -60.0
+    # (3060 - 3000) / 3000 / (153 / 365)
+    assert math.isclose(calendar["carry_annualized"], 4.77, abs_tol=0.01)
+    assert math.isclose(by_name["crush"]["value"], 0.785 * 2800 + 0.185 * 7500 - 4000)
+    assert by_name["Y2605/P2605"]["value"] == 0.9375 and by_name["Y2605/P2605"]["carry_annualized"] is None
+    assert by_name["M2605-M2609"]["value"] is None and by_name["M2605-M2609"]["missing"] == ["M2609"]
+    assert len(calls) == 1 and calls[0]["RB2605"] == "CF"
+
+
+def test_cached_quotes_and_rolling_zscore(monkeypatch, spread_quotes):
+    """测试行情在有效期内复用且不重复采样，过期后刷新并追加样本，样本足够时给出 z-score"""
+    prices, calls = spread_quotes.prices, spread_quotes.calls
+    prices.update({"RB2605": 3000.0, "RB2610": 3000.0})
+    monkeypatch.setenv("SPREAD_MIN_SAMPLES", "3")
+    monkeypatch.setenv("SPREAD_QUOTE_TTL", "60")
+    products = {"RB": ["2605", "2610"]}
+
+    se.compute_spreads(products)
+    second = se.compute_spreads(products)
+    assert len(calls) == 1 and second["spreads"][0]["samples"] == 1
+
+    monkeypatch.setenv("SPREAD_QUOTE_TTL", "0")
+    for far in (3010.0, 3020.0):
+        prices["RB2610"] = far
+        result = se.compute_spreads(products)
+    spread = result["spreads"][0]
+    assert spread["samples"] == 3 and spread["value"] == -20.0
+    # 样本 0, -10, -20：均值 -10，标准差 10
+    assert spread["mean"] == -10.0 and spread["std"] == 10.0 and spread["zscore"] == -1.0
+
+    # 窗口变化后重新积累样本
+    small = se.compute_spreads(products, window=2)
+    assert small["window"] == 2 and small["spreads"][0]["samples"] == 1 and small["spreads"][0]["zscore"] is None
+    assert se.stats()["samples"] == {"RB2605-RB2610": 1}
+
+
+def test_failed_refresh_drops_expired_quotes(monkeypatch, spread_quotes):
+    """测试刷新失败时不把过期行情当作当前价格，相关价差为空并列出缺失合约"""
+    spread_quotes.prices.update({"RB2605": 3000.0, "RB2610": 3060.0})
+    monkeypatch.setenv("SPREAD_QUOTE_TTL", "60")
+    products = {"RB": ["2605", "2610"]}
+    fresh = se.compute_spreads(products)
+    assert fresh["spreads"][0]["value"] == -60.0 and set(fresh["quote_age"]) == {"RB2605", "RB2610"}
+
+    spread_quotes.errors["CF"] = "sina CF down"
+    monkeypatch.setenv("SPREAD_QUOTE_TTL", "0")
+    failed = se.compute_spreads(products)
+    spread = failed["spreads"][0]
+    assert spread["value"] is None and spread["missing"] == ["RB2605", "RB2610"]
+    assert failed["prices"] == {} and failed["errors"] == {"CF": "sina CF down"}
+
+
+def test_history_bounded(monkeypatch, spread_quotes):
+    """测试历史样本按最近使用淘汰超出 SPREAD_MAX_SERIES 的价差，移除已过交割月的价差，同名价差换合约后重新积累"""
+    spread_quotes.default = 3000.0
+    monkeypatch.setenv("SPREAD_MAX_SERIES", "2")
+    for months in (["2605", "2610"], ["2605", "2609"], ["2610", "2701"]):
+        se.compute_spreads({"RB": months})
+    se.compute_spreads({"RB": ["2605", "2609"]})
+    assert list(se._history) == ["RB2610-RB2701", "RB2605-RB2609"]
+    assert set(se._sampled_at) == set(se._history)
+
+    # 2026 年 6 月起 RB2605 已过交割月
+    class June(se.date):
+        @classmethod
+        def today(cls):
+            return cls(2026, 6, 1)
+
+    monkeypatch.setattr(se, "date", June)
+    se.compute_spreads({"RB": ["2610", "2701"]})
+    assert list(se._history) == ["RB2610-RB2701"]
+
+    monkeypatch.setenv("SPREAD_QUOTE_TTL", "0")
+    pair = [{"name": "rb", "type": "calendar", "near": "RB2610", "far": "RB2701"}]
+    se.compute_spreads(None, pair)
+    assert se.compute_spreads(None, pair)["spreads"][0]["samples"] == 2
+    moved = [{"name": "rb", "type": "calendar", "near": "RB2701", "far": "RB2705"}]
+    assert se.compute_spreads(None, moved)["spreads"][0]["samples"] == 1
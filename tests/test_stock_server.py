@@ -60,6 +60,188 @@ def test_get_stock_hist():
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 
+def test_spot_cache_index(monkeypatch, fake_spot):
+    """测试全市场行情快照缓存：TTL 内复用同一快照，按代码索引查询并统计命中率（离线）"""
+    calls = fake_spot
+    monkeypatch.setenv("STOCK_SPOT_TTL", "60")
+
+    assert s.get_stock_realtime("600519")["data"]["最新价"] == 1500.0
+    assert s.get_stock_realtime("000001")["data"]["名称"] == "平安银行"
+    assert "error" in s.get_stock_realtime("999999")
+    assert len(calls) == 1
+
+    stats = s.spot_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["refreshes"] == 1
+
+
+def test_realtime_batch(fake_spot):
+    """测试批量实时行情：一次快照回答多只股票，字段投影，逐只报告错误（离线）"""
+    calls = fake_spot
+
+    result = s.get_stock_realtime_batch(["600519", "000001", "abc", "999999", "600519"], fields=["最新价", "市盈率"])
+    assert len(calls) == 1
+    assert result["data"] == {"600519": {"最新价": 1500.0}, "000001": {"最新价": 11.5}}
+    assert set(result["errors"]) == {"abc", "999999"}
+    assert result["unknown_fields"] == ["市盈率"]
+
+
+def test_hist_bar_cache(monkeypatch, tmp_path):
+    """测试历史K线本地缓存：按范围下载，之后增量合并、按日期范围读取，复权价格变化时整段重建（离线）"""
+    import akshare as ak
+    import pandas as pd
+
+    dates = pd.bdate_range("2025-11-03", periods=30)
+    state = {"bars": 20, "factor": 1.0}
+    calls = []
+
+    def fake_hist(symbol, period, start_date, end_date, adjust):
+        calls.append((start_date, adjust))
+        df = pd.DataFrame({
+            "日期": dates[:state["bars"]].date,
+            "股票代码": symbol,
+            "开盘": 10.0, "收盘": [(10.0 + i) * state["factor"] for i in range(state["bars"])],
+            "最高": 11.0, "最低": 9.0, "成交量": 1000, "成交额": 1e6,
+            "振幅": 1.0, "涨跌幅": 0.5, "涨跌额": 0.1, "换手率": 0.2,
+        })
+        return df[df["日期"] >= pd.Timestamp(start_date).date()]
+
+    monkeypatch.setattr(ak, "stock_zh_a_hist", fake_hist)
+    monkeypatch.setattr(s, "_bar_store", s.BarStore(str(tmp_path / "bars.db")))
+    monkeypatch.setenv("HIST_SYNC_TTL", "0")
+
+    # 给出开始日期时只下载该日期之后的K线
+    result = s.get_stock_hist("600519", adjust="qfq", start_date="2025-11-20", limit=0)
+    assert calls == [("20251120", "qfq")]
+    assert result["count"] == 7 and result["data"][-1]["收盘"] == 29.0
+
+    # 新增两根K线：从当日之前最后一根已存K线开始增量下载；估算窗口内不足 limit 根时补齐更早的历史
+    state["bars"] = 22
+    result = s.get_stock_hist("600519", adjust="qfq", limit=10)
+    assert calls[1] == (dates[19].strftime("%Y%m%d"), "qfq")
+    assert calls[-1] == ("19700101", "qfq")
+    assert result["count"] == 10 and result["data"][-1]["日期"] == dates[21].date().isoformat()
+
+    # 日期范围直接从本地缓存读取
+    n_calls = len(calls)
+    result = s.get_stock_hist("600519", adjust="qfq", start_date="20251105", end_date="2025-11-07", limit=0)
+    assert [r["日期"] for r in result["data"]] == ["2025-11-05", "2025-11-06", "2025-11-07"]
+    assert all(c[0] != "20251105" for c in calls[n_calls:])
+    assert "error" in s.get_stock_hist("600519", start_date="2025/11/05")
+
+    # 除权导致前复权价格整体变化：整段重新下载
+    state["factor"] = 0.5
+    sync = s.get_bar_store().sync("600519", "daily", "qfq")
+    assert sync["mode"] == "rebuild"
+    assert s.get_bar_store().read("600519", "daily", "qfq")["收盘"].iloc[0] == 5.0
+
+    assert "error" in s.get_stock_hist("600519", adjust="xx")
+
+
+def test_bar_sync_ignores_forming_bar(monkeypatch, tmp_path):
+    """测试只有当日仍在形成的K线价格变化时只做增量合并，不会误判为复权变化而整段重建（离线）"""
+    import akshare as ak
+    import pandas as pd
+    from server.modules import bar_store
+
+    dates = pd.bdate_range("2025-12-01", periods=5)
+    closes = [10.0, 11.0, 12.0, 13.0, 14.0]
+
+    def fake_hist(symbol, period, start_date, end_date, adjust):
+        df = pd.DataFrame({
+            "日期": dates.date, "股票代码": symbol, "开盘": 10.0, "收盘": list(closes),
+            "最高": 15.0, "最低": 9.0, "成交量": 1000, "成交额": 1e6,
+            "振幅": 1.0, "涨跌幅": 0.5, "涨跌额": 0.1, "换手率": 0.2,
+        })
+        return df[df["日期"] >= pd.Timestamp(start_date).date()]
+
+    monkeypatch.setattr(ak, "stock_zh_a_hist", fake_hist)
+    monkeypatch.setattr(bar_store, "_today", lambda: dates[-1].date().isoformat())
+    monkeypatch.setenv("HIST_SYNC_TTL", "0")
+    store = bar_store.BarStore(str(tmp_path / "bars.db"))
+
+    for start in ("2025-12-05", "2025-12-01"):
+        # 只存了当日一根K线，以及存有完整历史两种情况
+        assert store.sync("600519", "daily", "qfq", start=start)["mode"] == "full"
+        closes[-1] += 0.5
+        assert store.sync("600519", "daily", "qfq", start=start)["mode"] == "incremental"
+        assert store.read("600519", "daily", "qfq")["收盘"].iloc[-1] == closes[-1]
+
+    # 已收盘K线的价格变化仍触发重建
+    closes[-2] = 6.5
+    assert store.sync("600519", "daily", "qfq", start="2025-12-01")["mode"] == "rebuild"
+
+
+def test_bar_sync_caches_empty_result(monkeypatch, tmp_path):
+    """测试上游没有K线的代码在同步有效期内不会重复整段下载，过期后再次尝试（离线）"""
+    import akshare as ak
+    import pandas as pd
+    from server.modules import bar_store
+
+    calls = []
+
+    def fake_hist(symbol, period, start_date, end_date, adjust):
+        calls.append(start_date)
+        return pd.DataFrame()
+
+    monkeypatch.setattr(ak, "stock_zh_a_hist", fake_hist)
+    monkeypatch.setenv("HIST_SYNC_TTL", "60")
+    store = bar_store.BarStore(str(tmp_path / "bars.db"))
+
+    assert store.sync("920001")["mode"] == "full"
+    assert [store.sync("920001")["mode"] for _ in range(3)] == ["cached"] * 3
+    assert calls == ["19700101"] and store.read("920001").empty
+
+    # 强制同步或有效期过后仍会重新下载
+    assert store.sync("920001", force=True)["mode"] == "full"
+    monkeypatch.setenv("HIST_SYNC_TTL", "0")
+    assert store.sync("920001")["mode"] == "full"
+    assert len(calls) == 3
+
+
+def test_resample_bars(monkeypatch, tmp_path):
+    """测试由缓存的日K线本地聚合周线、N 日线与季线，不再请求上游周线/月线（离线）"""
+    import akshare as ak
+    import pandas as pd
+
+    # 2025-12-29 ~ 2026-01-16，元旦 1 月 1、2 日休市
+    dates = [d for d in pd.bdate_range("2025-12-29", "2026-01-16") if d.strftime("%m-%d") not in ("01-01", "01-02")]
+    daily = pd.DataFrame({
+        "日期": [d.date() for d in dates],
+        "股票代码": "600519",
+        "开盘": [10.0 + i for i in range(len(dates))],
+        "收盘": [10.5 + i for i in range(len(dates))],
+        "最高": [11.0 + i for i in range(len(dates))],
+        "最低": [9.5 + i for i in range(len(dates))],
+        "成交量": 100, "成交额": 1000.0, "振幅": 0.0, "涨跌幅": 0.0, "涨跌额": 0.5, "换手率": 0.1,
+    })
+    periods = []
+
+    def fake_hist(symbol, period, start_date, end_date, adjust):
+        periods.append(period)
+        return daily[daily["日期"] >= pd.Timestamp(start_date).date()]
+
+    weekly = s.resample_bars(daily, "weekly")
+    assert [d.isoformat() for d in weekly["日期"]] == ["2025-12-31", "2026-01-09", "2026-01-16"]
+    assert weekly["交易日数"].tolist() == [3, 5, 5]
+    first = weekly.iloc[0]
+    assert (first["开盘"], first["收盘"], first["最高"], first["最低"]) == (10.0, 12.5, 13.0, 9.5)
+    assert first["成交量"] == 300 and first["成交额"] == 3000.0
+    assert weekly.iloc[1]["涨跌额"] == 5.0 and weekly.iloc[1]["涨跌幅"] == round(5.0 / 12.5 * 100, 2)
+
+    assert s.resample_bars(daily, "2W")["交易日数"].tolist() == [3, 10]
+    assert s.resample_bars(daily, "5D")["交易日数"].tolist() == [3, 5, 5]
+    assert s.resample_bars(daily, "Q")["交易日数"].tolist() == [3, 10]
+
+    monkeypatch.setattr(ak, "stock_zh_a_hist", fake_hist)
+    monkeypatch.setattr(s, "_bar_store", s.BarStore(str(tmp_path / "bars.db")))
+    result = s.get_stock_hist("600519", period="weekly", start_date="2026-01-05", limit=0)
+    assert [r["日期"] for r in result["data"]] == ["2026-01-09", "2026-01-16"]
+    assert "交易日数" not in result["data"][0]
+    assert s.get_stock_hist("600519", period="2M", limit=1)["count"] == 1
+    assert set(periods) == {"daily"}
+    assert "error" in s.get_stock_hist("600519", period="0W")
+
+
 if __name__ == "__main__":
     # 先测试实时行情
     test_get_stock_realtime()
@@ -0,0 +1,42 @@
+"""
+测试延迟导入、启动预热与就绪状态（离线）
+"""
+import sys
+import os
+import subprocess
+
+# 将项目根目录添加到路径（tests 的父目录）
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server.modules import warmup
+
+
+def test_modules_import_without_heavy_libraries():
+    """测试导入行情模块时不加载 numpy / pandas / akshare（在干净的子进程中检查）"""
+    code = (
+        "import sys\n"
+        "from server.modules import jisilu_mcp_server, stock_server, futures_server, scheduler, executor\n"
+        "print(','.join(m for m in ('numpy', 'pandas', 'akshare') if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_import_and_readiness_status():
+    """测试预热记录耗时与失败，以及就绪判断只等待应当已预热的缓存"""
+    timings = warmup.import_heavy_modules(["json", "no_such_module_xyz"])
+    assert "json" in timings and "no_such_module_xyz" not in timings
+    assert warmup.imports_ready()
+
+    status = warmup.status({
+        "spot": (lambda: 3.21, True),
+        "futures": (lambda: None, False),
+    })
+    assert status["ready"]
+    assert status["imports"]["errors"]["no_such_module_xyz"]
+    assert status["caches"]["spot"] == {"warm": True, "age": 3.21, "expected": True}
+    assert not status["caches"]["futures"]["warm"]
+
+    # 处于交易时段的缓存尚未加载时不就绪
+    assert not warmup.status({"futures": (lambda: None, True)})["ready"]